@@ -26,4 +26,35 @@ def create_app(config_class=Config):
     from app.api import bp as api_bp
     app.register_blueprint(api_bp, url_prefix='/api')
     
+    from app.services import compression
+    compression.init_app(app)
+    
+    # Avant le pool de processus : les workers héritent du backend choisi
+    from app.services import analysis_backend
+    analysis_backend.init_app(app)
+    
+    from app.services import heatmap_service
+    heatmap_service.init_app(app)
+    
+    from app.services import worker_pool
+    worker_pool.init_app(app)
+    
+    from app.services import job_service
+    job_service.init_app(app)
+    
+    from app.services import upload_service
+    upload_service.init_app(app)
+    
+    from app.services import metrics
+    metrics.init_app(app)
+    
+    from app.services import tracing
+    tracing.init_app(app)
+    
+    from app.services import profiling
+    profiling.init_app(app)
+    
+    from app.services import memory_tracker
+    memory_tracker.init_app(app)
+    
     return app
\ No newline at end of file
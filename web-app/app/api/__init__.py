@@ -9,4 +9,8 @@ bp = Blueprint('api', __name__)
 # Import des routes après la création du blueprint
 from . import routes
 from . import analysis_routes
-from . import editor_routes
\ No newline at end of file
+from . import editor_routes
+from . import heatmap_routes
+from . import job_routes
+from . import upload_routes
+from . import profile_routes
@@ -2,12 +2,19 @@
 Routes API pour l'analyse de trajectoires GPS.
 Phase 3 : Analyses de trajet - Fonctionnalités de base.
 """
+import json
 import logging
-from flask import request, jsonify
+from concurrent.futures import wait, FIRST_COMPLETED
+from flask import request, jsonify, Response, current_app, url_for
 from app.services.kml_parser import KMLParser
 from app.services.trajectory_analyzer import TrajectoryAnalyzer
 from app.services.timing_tools import track_time
-from app.services.cache_service import parse_kml_cached, parse_gpx_cached
+from app.services.tracing import span
+from app.services.cache_service import parse_document_cached, get_document
+from app.services.job_service import job_manager, JobQueueFullError
+from app.services.file_service import FileService
+from app.services.format_detector import detect_format, UnsupportedFormatError
+from app.services import worker_pool
 from . import bp
 
 # Configuration du logger
@@ -58,6 +65,23 @@ def analyze_trajectory():
         }), 500
 
 
+def _parse_and_analyze(content, ext, display_mode, progress=None):
+    """Parse un document puis l'analyse ; retourne les données et l'analyse combinées."""
+    kml_data = parse_document_cached(content, ext, display_mode, progress)
+    if not kml_data['success']:
+        return kml_data
+    
+    # Effectuer l'analyse
+    analysis = TrajectoryAnalyzer.analyze_trajectory(kml_data['features'], progress)
+    
+    # Combiner les données KML et l'analyse
+    return {
+        'success': True,
+        'kml_data': kml_data,
+        'analysis': analysis
+    }
+
+
 @bp.route('/analysis/upload-and-analyze', methods=['POST'])
 @track_time
 def upload_and_analyze():
@@ -85,32 +109,34 @@ def upload_and_analyze():
         display_mode = request.form.get('display_mode', 'double')
         
         # Lire et parser le fichier en fonction de son extension
-        content = file.read().decode('utf-8')
-        ext = file.filename.rsplit('.', 1)[1].lower()
-        if ext == 'gpx':
-            kml_data = parse_gpx_cached(content)
-        else:
-            kml_data = parse_kml_cached(content, display_mode)
-        
-        if not kml_data['success']:
-            return jsonify(kml_data), 400
-        
-        # Effectuer l'analyse
-        analysis = TrajectoryAnalyzer.analyze_trajectory(kml_data['features'])
-        
-        # Combiner les données KML et l'analyse
-        result = {
-            'success': True,
-            'kml_data': kml_data,
-            'analysis': analysis
-        }
-        
-        return jsonify(result)
-        
-    except UnicodeDecodeError:
+        with span('read_upload'):
+            content = file.read()
+            ext = detect_format(content)
+        
+        # Les gros fichiers sont traités en arrière-plan pour libérer la requête
+        if len(content) > current_app.config.get('ASYNC_UPLOAD_THRESHOLD', float('inf')):
+            job = job_manager.submit(f'upload-and-analyze:{file.filename}',
+                                     _parse_and_analyze, content, ext, display_mode)
+            response = jsonify({'success': True, 'job_id': job.id, 'status': job.status,
+                                'status_url': url_for('api.get_job', job_id=job.id),
+                                'events_url': url_for('api.stream_job_events', job_id=job.id)})
+            response.headers['Location'] = url_for('api.get_job', job_id=job.id)
+            return response, 202
+        
+        result = _parse_and_analyze(content, ext, display_mode)
+        with span('jsonify'):
+            response = jsonify(result)
+        return (response, 400) if not result['success'] else response
+        
+    except JobQueueFullError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
+    except UnsupportedFormatError as e:
         return jsonify({
             'success': False,
-            'error': 'Erreur d\'encodage du fichier. Assurez-vous qu\'il s\'agit d\'un fichier KML valide.'
+            'error': str(e)
         }), 400
     except Exception as e:
         return jsonify({
@@ -119,6 +145,135 @@ def upload_and_analyze():
         }), 500
 
 
+def _iter_batch_results(jobs, analyses, timeout):
+    """
+    Exécute les analyses d'un lot de documents et produit une ligne NDJSON par document.
+
+    Les documents sont répartis sur le pool de processus avec un nombre borné de
+    tâches en vol ; chaque ligne est émise dès que son document est terminé.
+    """
+    pool = worker_pool.get_pool()
+    if pool is None:
+        for info, kwargs in jobs:
+            if kwargs is None:
+                yield json.dumps(info) + '\n'
+                continue
+            try:
+                result = worker_pool.analyze_document(analyses, **kwargs)
+            except Exception as e:  # noqa: BLE001
+                result = {'success': False, 'error': f'Erreur lors de l\'analyse: {str(e)}'}
+            yield json.dumps({**info, **result}) + '\n'
+        return
+
+    max_in_flight = max(1, 2 * worker_pool.pool_size())
+    queue = iter(jobs)
+    in_flight = {}
+    exhausted = False
+    while True:
+        while not exhausted and len(in_flight) < max_in_flight:
+            job = next(queue, None)
+            if job is None:
+                exhausted = True
+                break
+            info, kwargs = job
+            if kwargs is None:
+                yield json.dumps(info) + '\n'
+                continue
+            in_flight[worker_pool.submit(worker_pool.analyze_document, analyses, **kwargs)] = info
+
+        if not in_flight:
+            return
+
+        done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            # Aucun document n'a abouti dans le délai : abandonner ceux en cours
+            for future, info in in_flight.items():
+                future.cancel()
+                yield json.dumps({**info, 'success': False, 'error': 'Délai de traitement dépassé'}) + '\n'
+            in_flight.clear()
+            continue
+
+        for future in done:
+            info = in_flight.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:  # noqa: BLE001
+                result = {'success': False, 'error': f'Erreur lors de l\'analyse: {str(e)}'}
+            yield json.dumps({**info, **result}) + '\n'
+
+
+@bp.route('/analysis/batch', methods=['POST'])
+@track_time
+def batch_analysis():
+    """
+    Analyse un lot de documents en une seule requête.
+    
+    Expects:
+        JSON avec 'document_ids' (identifiants retournés par l'upload) et 'analyses',
+        ou formulaire multipart avec 'files' et 'analyses' (séparées par des virgules)
+        
+    Returns:
+        Flux NDJSON : une ligne par document, dans l'ordre de fin de traitement
+    """
+    if request.files:
+        analyses = [a for a in request.form.get('analyses', 'trajectory').split(',') if a]
+        display_mode = request.form.get('display_mode', 'double')
+        document_ids = []
+        files = request.files.getlist('files')
+    else:
+        data = request.get_json(silent=True) or {}
+        analyses = data.get('analyses', ['trajectory'])
+        display_mode = 'double'
+        document_ids = data.get('document_ids', [])
+        files = []
+        for field, value in (('analyses', analyses), ('document_ids', document_ids)):
+            if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+                return jsonify({
+                    'success': False,
+                    'error': f"'{field}' doit être une liste de chaînes"
+                }), 400
+
+    if not document_ids and not files:
+        return jsonify({
+            'success': False,
+            'error': 'Aucun document fourni (document_ids ou files)'
+        }), 400
+
+    unknown = [a for a in analyses if a not in worker_pool.ANALYSES]
+    if not analyses or unknown:
+        return jsonify({
+            'success': False,
+            'error': f'Analyses inconnues: {", ".join(unknown) or "aucune"}. '
+                     f'Disponibles : {", ".join(worker_pool.ANALYSES)}'
+        }), 400
+
+    # Préparer toutes les tâches avant de streamer (la requête n'est plus lisible ensuite)
+    jobs = []
+    for index, document_id in enumerate(document_ids):
+        info = {'index': index, 'document_id': document_id}
+        document = get_document(document_id)
+        if document is None:
+            jobs.append(({**info, 'success': False, 'error': 'Document inconnu'}, None))
+        else:
+            jobs.append((info, {'features': document['features'], 'points': document.get('points', [])}))
+
+    for index, file in enumerate(files, start=len(document_ids)):
+        info = {'index': index, 'filename': file.filename}
+        if not file.filename or not FileService.allowed_file(file.filename):
+            jobs.append(({**info, 'success': False, 'error': 'Type de fichier non autorisé'}, None))
+            continue
+        content = file.read()
+        try:
+            ext = detect_format(content)
+        except UnsupportedFormatError as e:
+            jobs.append(({**info, 'success': False, 'error': str(e)}, None))
+            continue
+        jobs.append((info, {'content': content, 'file_format': ext, 'display_mode': display_mode}))
+
+    timeout = current_app.config.get('WORKER_TASK_TIMEOUT')
+    return Response(_iter_batch_results(jobs, analyses, timeout), mimetype='application/x-ndjson')
+
+
 @bp.route('/analysis/elevation-profile', methods=['POST'])
 @track_time
 def get_elevation_profile():
@@ -250,6 +405,14 @@ def calculate_distance():
 
 # ===== PHASE 4: ROUTES POUR ANALYSES AVANCÉES =====
 
+def _advanced_analysis(features, points, progress=None):
+    """Analyse avancée complète, au format de réponse de la route."""
+    return {
+        'success': True,
+        'analysis': TrajectoryAnalyzer.advanced_trajectory_analysis(features, points, progress)
+    }
+
+
 @bp.route('/analysis/advanced', methods=['POST'])
 @track_time
 def get_advanced_analysis():
@@ -257,10 +420,11 @@ def get_advanced_analysis():
     Effectue une analyse avancée complète d'une trajectoire (Phase 4).
     
     Expects:
-        JSON avec 'features' contenant les données KML parsées
+        JSON avec 'features' contenant les données KML parsées, et 'async'
+        pour lancer l'analyse en arrière-plan (job avec suivi de progression)
         
     Returns:
-        JSON avec l'analyse avancée complète
+        JSON avec l'analyse avancée complète, ou 202 avec l'identifiant du job
     """
     try:
         data = request.get_json()
@@ -275,14 +439,23 @@ def get_advanced_analysis():
         all_features = data.get('features', [])
         all_points = data.get('points', [])
 
-        # Effectuer l'analyse avancée complète
-        advanced_analysis = TrajectoryAnalyzer.advanced_trajectory_analysis(all_features,all_points)
+        # Mode asynchrone demandé par le client : analyse en arrière-plan avec suivi SSE
+        if data.get('async'):
+            job = job_manager.submit('advanced-analysis', _advanced_analysis, all_features, all_points)
+            response = jsonify({'success': True, 'job_id': job.id, 'status': job.status,
+                                'status_url': url_for('api.get_job', job_id=job.id),
+                                'events_url': url_for('api.stream_job_events', job_id=job.id)})
+            response.headers['Location'] = url_for('api.get_job', job_id=job.id)
+            return response, 202
 
-        return jsonify({
-            'success': True,
-            'analysis': advanced_analysis
-        })
+        # Effectuer l'analyse avancée complète
+        return jsonify(_advanced_analysis(all_features, all_points))
         
+    except JobQueueFullError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
     except Exception as e:
         return jsonify({
             'success': False,
@@ -0,0 +1,66 @@
+"""
+Routes API de la carte de densité agrégée (heatmap).
+"""
+
+from flask import request, jsonify, Response
+from app.services.heatmap_service import density_grid
+from app.services.timing_tools import track_time
+from . import bp
+
+# Taille maximale de la grille retournée par /api/heatmap
+MAX_GRID_SIZE = 1024
+
+
+@bp.route('/heatmap')
+@track_time
+def get_heatmap():
+    """
+    Retourne la densité agrégée de toutes les traces chargées sous forme de grille.
+
+    Query params:
+        bbox: min_lon,min_lat,max_lon,max_lat (emprise des données par défaut)
+        width, height: dimensions de la grille (256 par défaut)
+
+    Returns:
+        JSON avec la grille de densité (lignes du nord vers le sud)
+    """
+    try:
+        bbox = None
+        if request.args.get('bbox'):
+            bbox = [float(v) for v in request.args['bbox'].split(',')]
+            if len(bbox) != 4 or bbox[0] >= bbox[2] or bbox[1] >= bbox[3]:
+                raise ValueError('bbox invalide (min_lon,min_lat,max_lon,max_lat attendu)')
+
+        width = int(request.args.get('width', 256))
+        height = int(request.args.get('height', 256))
+        if not (0 < width <= MAX_GRID_SIZE and 0 < height <= MAX_GRID_SIZE):
+            raise ValueError(f'Dimensions de grille invalides (1 à {MAX_GRID_SIZE})')
+
+        heatmap = density_grid.grid(bbox, width, height)
+        heatmap.update({
+            'success': True,
+            'documents': density_grid.document_count,
+            'cell_size': density_grid.cell_size
+        })
+        return jsonify(heatmap)
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+
+@bp.route('/heatmap/tiles/<int:z>/<int:x>/<int:y>.png')
+@track_time
+def get_heatmap_tile(z, x, y):
+    """Retourne une tuile PNG XYZ de la carte de densité."""
+    if z > 22 or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        return jsonify({
+            'success': False,
+            'error': 'Coordonnées de tuile invalides'
+        }), 404
+
+    response = Response(density_grid.render_tile(z, x, y), mimetype='image/png')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
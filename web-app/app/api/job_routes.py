@@ -0,0 +1,70 @@
+"""
+Routes API de suivi des traitements en arrière-plan.
+"""
+
+import json
+from flask import jsonify, Response
+from app.services.job_service import job_manager
+from . import bp
+
+# Intervalle maximal entre deux messages du flux SSE (commentaire de maintien)
+SSE_HEARTBEAT_SECONDS = 15
+
+
+def _job_not_found():
+    return jsonify({
+        'success': False,
+        'error': 'Job inconnu ou expiré'
+    }), 404
+
+
+@bp.route('/jobs/<job_id>')
+def get_job(job_id):
+    """Retourne l'état d'un job, et son résultat lorsqu'il est terminé."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return _job_not_found()
+    return jsonify({'success': True, **job.to_dict()})
+
+
+@bp.route('/jobs/<job_id>/progress')
+def get_job_progress(job_id):
+    """Retourne uniquement l'état et la progression d'un job (sans le résultat)."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return _job_not_found()
+    return jsonify({'success': True, **job.to_dict(include_result=False)})
+
+
+def _sse_message(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@bp.route('/jobs/<job_id>/events')
+def stream_job_events(job_id):
+    """
+    Flux Server-Sent Events de la progression d'un job.
+    
+    Émet un événement 'progress' à chaque mise à jour (octets lus, éléments extraits,
+    étape d'analyse) puis un événement 'done' une fois le job terminé.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return _job_not_found()
+
+    def generate():
+        version = None
+        while True:
+            if version is not None and not job.progress.wait_for_change(version, SSE_HEARTBEAT_SECONDS):
+                yield ': keep-alive\n\n'
+                continue
+            version = job.progress.version
+            if job.finished:
+                yield _sse_message('done', job.to_dict(include_result=False))
+                return
+            yield _sse_message('progress', job.to_dict(include_result=False))
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,55 @@
+"""
+Routes API d'accès aux profils de requêtes (réservées à l'administration).
+
+    GET /api/profiles                    -> derniers profils enregistrés
+    GET /api/profiles/<id>               -> profil brut (.pstats ou piles repliées)
+    GET /api/profiles/<id>?format=text   -> résumé texte des fonctions/piles les plus coûteuses
+"""
+
+from flask import request, jsonify, Response
+from app.services.profiling import profile_store
+from . import bp
+
+
+def _check_access():
+    """Retourne une réponse d'erreur si le profilage est désactivé ou le jeton invalide."""
+    if not profile_store.enabled:
+        return jsonify({
+            'success': False,
+            'error': 'Profilage désactivé'
+        }), 404
+    if not profile_store.authorized(request.headers.get('X-Profile-Token')):
+        return jsonify({
+            'success': False,
+            'error': 'Jeton d\'administration absent ou invalide'
+        }), 403
+    return None
+
+
+@bp.route('/profiles')
+def list_profiles():
+    """Liste les derniers profils, du plus récent au plus ancien."""
+    error = _check_access()
+    if error is not None:
+        return error
+    return jsonify({'success': True, 'profiles': [profile.to_dict() for profile in profile_store.list()]})
+
+
+@bp.route('/profiles/<profile_id>')
+def get_profile(profile_id):
+    """Télécharge un profil, ou son résumé texte avec ?format=text."""
+    error = _check_access()
+    if error is not None:
+        return error
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        return jsonify({
+            'success': False,
+            'error': 'Profil inconnu ou expiré'
+        }), 404
+
+    if request.args.get('format') == 'text':
+        return Response(profile.summary(), mimetype='text/plain')
+    mimetype = 'application/octet-stream' if profile.kind == 'cprofile' else 'text/plain'
+    return Response(profile.data, mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={profile.filename}'})
@@ -2,19 +2,32 @@
 Routes API REST de l'application.
 """
 
-from flask import request, jsonify
+import json
+import mimetypes
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import CancelledError, TimeoutError as FutureTimeoutError
+from flask import request, jsonify, current_app, url_for, Response
 from app.api import bp
 from app.services.kml_parser import KMLParser
 from app.services.gpx_parser import GPXParser
-from app.services.cache_service import parse_kml_cached, parse_gpx_cached
+from app.services.cache_service import (
+    parse_document_cached, cache_key, get_cached, store_result, stream_document_cached,
+    parse_file_cached, get_document_archive
+)
+from app.services import memory_tracker, worker_pool
+from app.services.job_service import job_manager, JobQueueFullError
 from app.services.file_service import FileService
-from app.services.timing_tools import track_time
+from app.services.format_detector import detect_format, UnsupportedFormatError
+from app.services.compression import DecompressionError
+from app.services.kml_folder_filter import FolderFilter
+from app.services.document_probe import probe_document
+from app.services.timing_tools import track_time, get_stats, reset_stats
 
 @bp.route('/upload', methods=['POST'])
 @track_time
 def upload_file():
-    """Endpoint pour uploader et traiter un fichier KML ou GPX."""
-    """Endpoint pour uploader et traiter un fichier KML ou GPX."""
+    """Endpoint pour uploader et traiter un fichier KML, KMZ ou GPX."""
     try:
         if 'file' not in request.files:
             return jsonify({'success': False, 'error': 'Aucun fichier sélectionné'}), 400
@@ -23,22 +36,45 @@ def upload_file():
         if file.filename == '':
             return jsonify({'success': False, 'error': 'Aucun fichier sélectionné'}), 400
         
-        # Récupérer le mode d'affichage depuis les paramètres
+        # Récupérer le mode d'affichage et les dossiers à conserver/écarter
         display_mode = request.form.get('display_mode', 'double')
+        folders = FolderFilter.from_strings(request.form.get('include_folders'),
+                                            request.form.get('exclude_folders'))
         
-        # Traiter le fichier avec détection automatique du format
+        # Traiter le fichier avec détection du format d'après son contenu
         content = FileService.save_uploaded_file(file)
-        ext = file.filename.rsplit('.', 1)[1].lower()
-        if ext == 'gpx':
-            result = parse_gpx_cached(content)
-        else:
-            result = parse_kml_cached(content, display_mode)
+        ext = detect_format(content)
+        
+        # Réponse en flux NDJSON (une ligne par feature) si le client la demande
+        if request.form.get('stream') == '1' or request.accept_mimetypes.best == 'application/x-ndjson':
+            records = stream_document_cached(content, ext, display_mode, folders)
+            return Response((json.dumps(record) + '\n' for record in records),
+                            mimetype='application/x-ndjson')
+        
+        # Mode asynchrone demandé par le client : parsing en arrière-plan avec suivi SSE
+        if request.form.get('async') == '1':
+            job = job_manager.submit(f'upload:{file.filename}', parse_document_cached, content, ext, display_mode,
+                                     folders=folders)
+            return jsonify({
+                'success': True,
+                'job_id': job.id,
+                'status': job.status,
+                'status_url': url_for('api.get_job', job_id=job.id),
+                'events_url': url_for('api.stream_job_events', job_id=job.id)
+            }), 202
+        
+        result = parse_document_cached(content, ext, display_mode, folders=folders)
         
         if result['success']:
             return jsonify(result)
         else:
             return jsonify(result), 400
             
+    except JobQueueFullError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
     except ValueError as e:
         return jsonify({
             'success': False,
@@ -64,7 +100,11 @@ def multi_upload():
             return jsonify({'success': False, 'error': 'Aucun fichier fourni'}), 400
 
         display_mode = request.form.get('display_mode', 'double')
+        # Un seul délai pour toute la requête, partagé entre les fichiers
+        timeout = current_app.config.get('WORKER_TASK_TIMEOUT')
+        deadline = time.monotonic() + timeout if timeout else None
         results = []
+        pending = []
         for file in files:
             if not file or file.filename == '':
                 results.append({'filename': '', 'success': False, 'error': 'Nom de fichier invalide'})
@@ -74,19 +114,42 @@ def multi_upload():
                 results.append({'filename': file.filename, 'success': False, 'error': 'Type de fichier non autorisé'})
                 continue
 
+            content = file.read()
             try:
-                content = file.read().decode('utf-8')
-            except UnicodeDecodeError:
-                results.append({'filename': file.filename, 'success': False, 'error': "Erreur d'encodage"})
+                ext = detect_format(content)
+            except UnsupportedFormatError as e:
+                results.append({'filename': file.filename, 'success': False, 'error': str(e)})
                 continue
+            key = cache_key(content, ext, display_mode)
+            res, future = None, None
+            if worker_pool.get_pool() is not None:
+                # Le parsing est déporté dans le pool de processus s'il est actif
+                res = get_cached(key)
+                if res is None:
+                    future = worker_pool.submit(worker_pool.parse_document, content, ext, display_mode)
+            if res is None and future is None:
+                # Sans pool, la lecture du cache est comptée par parse_document_cached
+                res = parse_document_cached(content, ext, display_mode, content_hash=key[1])
+            entry = {'filename': file.filename}
+            results.append(entry)
+            pending.append((entry, key, res, future, content))
 
-            ext = file.filename.rsplit('.', 1)[1].lower()
-            if ext == 'gpx':
-                res = parse_gpx_cached(content)
-            else:
-                res = parse_kml_cached(content, display_mode)
-            res['filename'] = file.filename
-            results.append(res)
+        # Rassembler les résultats dans l'ordre, chaque échec restant isolé
+        for entry, key, res, future, content in pending:
+            if future is not None:
+                try:
+                    remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                    res = store_result(key, future.result(timeout=remaining), content)
+                except (FutureTimeoutError, CancelledError):
+                    # Délai dépassé : toutes les tâches encore en file sont annulées sans attendre
+                    # leur tour ; celles déjà démarrées vont à leur terme dans le pool borné
+                    for _, _, _, other, _ in pending:
+                        if other is not None:
+                            other.cancel()
+                    res = {'success': False, 'error': 'Délai de traitement dépassé'}
+                except Exception as e:  # noqa: BLE001
+                    res = {'success': False, 'error': f'Erreur : {str(e)}'}
+            entry.update(res)
 
         return jsonify({'files': results})
 
@@ -114,14 +177,12 @@ def load_sample_file(filename):
     try:
         # Récupérer le mode d'affichage depuis les paramètres de requête
         display_mode = request.args.get('display_mode', 'double')
+        folders = FolderFilter.from_strings(request.args.get('include_folders'),
+                                            request.args.get('exclude_folders'))
         
-        # Charger le fichier avec détection automatique du format
-        content = FileService.load_sample_file(filename)
-        ext = filename.rsplit('.', 1)[1].lower()
-        if ext == 'gpx':
-            result = parse_gpx_cached(content)
-        else:
-            result = parse_kml_cached(content, display_mode)
+        # Fichier projeté en mémoire, mis en cache selon (chemin, mtime, taille)
+        path = FileService.sample_file_path(filename)
+        result = parse_file_cached(str(path), display_mode=display_mode, folders=folders)
         
         return jsonify(result)
         
@@ -130,13 +191,84 @@ def load_sample_file(filename):
             'success': False,
             'error': 'Fichier non trouvé ou type invalide'
         }), 404
-    except (IOError, OSError, UnicodeDecodeError) as e:
+    except UnsupportedFormatError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except (IOError, OSError) as e:
         return jsonify({
             'success': False,
             'error': f'Erreur lors du chargement du fichier: {str(e)}'
         }), 500
 
 
+@bp.route('/probe', methods=['POST'])
+@track_time
+def probe():
+    """Sonde un fichier (comptages, emprise, période) sans le parser entièrement.
+
+    Le fichier est fourni dans le champ ``file`` ou désigné parmi les
+    fichiers d'exemple par le paramètre ``sample``.
+    """
+    try:
+        sample = request.args.get('sample') or request.form.get('sample')
+        if sample:
+            with FileService.map_file(FileService.sample_file_path(sample)) as content:
+                result = probe_document(content)
+        else:
+            file = request.files.get('file')
+            if file is None or file.filename == '':
+                return jsonify({'success': False, 'error': 'Aucun fichier sélectionné'}), 400
+            if not FileService.allowed_file(file.filename):
+                return jsonify({'success': False, 'error': 'Type de fichier non autorisé'}), 400
+            result = probe_document(file.stream)
+        return jsonify(result)
+
+    except FileNotFoundError:
+        return jsonify({
+            'success': False,
+            'error': 'Fichier non trouvé ou type invalide'
+        }), 404
+    except ET.ParseError as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erreur de parsing XML: {str(e)}'
+        }), 400
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+
+@bp.route('/documents/<document_id>/resources')
+def list_document_resources(document_id):
+    """Liste les ressources (images, icônes) embarquées dans un document KMZ."""
+    archive = get_document_archive(document_id)
+    if archive is None:
+        return jsonify({'success': False, 'error': 'Document KMZ inconnu'}), 404
+    with archive:
+        return jsonify({'success': True, **archive.describe()})
+
+
+@bp.route('/documents/<document_id>/resources/<path:name>')
+def get_document_resource(document_id, name):
+    """Retourne une ressource embarquée dans un document KMZ (overlay, icône)."""
+    archive = get_document_archive(document_id)
+    if archive is None:
+        return jsonify({'success': False, 'error': 'Document KMZ inconnu'}), 404
+    try:
+        with archive:
+            data = archive.read_resource(name)
+    except DecompressionError as e:
+        return jsonify({'success': False, 'error': str(e)}), 413
+    if data is None:
+        return jsonify({'success': False, 'error': 'Ressource introuvable'}), 404
+    mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    return Response(data, mimetype=mimetype)
+
+
 @bp.route('/health')
 def health_check():
     """Endpoint de vérification de santé de l'API."""
@@ -148,14 +280,20 @@ def health_check():
 
 @bp.route('/stats')
 def stats():
-    """Route pour afficher les statistiques des durées."""
-    from app.services.timing_tools import execution_times
-    stats_data = {}
-    for func_name, data in execution_times.items():
-        avg_time = data['total_time'] / data['count'] if data['count'] > 0 else 0
-        stats_data[func_name] = {
-            'call_count': data['count'],
-            'total_time': round(data['total_time'], 2),
-            'average_time': round(avg_time, 2)
-        }
-    return jsonify(stats_data)
\ No newline at end of file
+    """Route pour afficher les statistiques des durées (totaux, moyenne, percentiles).
+
+    Avec le suivi mémoire, les pics d'allocation s'ajoutent par fonction et
+    par route (clés « MÉTHODE /route »).
+    """
+    data = get_stats()
+    for name, memory in memory_tracker.get_stats().items():
+        data.setdefault(name, {}).update(memory)
+    return jsonify(data)
+
+
+@bp.route('/stats', methods=['DELETE'])
+def reset_timing_stats():
+    """Remet à zéro les statistiques des durées et des pics mémoire."""
+    reset_stats()
+    memory_tracker.reset_stats()
+    return jsonify({'success': True})
\ No newline at end of file
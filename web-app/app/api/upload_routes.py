@@ -0,0 +1,150 @@
+"""
+Routes API d'upload par morceaux pour les fichiers dépassant MAX_CONTENT_LENGTH.
+
+    POST   /api/uploads                  -> démarre un upload {filename, total_size}
+    PUT    /api/uploads/<id>?offset=N    -> envoie un morceau (corps brut)
+    GET    /api/uploads/<id>             -> position courante, pour reprendre
+    POST   /api/uploads/<id>/finalize    -> parse le fichier reçu
+    DELETE /api/uploads/<id>             -> abandonne l'upload
+"""
+
+import os
+from flask import request, jsonify, current_app, url_for
+from app.services.cache_service import parse_document_cached
+from app.services.file_service import FileService
+from app.services.format_detector import detect_format, UnsupportedFormatError
+from app.services.job_service import job_manager, JobQueueFullError
+from app.services.upload_service import upload_manager, UploadOffsetError, UploadTooLargeError
+from app.services.timing_tools import track_time
+from . import bp
+
+
+def _upload_not_found():
+    return jsonify({
+        'success': False,
+        'error': 'Upload inconnu ou expiré'
+    }), 404
+
+
+def _parse_spooled_file(path: str, file_format: str, display_mode: str, content_hash: str, progress=None):
+    """Parse un fichier reçu par morceaux directement depuis le disque, puis le supprime."""
+    try:
+        with FileService.map_file(path) as content:
+            return parse_document_cached(content, file_format, display_mode, progress, content_hash)
+    finally:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+@bp.route('/uploads', methods=['POST'])
+def create_upload():
+    """Démarre un upload par morceaux."""
+    data = request.get_json(silent=True) or {}
+    filename = data.get('filename', '')
+    if not filename or not FileService.allowed_file(filename):
+        return jsonify({'success': False, 'error': 'Type de fichier non autorisé'}), 400
+
+    total_size = data.get('total_size')
+    if total_size is not None and (not isinstance(total_size, int) or total_size < 0):
+        return jsonify({'success': False, 'error': 'Taille totale invalide'}), 400
+
+    try:
+        upload = upload_manager.create(filename, total_size)
+    except UploadTooLargeError as e:
+        return jsonify({'success': False, 'error': str(e)}), 413
+
+    response = jsonify({
+        'success': True,
+        **upload.to_dict(),
+        'upload_url': url_for('api.upload_chunk', upload_id=upload.id)
+    })
+    response.headers['Location'] = url_for('api.upload_chunk', upload_id=upload.id)
+    return response, 201
+
+
+@bp.route('/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    """Retourne la position courante d'un upload (reprise après coupure)."""
+    upload = upload_manager.get(upload_id)
+    if upload is None:
+        return _upload_not_found()
+    return jsonify({'success': True, **upload.to_dict()})
+
+
+@bp.route('/uploads/<upload_id>', methods=['PUT'])
+@track_time
+def upload_chunk(upload_id):
+    """Écrit un morceau à la position indiquée par le paramètre ``offset``."""
+    upload = upload_manager.get(upload_id)
+    if upload is None:
+        return _upload_not_found()
+
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        return jsonify({'success': False, 'error': 'Paramètre offset manquant'}), 400
+
+    try:
+        new_offset = upload_manager.write_chunk(upload, offset, request.stream)
+    except UploadOffsetError as e:
+        return jsonify({'success': False, 'error': str(e), 'offset': e.expected}), 409
+    except UploadTooLargeError as e:
+        return jsonify({'success': False, 'error': str(e)}), 413
+
+    return jsonify({'success': True, 'upload_id': upload.id, 'offset': new_offset})
+
+
+@bp.route('/uploads/<upload_id>/finalize', methods=['POST'])
+@track_time
+def finalize_upload(upload_id):
+    """Termine un upload et parse le fichier reçu.
+
+    Les fichiers dépassant ASYNC_UPLOAD_THRESHOLD sont traités en arrière-plan.
+    """
+    upload = upload_manager.get(upload_id)
+    if upload is None:
+        return _upload_not_found()
+
+    data = request.get_json(silent=True) or {}
+    display_mode = data.get('display_mode', 'double')
+    try:
+        content_hash = upload_manager.finalize(upload, data.get('sha256'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        with open(upload.path, 'rb') as f:
+            file_format = detect_format(f)
+    except UnsupportedFormatError as e:
+        upload_manager.discard(upload)
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        if upload.offset > current_app.config.get('ASYNC_UPLOAD_THRESHOLD', float('inf')):
+            job = job_manager.submit(f'upload:{upload.filename}', _parse_spooled_file,
+                                     upload.path, file_format, display_mode, content_hash)
+            response = jsonify({'success': True, 'job_id': job.id, 'status': job.status,
+                                'status_url': url_for('api.get_job', job_id=job.id),
+                                'events_url': url_for('api.stream_job_events', job_id=job.id)})
+            response.headers['Location'] = url_for('api.get_job', job_id=job.id)
+            return response, 202
+
+        result = _parse_spooled_file(upload.path, file_format, display_mode, content_hash)
+    except JobQueueFullError as e:
+        upload_manager.discard(upload)
+        return jsonify({'success': False, 'error': str(e)}), 503
+
+    if not result['success']:
+        return jsonify(result), 400
+    return jsonify(result)
+
+
+@bp.route('/uploads/<upload_id>', methods=['DELETE'])
+def delete_upload(upload_id):
+    """Abandonne un upload et supprime les données reçues."""
+    upload = upload_manager.get(upload_id)
+    if upload is None:
+        return _upload_not_found()
+    upload_manager.discard(upload)
+    return jsonify({'success': True})
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Traitement en masse de répertoires de fichiers KML/GPX en ligne de commande.
+
+Usage :
+    python -m app.cli analyze <répertoire> [--analyses trajectory,advanced]
+                              [--output resultats.ndjson] [--format ndjson|parquet]
+                              [--workers N] [--manifest manifest.txt]
+
+Chaque fichier est parsé puis analysé dans un pool de processus. Les empreintes
+des fichiers analysés avec succès sont ajoutées à un manifeste : relancer la
+commande après une interruption reprend là où elle s'était arrêtée, et retente
+les fichiers en erreur.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Set
+
+from app.services import worker_pool
+from app.services.compression import strip_compression_suffix
+from app.services.format_detector import detect_format
+
+SUPPORTED_SUFFIXES = {'.kml', '.kmz', '.gpx'}
+
+
+def iter_documents(directory: Path) -> Iterator[Path]:
+    """Parcourt récursivement un répertoire à la recherche de fichiers KML/GPX (éventuellement compressés)."""
+    for root, _, filenames in os.walk(directory):
+        for filename in sorted(filenames):
+            path = Path(root) / filename
+            if Path(strip_compression_suffix(filename)).suffix.lower() in SUPPORTED_SUFFIXES:
+                yield path
+
+
+def load_manifest(manifest_path: Path) -> Set[str]:
+    """Charge les empreintes des fichiers déjà traités."""
+    if not manifest_path.exists():
+        return set()
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def summarize(path: Path, document_id: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Construit la ligne de synthèse d'un document analysé."""
+    summary = {
+        'path': str(path),
+        'document_id': document_id,
+        'success': result.get('success', False),
+        'error': result.get('error'),
+    }
+    analyses = result.get('analyses', {})
+
+    trajectory = analyses.get('trajectory')
+    if trajectory:
+        summary.update({
+            'total_points': trajectory['basic_stats']['total_points'],
+            'total_traces': trajectory['basic_stats']['total_traces'],
+            'distance_km': trajectory['distance']['total_distance_km'],
+            'total_ascent_m': trajectory['elevation'].get('total_ascent'),
+            'total_descent_m': trajectory['elevation'].get('total_descent'),
+            'avg_speed_kmh': trajectory['speed'].get('avg_speed_kmh'),
+            'max_speed_kmh': trajectory['speed'].get('max_speed_kmh'),
+        })
+
+    advanced = analyses.get('advanced')
+    if advanced:
+        summary.update({
+            'stops_count': len(advanced['stops']),
+            'segments_count': len(advanced['segments']),
+            'acceleration_zones_count': len(advanced['acceleration_zones']),
+            'points_of_interest_count': len(advanced['points_of_interest']),
+        })
+    return summary
+
+
+def _process_file(path: str, analyses: List[str], display_mode: str) -> Dict[str, Any]:
+    """Lit, parse et analyse un fichier (exécuté dans un processus du pool)."""
+    with open(path, 'rb') as f:
+        content = f.read()
+    file_format = detect_format(content)
+    return worker_pool.analyze_document(analyses, content=content, file_format=file_format,
+                                        display_mode=display_mode)
+
+
+def _write_parquet(spool_path: Path, output_path: Path):
+    """Convertit le fichier NDJSON intermédiaire en Parquet (pyarrow requis)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    with open(spool_path, 'r', encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    pq.write_table(pa.Table.from_pylist(rows), output_path)
+
+
+class _Progress:
+    """Affichage de la progression sur la sortie d'erreur."""
+
+    def __init__(self, total: int, quiet: bool = False):
+        self.total = total
+        self.done = 0
+        self.errors = 0
+        self.quiet = quiet
+        self.start = time.monotonic()
+        self._last_render = 0.0
+
+    def update(self, success: bool):
+        self.done += 1
+        self.errors += 0 if success else 1
+        now = time.monotonic()
+        if not self.quiet and (now - self._last_render > 0.2 or self.done == self.total):
+            self._last_render = now
+            rate = self.done / max(now - self.start, 1e-9)
+            sys.stderr.write(f"\r[{self.done}/{self.total}] {rate:.1f} fichiers/s, {self.errors} erreur(s)")
+            if self.done == self.total:
+                sys.stderr.write('\n')
+            sys.stderr.flush()
+
+
+def analyze_directory(directory: Path, output_path: Path, analyses: List[str],
+                      output_format: str = 'ndjson', workers: Optional[int] = None,
+                      manifest_path: Optional[Path] = None, display_mode: str = 'double',
+                      quiet: bool = False) -> Dict[str, int]:
+    """
+    Analyse tous les fichiers KML/GPX d'un répertoire.
+
+    Args:
+        directory: Répertoire à parcourir
+        output_path: Fichier de sortie (NDJSON ou Parquet)
+        analyses: Analyses à exécuter (voir ``worker_pool.ANALYSES``)
+        output_format: 'ndjson' ou 'parquet'
+        workers: Nombre de processus (0 = traitement séquentiel)
+        manifest_path: Manifeste des empreintes déjà analysées avec succès
+        display_mode: Mode d'affichage passé au parser KML
+        quiet: Désactive l'affichage de la progression
+
+    Returns:
+        dict: Nombre de fichiers traités, ignorés (déjà faits) et en erreur
+    """
+    manifest_path = manifest_path or output_path.with_name(output_path.name + '.manifest')
+    # En Parquet, les lignes sont accumulées dans un NDJSON intermédiaire repris
+    # d'une exécution à l'autre puis converties en une fois à la fin
+    spool_path = output_path if output_format == 'ndjson' else output_path.with_name(output_path.name + '.ndjson')
+    done_hashes = load_manifest(manifest_path)
+
+    todo = []
+    skipped = 0
+    for path in iter_documents(directory):
+        with open(path, 'rb') as f:
+            document_id = hashlib.sha256(f.read()).hexdigest()
+        if document_id in done_hashes:
+            skipped += 1
+        else:
+            todo.append((path, document_id))
+
+    progress = _Progress(len(todo), quiet)
+    workers = (os.cpu_count() or 1) if workers is None else workers
+
+    with open(spool_path, 'a', encoding='utf-8') as output, \
+            open(manifest_path, 'a', encoding='utf-8') as manifest:
+
+        def record(path: Path, document_id: str, result: Dict[str, Any]):
+            output.write(json.dumps(summarize(path, document_id, result)) + '\n')
+            output.flush()
+            # Le manifeste n'est mis à jour qu'une fois la ligne de résultat écrite ;
+            # les fichiers en erreur n'y figurent pas et sont retentés à la reprise
+            if result.get('success'):
+                manifest.write(document_id + '\n')
+                manifest.flush()
+            progress.update(result.get('success', False))
+
+        if workers <= 0:
+            for path, document_id in todo:
+                try:
+                    result = _process_file(str(path), analyses, display_mode)
+                except Exception as e:  # noqa: BLE001
+                    result = {'success': False, 'error': str(e)}
+                record(path, document_id, result)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                queue = iter(todo)
+                in_flight = {}
+                while True:
+                    for path, document_id in queue:
+                        in_flight[pool.submit(_process_file, str(path), analyses, display_mode)] = (path, document_id)
+                        if len(in_flight) >= 2 * workers:
+                            break
+                    if not in_flight:
+                        break
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        path, document_id = in_flight.pop(future)
+                        try:
+                            result = future.result()
+                        except Exception as e:  # noqa: BLE001
+                            result = {'success': False, 'error': str(e)}
+                        record(path, document_id, result)
+
+    if output_format == 'parquet':
+        _write_parquet(spool_path, output_path)
+
+    return {'processed': progress.done, 'skipped': skipped, 'errors': progress.errors}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m app.cli', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    analyze = subparsers.add_parser('analyze', help='Analyser un répertoire de fichiers KML/GPX')
+    analyze.add_argument('directory', type=Path)
+    analyze.add_argument('--analyses', default='trajectory',
+                         help=f"Analyses séparées par des virgules ({', '.join(worker_pool.ANALYSES)})")
+    analyze.add_argument('--output', type=Path, default=Path('resultats.ndjson'))
+    analyze.add_argument('--format', choices=['ndjson', 'parquet'], default='ndjson')
+    analyze.add_argument('--workers', type=int, default=None,
+                         help='Nombre de processus (défaut : nombre de cœurs, 0 = séquentiel)')
+    analyze.add_argument('--manifest', type=Path, default=None,
+                         help='Manifeste de reprise (défaut : <output>.manifest)')
+    analyze.add_argument('--display-mode', choices=['double', 'simple'], default='double')
+    analyze.add_argument('--quiet', action='store_true')
+    analyze.add_argument('--verbose', action='store_true', help='Conserver les logs de debug des services')
+
+    args = parser.parse_args(argv)
+    if not args.verbose:
+        # Les services journalisent chaque point en DEBUG : trop bavard pour un traitement en masse
+        logging.getLogger().setLevel(logging.WARNING)
+
+    analyses = [a for a in args.analyses.split(',') if a]
+    unknown = [a for a in analyses if a not in worker_pool.ANALYSES]
+    if not analyses or unknown:
+        parser.error(f"analyses inconnues : {', '.join(unknown) or 'aucune'}")
+    if not args.directory.is_dir():
+        parser.error(f"répertoire introuvable : {args.directory}")
+    if args.format == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error("le format parquet nécessite le paquet 'pyarrow'")
+
+    stats = analyze_directory(args.directory, args.output, analyses, args.format, args.workers,
+                              args.manifest, args.display_mode, args.quiet)
+    print(json.dumps(stats))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,6 +6,18 @@ import os
 from pathlib import Path
 
 
+def default_worker_pool_size() -> int:
+    """Taille par défaut du pool de processus de parsing.
+
+    Les cœurs réellement attribués au processus sont partagés entre les
+    processus web (WEB_CONCURRENCY, comme gunicorn), chacun ayant son propre
+    pool ; le résultat est plafonné à 4 pour limiter la mémoire consommée.
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    web_workers = max(1, int(os.environ.get('WEB_CONCURRENCY', 1)))
+    return max(1, min(4, cpus // web_workers))
+
+
 class Config:
     """Configuration de base de l'application."""
     
@@ -21,6 +33,48 @@ class Config:
     SAMPLE_FILES_DIR = os.environ.get('SAMPLE_FILES_DIR') or '/app/sample_files'
     SAMPLE_FILES_FALLBACK = str(Path(__file__).parent.parent.parent)
     
+    # Configuration de la carte de densité (taille de cellule en degrés)
+    HEATMAP_CELL_SIZE = float(os.environ.get('HEATMAP_CELL_SIZE', 0.01))
+    
+    # Pool de processus pour le parsing parallèle (0 = traitement dans la requête)
+    WORKER_POOL_SIZE = int(os.environ.get('WORKER_POOL_SIZE', default_worker_pool_size()))
+    WORKER_POOL_WARMUP = True
+    WORKER_TASK_TIMEOUT = float(os.environ.get('WORKER_TASK_TIMEOUT', 60))
+    
+    # Traitements en arrière-plan : taille au-delà de laquelle un upload devient un job
+    ASYNC_UPLOAD_THRESHOLD = int(os.environ.get('ASYNC_UPLOAD_THRESHOLD', 2 * 1024 * 1024))
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    JOB_MAX_PENDING = int(os.environ.get('JOB_MAX_PENDING', 16))
+    JOB_RESULT_TTL = int(os.environ.get('JOB_RESULT_TTL', 600))  # secondes
+    
+    # Taille maximale d'un document compressé (gzip/zstd) une fois décompressé
+    MAX_DECOMPRESSED_SIZE = int(os.environ.get('MAX_DECOMPRESSED_SIZE', 512 * 1024 * 1024))
+    
+    # Uploads par morceaux (fichiers au-delà de MAX_CONTENT_LENGTH)
+    CHUNKED_UPLOAD_MAX_SIZE = int(os.environ.get('CHUNKED_UPLOAD_MAX_SIZE', 1024 ** 3))
+    CHUNKED_UPLOAD_TTL = int(os.environ.get('CHUNKED_UPLOAD_TTL', 24 * 3600))  # secondes
+    
+    # Métriques Prometheus : répertoire partagé entre processus (vide = processus unique)
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))  # secondes
+    
+    # Traçage des requêtes (en-tête Server-Timing) : part des requêtes tracées, seuil de journalisation
+    TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 0.1))
+    TRACE_SLOW_REQUEST_MS = float(os.environ.get('TRACE_SLOW_REQUEST_MS', 2000))
+    
+    # Profilage à la demande (désactivé sans jeton d'administration)
+    PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN')
+    PROFILE_HISTORY = int(os.environ.get('PROFILE_HISTORY', 20))
+    
+    # Suivi mémoire par requête et par étape (tracemalloc, désactivé par défaut : il ralentit les allocations)
+    MEMORY_TRACKING = os.environ.get('MEMORY_TRACKING', '0').lower() in ('1', 'true', 'yes')
+    # Pic (Mo) au-delà duquel les principaux sites d'allocation sont journalisés (vide = jamais)
+    MEMORY_ALERT_MB = float(os.environ['MEMORY_ALERT_MB']) if os.environ.get('MEMORY_ALERT_MB') else None
+    MEMORY_TRACKING_FRAMES = int(os.environ.get('MEMORY_TRACKING_FRAMES', 1))
+    
+    # Implémentation des analyses : 'fast' (vectorisée) ou 'reference' (Python d'origine)
+    ANALYSIS_BACKEND = os.environ.get('ANALYSIS_BACKEND', 'fast')
+    
     @staticmethod
     def init_app(app):
         """Initialisation spécifique à l'application."""
@@ -45,6 +99,7 @@ class TestingConfig(Config):
     TESTING = True
     WTF_CSRF_ENABLED = False
     UPLOAD_FOLDER = 'test_uploads'
+    WORKER_POOL_SIZE = 0
 
 
 config = {
@@ -0,0 +1,58 @@
+"""
+Choix de l'implémentation des analyses et du parsing des coordonnées.
+
+``reference`` : implémentations Python d'origine (distances géodésiques
+calculées point par point avec geopy), conservées comme référence.
+``fast`` : implémentations vectorisées de ``fast_analysis``, vérifiées contre
+la référence par ``benchmarks.differential``.
+
+Le backend par défaut vient de ``ANALYSIS_BACKEND`` (lu à l'import, donc
+aussi dans les processus du pool) ; ``use_backend`` le remplace le temps
+d'un bloc, dans le contexte courant uniquement.
+"""
+
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+BACKENDS = ('fast', 'reference')
+
+
+def _validate(name: str) -> str:
+    if name not in BACKENDS:
+        raise ValueError(f"Backend d'analyse inconnu : {name!r} (attendu : {', '.join(BACKENDS)})")
+    return name
+
+
+_default = _validate(os.environ.get('ANALYSIS_BACKEND', 'fast'))
+_override: ContextVar[Optional[str]] = ContextVar('analysis_backend', default=None)
+
+
+def current() -> str:
+    return _override.get() or _default
+
+
+def is_fast() -> bool:
+    return (_override.get() or _default) == 'fast'
+
+
+def configure(name: str):
+    """Change le backend par défaut de tout le processus."""
+    global _default
+    _default = _validate(name)
+
+
+@contextmanager
+def use_backend(name: str):
+    """Utilise ``name`` pour les analyses exécutées dans le bloc."""
+    token = _override.set(_validate(name))
+    try:
+        yield
+    finally:
+        _override.reset(token)
+
+
+def init_app(app):
+    """Applique le backend configuré pour l'application."""
+    configure(app.config.get('ANALYSIS_BACKEND', _default))
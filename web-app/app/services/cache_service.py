@@ -1,32 +1,302 @@
 import hashlib
-from typing import Dict, Any, Tuple
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from typing import Dict, Any, Iterator, Optional, Tuple, Union
 from .kml_parser import KMLParser
 from .gpx_parser import GPXParser
+from .heatmap_service import density_grid
+from .kmz_reader import KMZArchive
+from .format_detector import detect_format
+from .kml_folder_filter import FolderFilter
+from .progress import ProgressTracker, XMLSource, source_size
+from .file_service import FileService
+from . import metrics
 
 # Simple in-memory cache keyed by a tuple (type, hash, display_mode)
 _parse_cache: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+# Document id (content hash) -> cache key of its latest successful parse
+_document_index: Dict[str, Tuple[str, str, str]] = {}
+# File identity (path, mtime, size) -> (content hash, format) of files parsed from disk
+_file_hashes: Dict[Tuple[str, int, int], Tuple[str, str]] = {}
+# Document id -> KMZ archive, kept (compressed) to serve its embedded resources.
+# Least recently used archives are dropped beyond MAX_ARCHIVE_BYTES (the most
+# recent one is always kept).
+MAX_ARCHIVE_BYTES = 256 * 1024 * 1024
+_archives: "OrderedDict[str, bytes]" = OrderedDict()
+_archive_bytes = 0
+# Cache key -> serialized size of the result, computed on first metrics scrape
+_result_sizes: Dict[Tuple[str, str, str], int] = {}
 
 
-def _hash_content(content: str) -> str:
-    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+def _hash_content(content: Union[str, bytes, memoryview]) -> str:
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
 
 
-def parse_kml_cached(content: str, display_mode: str = "double") -> Dict[str, Any]:
-    """Parse KML content using a cache to avoid duplicate work."""
-    key = ("kml", _hash_content(content), display_mode)
-    if key not in _parse_cache:
-        _parse_cache[key] = KMLParser.parse_kml_coordinates(content, display_mode)
+def _variant(display_mode: str, folders: Optional[FolderFilter] = None) -> str:
+    """Last cache key component: the display mode, plus the folder filter if any."""
+    return f"{display_mode}|{folders.cache_token()}" if folders else display_mode
+
+
+def cache_key(content: XMLSource, file_format: str, display_mode: str = "double",
+              content_hash: Optional[str] = None,
+              folders: Optional[FolderFilter] = None) -> Tuple[str, str, str]:
+    """Build the cache key of a document (GPX output ignores the display mode).
+
+    ``content_hash`` skips hashing when the digest is already known, e.g. for
+    spooled files hashed while they were uploaded. Each folder filter gets its
+    own entry, next to the full parse.
+    """
+    variant = "" if file_format == "gpx" else _variant(display_mode, folders)
+    return (file_format, content_hash or _hash_content(content), variant)
+
+
+def get_cached(key: Tuple[str, str, str]) -> Optional[Dict[str, Any]]:
+    """Return a cached parse result, or None when the document was never parsed."""
+    result = _parse_cache.get(key)
+    (metrics.CACHE_MISSES if result is None else metrics.CACHE_HITS).inc()
+    return result
+
+
+def _is_cached(key: Tuple[str, str, str]) -> bool:
+    """Membership test that feeds the cache hit/miss counters."""
+    cached = key in _parse_cache
+    (metrics.CACHE_HITS if cached else metrics.CACHE_MISSES).inc()
+    return cached
+
+
+def _timed_parse(file_format: str, content, parse, *args) -> Dict[str, Any]:
+    """Run a full parse and record its duration by format and document size."""
+    start = time.perf_counter()
+    result = parse(*args)
+    size = len(content) if hasattr(content, '__len__') else source_size(content)
+    metrics.observe_parse(file_format, size, time.perf_counter() - start)
+    return result
+
+
+def store_result(key: Tuple[str, str, str], result: Dict[str, Any],
+                 content: Optional[bytes] = None) -> Dict[str, Any]:
+    """Store a parse result computed elsewhere (e.g. in a worker process).
+
+    ``content`` is the raw document, needed to keep KMZ archives around.
+    """
+    return _store(key, result, content)
+
+
+def _store(key: Tuple[str, str, str], result: Dict[str, Any],
+           content: Optional[bytes] = None) -> Dict[str, Any]:
+    """Store a fresh parse result and feed the density heatmap.
+
+    Folder-filtered results are partial views of a document: they are cached
+    but neither indexed as the document nor added to the heatmap.
+    """
+    _parse_cache[key] = result
+    if result.get('success') and "|" not in key[2]:
+        result['document_id'] = key[1]
+        _document_index[key[1]] = key
+        if key[0] == "kmz" and content is not None:
+            _keep_archive(key[1], bytes(content))
+        density_grid.add_document(key[1], result.get('features', []))
+    return result
+
+
+def _keep_archive(document_id: str, archive: bytes) -> None:
+    """Keep a KMZ archive, evicting the least recently used ones past the size cap."""
+    global _archive_bytes
+    previous = _archives.pop(document_id, None)
+    if previous is not None:
+        _archive_bytes -= len(previous)
+    _archives[document_id] = archive
+    _archive_bytes += len(archive)
+    while _archive_bytes > MAX_ARCHIVE_BYTES and len(_archives) > 1:
+        _, evicted = _archives.popitem(last=False)
+        _archive_bytes -= len(evicted)
+
+
+def get_document(document_id: str) -> Optional[Dict[str, Any]]:
+    """Return the parse result of a previously uploaded document by its id."""
+    key = _document_index.get(document_id)
+    return _parse_cache.get(key) if key else None
+
+
+def parse_kml_cached(content: XMLSource, display_mode: str = "double",
+                     progress: Optional[ProgressTracker] = None,
+                     content_hash: Optional[str] = None,
+                     folders: Optional[FolderFilter] = None) -> Dict[str, Any]:
+    """Parse KML content using a cache to avoid duplicate work.
+
+    ``content`` may also be a binary file object when ``content_hash`` is given.
+    ``folders`` restricts the parse to the selected folders.
+    """
+    key = ("kml", content_hash or _hash_content(content), _variant(display_mode, folders))
+    if not _is_cached(key):
+        _store(key, _timed_parse("kml", content, KMLParser.parse_kml_coordinates,
+                                 content, display_mode, progress, folders))
+    return _parse_cache[key]
+
+
+def parse_gpx_cached(content: XMLSource, progress: Optional[ProgressTracker] = None,
+                     content_hash: Optional[str] = None) -> Dict[str, Any]:
+    """Parse GPX content using a cache to avoid duplicate work.
+
+    ``content`` may also be a binary file object when ``content_hash`` is given.
+    """
+    key = ("gpx", content_hash or _hash_content(content), "")
+    if not _is_cached(key):
+        _store(key, _timed_parse("gpx", content, GPXParser.parse_gpx_coordinates, content, progress))
     return _parse_cache[key]
 
 
-def parse_gpx_cached(content: str) -> Dict[str, Any]:
-    """Parse GPX content using a cache to avoid duplicate work."""
-    key = ("gpx", _hash_content(content), "")
-    if key not in _parse_cache:
-        _parse_cache[key] = GPXParser.parse_gpx_coordinates(content)
+def parse_kmz_cached(content: bytes, display_mode: str = "double",
+                     progress: Optional[ProgressTracker] = None,
+                     content_hash: Optional[str] = None,
+                     folders: Optional[FolderFilter] = None) -> Dict[str, Any]:
+    """Parse a KMZ archive using a cache to avoid duplicate work.
+
+    ``content`` is the archive as bytes or a memory-mapped buffer; it is kept
+    so that the resources it embeds can be served later.
+    """
+    key = ("kmz", content_hash or _hash_content(content), _variant(display_mode, folders))
+    if not _is_cached(key):
+        _store(key, _timed_parse("kmz", content, KMLParser.parse_kmz_coordinates,
+                                 content, display_mode, progress, folders), content)
     return _parse_cache[key]
 
 
+def parse_document_cached(content: XMLSource, file_format: str, display_mode: str = "double",
+                          progress: Optional[ProgressTracker] = None,
+                          content_hash: Optional[str] = None,
+                          folders: Optional[FolderFilter] = None) -> Dict[str, Any]:
+    """Parse a KML, KMZ or GPX document depending on its format, using the cache.
+
+    GPX has no folders: ``folders`` only applies to KML and KMZ documents.
+    """
+    if file_format == "gpx":
+        return parse_gpx_cached(content, progress, content_hash)
+    if file_format == "kmz":
+        return parse_kmz_cached(content, display_mode, progress, content_hash, folders)
+    return parse_kml_cached(content, display_mode, progress, content_hash, folders)
+
+
+def get_document_archive(document_id: str) -> Optional[KMZArchive]:
+    """Open the KMZ archive of a previously parsed document (None if not a KMZ)."""
+    archive = _archives.get(document_id)
+    if archive is None:
+        return None
+    _archives.move_to_end(document_id)
+    return KMZArchive(archive)
+
+
+def parse_file_cached(path: str, file_format: Optional[str] = None, display_mode: str = "double",
+                      progress: Optional[ProgressTracker] = None,
+                      folders: Optional[FolderFilter] = None) -> Dict[str, Any]:
+    """Parse a file from disk through a memory map, using the cache.
+
+    Files are identified by ``(path, mtime, size)``: a repeat load of an
+    unchanged file is served from the cache without reading or hashing it.
+    The format is sniffed from the content when ``file_format`` is omitted.
+    """
+    stat = os.stat(path)
+    file_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    known = _file_hashes.get(file_key)
+    if known is not None:
+        content_hash, file_format = known[0], file_format or known[1]
+        cached = _parse_cache.get(cache_key(None, file_format, display_mode, content_hash, folders))
+        if cached is not None:
+            metrics.CACHE_HITS.inc()
+            return cached
+
+    with FileService.map_file(path) as content:
+        file_format = file_format or detect_format(content)
+        content_hash = _hash_content(content) if known is None else known[0]
+        result = parse_document_cached(content, file_format, display_mode, progress, content_hash, folders)
+    _file_hashes[file_key] = (content_hash, file_format)
+    return result
+
+
+def _iter_result_records(result: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Split a full parse result into streaming records (metadata last)."""
+    if not result['success']:
+        yield {'type': 'error', 'error': result['error']}
+        return
+    points = iter(result['points'])
+    for feature in result['features']:
+        yield {'type': 'feature', 'feature': feature}
+        # Markers map one-to-one, in order, to the formatted points
+        if feature['type'] == 'marker':
+            yield {'type': 'point', 'point': next(points)}
+    yield {'type': 'metadata', 'metadata': result['metadata'],
+           'total_points': result['total_points'], 'document_id': result.get('document_id')}
+
+
+def stream_document_cached(content: XMLSource, file_format: str,
+                           display_mode: str = "double",
+                           folders: Optional[FolderFilter] = None) -> Iterator[Dict[str, Any]]:
+    """Parse a document and yield one record per feature as soon as it is available.
+
+    KML documents are parsed incrementally (features are yielded while the
+    parser advances) and the assembled result is cached once complete. GPX
+    and KMZ documents, folder-filtered parses and cache hits are replayed
+    from the full parse result.
+    """
+    key = cache_key(content, file_format, display_mode, folders=folders)
+    result = _parse_cache.get(key)
+    if result is not None:
+        metrics.CACHE_HITS.inc()
+    if result is not None or file_format != "kml" or folders:
+        yield from _iter_result_records(
+            result or parse_document_cached(content, file_format, display_mode, folders=folders))
+        return
+
+    metrics.CACHE_MISSES.inc()
+    features, points = [], []
+    try:
+        for kind, data in KMLParser.iter_parse(content):
+            if kind == 'metadata':
+                result = _store(key, {'success': True, 'features': features, 'points': points,
+                                      'metadata': data, 'total_points': len(points)})
+                yield {'type': 'metadata', 'metadata': data,
+                       'total_points': len(points), 'document_id': result['document_id']}
+                return
+            features.append(data)
+            yield {'type': 'feature', 'feature': data}
+            if data['type'] == 'marker':
+                point = KMLParser._build_point(data, len(points), display_mode)
+                points.append(point)
+                yield {'type': 'point', 'point': point}
+    except ET.ParseError as e:
+        yield {'type': 'error', 'error': f'Erreur de parsing XML: {str(e)}'}
+    except (ValueError, AttributeError, TypeError) as e:
+        yield {'type': 'error', 'error': f'Erreur lors du traitement: {str(e)}'}
+
+
+def cache_size() -> int:
+    """Number of parse results held in the cache."""
+    return len(_parse_cache)
+
+
+def store_size_bytes() -> int:
+    """Estimated memory held by cached documents: serialized results plus KMZ archives."""
+    total = 0
+    for key, result in list(_parse_cache.items()):
+        size = _result_sizes.get(key)
+        if size is None:
+            size = _result_sizes[key] = len(json.dumps(result, default=str))
+        total += size
+    return total + _archive_bytes
+
+
 def clear_cache() -> None:
     """Clear the parsing cache (mainly for tests)."""
+    global _archive_bytes
+    metrics.CACHE_EVICTIONS.inc(len(_parse_cache))
     _parse_cache.clear()
+    _result_sizes.clear()
+    _document_index.clear()
+    _file_hashes.clear()
+    _archives.clear()
+    _archive_bytes = 0
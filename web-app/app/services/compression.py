@@ -0,0 +1,137 @@
+"""
+Décompression transparente des documents KML/GPX compressés (gzip, zstd).
+La compression est détectée par les octets magiques du contenu, pas par
+l'extension ; le document est décompressé en flux, sans jamais être
+matérialisé en entier, et sa taille décompressée est bornée.
+"""
+
+import gzip
+import io
+import mmap
+import zlib
+from typing import Optional
+
+try:  # Backend optionnel
+    import zstandard
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    zstandard = None
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# Suffixes de fichiers compressés acceptés en plus de l'extension du format
+COMPRESSED_SUFFIXES = ('.gz', '.gzip', '.zst', '.zstd')
+
+# Taille décompressée maximale par défaut (protection contre les bombes de décompression)
+DEFAULT_MAX_DECOMPRESSED_SIZE = 512 * 1024 * 1024
+
+_max_decompressed_size = DEFAULT_MAX_DECOMPRESSED_SIZE
+
+# Erreurs levées par les flux de décompression sur un contenu corrompu
+_STREAM_ERRORS = (OSError, EOFError, zlib.error) + ((zstandard.ZstdError,) if zstandard else ())
+
+
+class DecompressionError(ValueError):
+    """Levée lorsqu'un document compressé est invalide ou trop volumineux."""
+
+
+def detect_compression(head: bytes) -> Optional[str]:
+    """Identifie la compression d'un contenu à partir de ses premiers octets."""
+    if head.startswith(GZIP_MAGIC):
+        return 'gzip'
+    if head.startswith(ZSTD_MAGIC):
+        return 'zstd'
+    return None
+
+
+def strip_compression_suffix(filename: str) -> str:
+    """Retire le suffixe de compression d'un nom de fichier (trace.kml.gz -> trace.kml)."""
+    lowered = filename.lower()
+    for suffix in COMPRESSED_SUFFIXES:
+        if lowered.endswith(suffix):
+            return filename[:-len(suffix)]
+    return filename
+
+
+def peek(source, size: int = 4) -> bytes:
+    """Lit les premiers octets d'un contenu sans consommer le flux."""
+    if isinstance(source, str):
+        return b''
+    # Un fichier projeté en mémoire a aussi read(), mais se découpe sans être consommé
+    if not hasattr(source, 'read') or isinstance(source, mmap.mmap):
+        return bytes(source[:size])
+    if hasattr(source, 'peek'):
+        return source.peek(size)[:size]
+    if hasattr(source, 'seekable') and source.seekable():
+        position = source.tell()
+        head = source.read(size)
+        source.seek(position)
+        return head
+    return b''
+
+
+class _BoundedReader(io.RawIOBase):
+    """Flux décompressé dont la taille totale est bornée."""
+
+    def __init__(self, stream, max_size: int):
+        self._stream = stream
+        self._max_size = max_size
+        self._consumed = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        try:
+            data = self._stream.read(size if size is not None and size >= 0 else -1)
+        except _STREAM_ERRORS as exc:
+            raise DecompressionError(f'Contenu compressé invalide : {exc}') from exc
+        self._consumed += len(data)
+        if self._consumed > self._max_size:
+            raise DecompressionError(
+                f'Document décompressé trop volumineux (maximum {self._max_size} octets)'
+            )
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        self._stream.close()
+        super().close()
+
+
+def decompress_source(source, max_size: Optional[int] = None):
+    """Retourne un flux décompressé si le contenu est compressé, sinon le contenu tel quel.
+
+    Args:
+        source: Texte, octets, buffer ou fichier binaire ouvert
+        max_size: Taille décompressée maximale (configuration de l'application par défaut)
+
+    Raises:
+        DecompressionError: si la compression zstd est demandée sans le paquet 'zstandard'
+    """
+    compression = detect_compression(peek(source))
+    if compression is None:
+        return source
+
+    fileobj = source if hasattr(source, 'read') else io.BytesIO(source)
+    if compression == 'gzip':
+        stream = gzip.GzipFile(fileobj=fileobj, mode='rb')
+    elif zstandard is None:
+        raise DecompressionError("Compression zstd non supportée (paquet 'zstandard' absent)")
+    else:
+        stream = zstandard.ZstdDecompressor().stream_reader(fileobj)
+    return _BoundedReader(stream, _max_decompressed_size if max_size is None else max_size)
+
+
+def configure(max_decompressed_size: int):
+    global _max_decompressed_size
+    _max_decompressed_size = max_decompressed_size
+
+
+def init_app(app):
+    """Applique la limite de taille décompressée de l'application."""
+    configure(app.config.get('MAX_DECOMPRESSED_SIZE', DEFAULT_MAX_DECOMPRESSED_SIZE))
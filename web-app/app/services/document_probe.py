@@ -0,0 +1,208 @@
+"""
+Sondage rapide d'un document KML/KMZ/GPX sans parsing complet.
+Le document est lu en flux : seules les géométries, coordonnées et dates
+sont examinées, les descriptions et styles sont ignorés et chaque élément
+est libéré dès sa fermeture. Le résultat (comptages, emprise, période)
+permet de décider d'un traitement avant d'en payer le coût.
+"""
+
+import time
+import xml.etree.ElementTree as ET
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from app.services.compression import decompress_source
+from app.services.format_detector import detect_format
+from app.services.kmz_reader import KMZArchive
+from app.services.progress import iter_chunks, source_size
+
+KML_NS = '{http://www.opengis.net/kml/2.2}'
+GX_NS = '{http://www.google.com/kml/ext/2.2}'
+GPX_NS = '{http://www.topografix.com/GPX/1/1}'
+
+# Géométries KML comptées par type
+_KML_GEOMETRIES = {
+    KML_NS + 'Point': 'Point',
+    KML_NS + 'LineString': 'LineString',
+    KML_NS + 'Polygon': 'Polygon',
+    KML_NS + 'MultiGeometry': 'MultiGeometry',
+    GX_NS + 'Track': 'Track',
+    GX_NS + 'MultiTrack': 'MultiTrack',
+}
+_KML_TIMES = {KML_NS + 'when', GX_NS + 'when', KML_NS + 'begin', KML_NS + 'end'}
+
+# Coût du parsing complet par point, mesuré sur des traces synthétiques (ordre de grandeur)
+PARSE_SECONDS_PER_POINT = {'kml': 5e-5, 'kmz': 5e-5, 'gpx': 2e-4}
+
+
+class _Extent:
+    """Emprise et période accumulées au fil du document."""
+
+    def __init__(self):
+        self.min_lon = self.min_lat = float('inf')
+        self.max_lon = self.max_lat = float('-inf')
+        self.start: Optional[str] = None
+        self.end: Optional[str] = None
+        self.points = 0
+
+    def add_point(self, lon: float, lat: float):
+        self.points += 1
+        self.min_lon = min(self.min_lon, lon)
+        self.max_lon = max(self.max_lon, lon)
+        self.min_lat = min(self.min_lat, lat)
+        self.max_lat = max(self.max_lat, lat)
+
+    def add_lonlat(self, lons: np.ndarray, lats: np.ndarray):
+        if lons.size:
+            self.min_lon = min(self.min_lon, float(lons.min()))
+            self.max_lon = max(self.max_lon, float(lons.max()))
+            self.min_lat = min(self.min_lat, float(lats.min()))
+            self.max_lat = max(self.max_lat, float(lats.max()))
+
+    def add_time(self, value: Optional[str]):
+        # Horodatages ISO 8601 : l'ordre lexicographique suit l'ordre chronologique
+        if value:
+            value = value.strip()
+            if self.start is None or value < self.start:
+                self.start = value
+            if self.end is None or value > self.end:
+                self.end = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        bbox = None
+        if self.min_lon <= self.max_lon:
+            bbox = [self.min_lon, self.min_lat, self.max_lon, self.max_lat]
+        time_span = {'start': self.start, 'end': self.end} if self.start else None
+        return {'total_points': self.points, 'bbox': bbox, 'time_span': time_span}
+
+
+def _parse_coordinates(text: str) -> np.ndarray:
+    """Convertit un bloc de coordonnées KML "lon,lat[,alt] ..." en tableau (n, 2)."""
+    tuples = text.split()
+    if not tuples:
+        return np.empty((0, 2))
+    dims = tuples[0].count(',') + 1
+    values = np.fromstring(text.replace(',', ' '), sep=' ')
+    if dims >= 2 and values.size == len(tuples) * dims:
+        return values.reshape(-1, dims)[:, :2]
+    # Dimensions hétérogènes : conversion tuple par tuple
+    rows = [t.split(',')[:2] for t in tuples if t.count(',') >= 1]
+    return np.array(rows, dtype=float).reshape(-1, 2)
+
+
+def _probe_kml(stream) -> Dict[str, Any]:
+    counts = {'placemarks': 0}
+    extent = _Extent()
+    parser = ET.XMLPullParser(events=('end',))
+
+    def handle_events():
+        for _, elem in parser.read_events():
+            tag = elem.tag
+            if tag == KML_NS + 'coordinates':
+                text = (elem.text or '').strip()
+                if text and not any(c.isspace() for c in text):
+                    # Un seul tuple (Point) : conversion directe, sans numpy
+                    parts = text.split(',')
+                    if len(parts) >= 2:
+                        extent.add_point(float(parts[0]), float(parts[1]))
+                else:
+                    coords = _parse_coordinates(text)
+                    extent.points += len(coords)
+                    extent.add_lonlat(coords[:, 0], coords[:, 1])
+            elif tag == GX_NS + 'coord':
+                parts = (elem.text or '').split()
+                if len(parts) >= 2:
+                    extent.add_point(float(parts[0]), float(parts[1]))
+            elif tag in _KML_TIMES:
+                extent.add_time(elem.text)
+            elif tag in _KML_GEOMETRIES:
+                name = _KML_GEOMETRIES[tag]
+                counts[name] = counts.get(name, 0) + 1
+            elif tag == KML_NS + 'Placemark':
+                counts['placemarks'] += 1
+                elem.clear()
+            elif tag in (KML_NS + 'description', KML_NS + 'Style', KML_NS + 'StyleMap',
+                         KML_NS + 'ExtendedData'):
+                elem.clear()
+
+    for chunk in iter_chunks(stream):
+        parser.feed(chunk)
+        handle_events()
+    parser.close()
+    handle_events()
+    return {'counts': counts, **extent.to_dict()}
+
+
+def _probe_gpx(stream) -> Dict[str, Any]:
+    counts = {'waypoints': 0, 'routes': 0, 'tracks': 0, 'track_points': 0, 'route_points': 0}
+    point_tags = {GPX_NS + 'wpt': 'waypoints', GPX_NS + 'trkpt': 'track_points', GPX_NS + 'rtept': 'route_points'}
+    extent = _Extent()
+    lons, lats = [], []
+    parser = ET.XMLPullParser(events=('end',))
+
+    def handle_events():
+        for _, elem in parser.read_events():
+            tag = elem.tag
+            if tag in point_tags:
+                counts[point_tags[tag]] += 1
+                lat, lon = elem.get('lat'), elem.get('lon')
+                if lat is not None and lon is not None:
+                    lats.append(float(lat))
+                    lons.append(float(lon))
+                elem.clear()
+            elif tag == GPX_NS + 'time':
+                extent.add_time(elem.text)
+            elif tag == GPX_NS + 'trk':
+                counts['tracks'] += 1
+                elem.clear()
+            elif tag == GPX_NS + 'rte':
+                counts['routes'] += 1
+                elem.clear()
+
+    for chunk in iter_chunks(stream):
+        parser.feed(chunk)
+        handle_events()
+    parser.close()
+    handle_events()
+
+    extent.points = len(lons)
+    extent.add_lonlat(np.array(lons), np.array(lats))
+    return {'counts': counts, **extent.to_dict()}
+
+
+def probe_document(source) -> Dict[str, Any]:
+    """Sonde un document et retourne ses comptages, son emprise et sa période.
+
+    Args:
+        source: Octets, buffer ou fichier binaire ouvert (éventuellement compressé)
+
+    Returns:
+        dict: format, taille, comptages par type de géométrie, nombre de points,
+        emprise [min_lon, min_lat, max_lon, max_lat], période et coût estimé
+        du parsing complet
+
+    Raises:
+        UnsupportedFormatError: si le contenu n'est pas reconnu
+        ET.ParseError: si le document est mal formé
+    """
+    start = time.perf_counter()
+    file_format = detect_format(source)
+    size = source_size(source)
+
+    if file_format == 'kmz':
+        with KMZArchive(source) as archive, archive.open_document() as document:
+            result = _probe_kml(document)
+    elif file_format == 'gpx':
+        result = _probe_gpx(decompress_source(source))
+    else:
+        result = _probe_kml(decompress_source(source))
+
+    return {
+        'success': True,
+        'format': file_format,
+        'size_bytes': size,
+        **result,
+        'estimated_parse_seconds': round(result['total_points'] * PARSE_SECONDS_PER_POINT[file_format], 3),
+        'probe_seconds': round(time.perf_counter() - start, 4)
+    }
@@ -0,0 +1,298 @@
+"""
+Implémentations vectorisées (numpy) des analyses de trajectoire coûteuses.
+
+Chaque fonction reproduit le résultat de l'implémentation de référence de
+``TrajectoryAnalyzer`` / ``KMLParser`` (mêmes clés, mêmes types, mêmes
+arrondis) ; les sommes sont faites dans le même ordre que la référence pour
+rester identiques au bit près. Seules les distances diffèrent : la formule
+inverse de Vincenty sur l'ellipsoïde WGS-84, vectorisée, remplace l'appel
+à geopy (Karney) pour chaque paire de points, à moins d'un micromètre près
+sur des segments de trace. Une fonction qui retourne ``None`` laisse la
+main à la référence (données hétérogènes qu'elle ne couvre pas).
+"""
+
+import warnings
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from geopy.distance import geodesic
+
+# Ellipsoïde WGS-84 (celui de geopy par défaut)
+_A = 6378137.0
+_F = 1 / 298.257223563
+_B = _A * (1 - _F)
+
+_VINCENTY_ITERATIONS = 100
+_VINCENTY_TOLERANCE = 1e-12
+
+# En deçà, la conversion numpy coûte plus que la boucle de référence (un Placemark par point)
+PARSE_MIN_POINTS = 32
+
+
+def geodesic_distances(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Distances (m) entre paires de points, formule inverse de Vincenty vectorisée.
+
+    Les paires qui ne convergent pas (points quasi antipodaux) sont calculées
+    avec geopy.
+    """
+    L = np.radians(lon2 - lon1)
+    U1 = np.arctan((1 - _F) * np.tan(np.radians(lat1)))
+    U2 = np.arctan((1 - _F) * np.tan(np.radians(lat2)))
+    sin_u1, cos_u1 = np.sin(U1), np.cos(U1)
+    sin_u2, cos_u2 = np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    converged = np.zeros(L.shape, dtype=bool)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for _ in range(_VINCENTY_ITERATIONS):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.sqrt((cos_u2 * sin_lam) ** 2 + (cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam) ** 2)
+            cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(sin_sigma == 0, 0.0, cos_u1 * cos_u2 * sin_lam / sin_sigma)
+            cos2_alpha = 1 - sin_alpha ** 2
+            # Lignes équatoriales : cos2_alpha nul
+            cos_2sigma_m = np.where(cos2_alpha == 0, 0.0, cos_sigma - 2 * sin_u1 * sin_u2 / cos2_alpha)
+            C = _F / 16 * cos2_alpha * (4 + _F * (4 - 3 * cos2_alpha))
+            previous = lam
+            lam = L + (1 - C) * _F * sin_alpha * (
+                sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)))
+            converged = np.abs(lam - previous) < _VINCENTY_TOLERANCE
+            if converged.all():
+                break
+
+        u2 = cos2_alpha * (_A ** 2 - _B ** 2) / _B ** 2
+        A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+        B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+        delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+            - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)))
+        distances = _B * A * (sigma - delta_sigma)
+
+    distances = np.where(sin_sigma == 0, 0.0, distances)
+    for index in np.flatnonzero(~converged | ~np.isfinite(distances)):
+        distances[index] = geodesic((lat1[index], lon1[index]), (lat2[index], lon2[index])).meters
+    return distances
+
+
+def pair_distances(coordinates: List[List[float]]) -> np.ndarray:
+    """Distances entre points consécutifs (0 si l'un des deux n'a pas de position)."""
+    if len(coordinates) < 2:
+        return np.zeros(0)
+    complete = np.array([len(coord) >= 2 for coord in coordinates])
+    lat = np.array([coord[0] if len(coord) >= 2 else 0.0 for coord in coordinates], dtype=float)
+    lon = np.array([coord[1] if len(coord) >= 2 else 0.0 for coord in coordinates], dtype=float)
+    distances = geodesic_distances(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    distances[~(complete[:-1] & complete[1:])] = 0.0
+    return distances
+
+
+def _sequential_sum(values: np.ndarray) -> float:
+    """Somme dans l'ordre des éléments (comme une boucle Python), 0.0 si vide."""
+    return float(np.cumsum(values)[-1]) if values.size else 0.0
+
+
+def elevation_profile(coordinates: List[List[float]]) -> Dict[str, Any]:
+    """Équivalent de ``TrajectoryAnalyzer.calculate_elevation_profile``."""
+    empty = {
+        "total_ascent": 0.0,
+        "total_descent": 0.0,
+        "min_elevation": 0.0,
+        "max_elevation": 0.0,
+        "elevation_gain": 0.0,
+        "elevation_profile": [],
+    }
+    if len(coordinates) < 2:
+        return empty
+
+    elevations = [coord[2] if len(coord) > 2 else 0 for coord in coordinates]
+    valid_elevations = [alt for coord, alt in zip(coordinates, elevations)
+                        if len(coord) > 2 and alt is not None and -1000 < alt < 10000]
+    if not valid_elevations:
+        return empty
+
+    if len(valid_elevations) >= 100:
+        window_size = 31
+        smoothed = np.convolve(valid_elevations, np.ones(window_size) / window_size, mode='same')
+    else:
+        smoothed = np.asarray(valid_elevations, dtype=float)
+    diffs = np.diff(smoothed)
+    total_ascent = _sequential_sum(diffs[diffs > 0])
+    total_descent = _sequential_sum(-diffs[diffs < 0])
+
+    cumulative = np.concatenate(([0.0], np.cumsum(pair_distances(coordinates))))
+    elevation_profile = [{"distance": distance, "elevation": elevation, "index": index}
+                         for index, (distance, elevation) in enumerate(zip(cumulative.tolist(), elevations))]
+
+    return {
+        "total_ascent": round(total_ascent, 1),
+        "total_descent": round(total_descent, 1),
+        "min_elevation": round(min(valid_elevations), 1),
+        "max_elevation": round(max(valid_elevations), 1),
+        "elevation_gain": round(max(valid_elevations) - min(valid_elevations), 1),
+        "elevation_profile": elevation_profile,
+    }
+
+
+def _slope_type(slope: float) -> str:
+    magnitude = abs(slope)
+    if magnitude <= 5:
+        return "flat"
+    if magnitude <= 15:
+        return "gentle"
+    if magnitude <= 30:
+        return "moderate"
+    return "steep"
+
+
+def terrain(coordinates: List[List[float]]) -> Optional[Dict[str, Any]]:
+    """Équivalent de ``TrajectoryAnalyzer.analyze_terrain``."""
+    empty = {"slopes": [], "avg_slope": 0, "max_slope": 0, "min_slope": 0, "terrain_analysis": {}}
+    if len(coordinates) < 3:
+        return empty
+    if any(len(coord) <= 2 for coord in coordinates):
+        return None  # Altitudes partielles : la référence les traite paire par paire
+
+    lat = np.array([coord[0] for coord in coordinates], dtype=float)
+    lon = np.array([coord[1] for coord in coordinates], dtype=float)
+    alt = np.array([coord[2] for coord in coordinates], dtype=float)
+    horizontal = geodesic_distances(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    elevation_diff = np.diff(alt)
+    moving = horizontal > 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = elevation_diff / horizontal
+        slope_percent = np.where(moving, ratio * 100, 0.0)
+        slope_degrees = np.where(moving, np.degrees(np.arctan(ratio)), 0.0)
+
+    slope_values = [value if keep else 0 for value, keep in zip(slope_percent.tolist(), moving.tolist())]
+    degrees = [value if keep else 0 for value, keep in zip(slope_degrees.tolist(), moving.tolist())]
+    slopes = [
+        {
+            "index": index,
+            "slope_percent": slope,
+            "slope_degrees": degree,
+            "elevation_diff": diff,
+            "horizontal_distance": distance,
+            "coordinates": coordinates[index],
+        }
+        for index, slope, degree, diff, distance in zip(
+            range(1, len(coordinates)), slope_values, degrees,
+            [coordinates[i][2] - coordinates[i - 1][2] for i in range(1, len(coordinates))],
+            horizontal.tolist())
+    ]
+
+    magnitude = np.abs(slope_percent)
+    terrain_types = {
+        "flat": int(np.count_nonzero(magnitude <= 5)),
+        "gentle": int(np.count_nonzero((magnitude > 5) & (magnitude <= 15))),
+        "moderate": int(np.count_nonzero((magnitude > 15) & (magnitude <= 30))),
+        "steep": int(np.count_nonzero(magnitude > 30)),
+    }
+
+    # Segments de pente homogène : une moyenne par segment (somme séquentielle, comme la référence)
+    slope_segments = []
+    types = [_slope_type(slope) for slope in slope_values]
+    start = 0
+    for end in range(1, len(slopes) + 1):
+        if end < len(slopes) and types[end] == types[start]:
+            continue
+        values = slope_values[start:end]
+        slope_segments.append({
+            "type": types[start],
+            "start_index": slopes[start]["index"],
+            "slopes": slopes[start:end],
+            "avg_slope": sum(values) / len(values),
+            "length": end - start,
+        })
+        start = end
+    # La référence ne renseigne la fin que du dernier segment
+    slope_segments[-1]["end_index"] = slopes[-1]["index"]
+
+    return {
+        "slopes": slopes,
+        "avg_slope": round(sum(slope_values) / len(slope_values), 2),
+        "max_slope": round(max(slope_values), 2),
+        "min_slope": round(min(slope_values), 2),
+        "slope_segments": slope_segments,
+        "terrain_analysis": {
+            "total_points": len(slopes),
+            "terrain_distribution": terrain_types,
+            "dominant_terrain": max(terrain_types.keys(), key=lambda k: terrain_types[k]),
+        },
+    }
+
+
+def points_of_interest(coordinates: List[List[float]]) -> Optional[List[Dict[str, Any]]]:
+    """Équivalent de ``TrajectoryAnalyzer.detect_points_of_interest``."""
+    if len(coordinates) < 5:
+        return []
+    with_altitude = len(coordinates[0]) > 2
+    if with_altitude and any(len(coord) <= 2 for coord in coordinates):
+        return None
+
+    points_of_interest = []
+    lat = np.array([coord[0] for coord in coordinates], dtype=float)
+    lon = np.array([coord[1] for coord in coordinates], dtype=float)
+
+    # Virages : angle entre (i-2 -> i) et (i -> i+2)
+    v1_lat, v1_lon = lat[2:-2] - lat[:-4], lon[2:-2] - lon[:-4]
+    v2_lat, v2_lon = lat[4:] - lat[2:-2], lon[4:] - lon[2:-2]
+    mag1 = np.sqrt(v1_lat ** 2 + v1_lon ** 2)
+    mag2 = np.sqrt(v2_lat ** 2 + v2_lon ** 2)
+    moving = (mag1 > 0) & (mag2 > 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cos_angle = np.clip((v1_lat * v2_lat + v1_lon * v2_lon) / (mag1 * mag2), -1, 1)
+        angles = np.degrees(np.arccos(cos_angle))
+    for offset in np.flatnonzero(moving & (angles > 30)).tolist():
+        index, angle_deg = offset + 2, float(angles[offset])
+        points_of_interest.append({
+            "type": "turn",
+            "index": index,
+            "coordinates": coordinates[index],
+            "angle_degrees": round(angle_deg, 1),
+            "description": f"Virage de {round(angle_deg, 1)}°",
+            "severity": "sharp" if angle_deg > 60 else "moderate",
+        })
+
+    # Changements de pente : dénivelé moyen des 4 pas avant et après le point
+    if with_altitude and len(coordinates) > 10:
+        steps = np.diff(np.array([coord[2] for coord in coordinates], dtype=float))
+        n = len(coordinates)
+        before = (((steps[0:n - 10] + steps[1:n - 9]) + steps[2:n - 8]) + steps[3:n - 7]) / 4
+        after = (((steps[5:n - 5] + steps[6:n - 4]) + steps[7:n - 3]) + steps[8:n - 2]) / 4
+        change = np.abs(after - before)
+        for offset in np.flatnonzero(change > 10).tolist():
+            index = offset + 5
+            diff, before_slope, after_slope = float(change[offset]), float(before[offset]), float(after[offset])
+            points_of_interest.append({
+                "type": "elevation_change",
+                "index": index,
+                "coordinates": coordinates[index],
+                "elevation_change": round(diff, 1),
+                "description": f"Changement de pente ({round(diff, 1)}m)",
+                "before_slope": round(before_slope, 1),
+                "after_slope": round(after_slope, 1),
+            })
+
+    return points_of_interest
+
+
+def parse_coordinates(coord_text: str) -> Optional[List[List[float]]]:
+    """Équivalent de ``KMLParser._parse_coordinates`` pour les blocs homogènes « lon,lat,alt »."""
+    tuples = coord_text.split()
+    if len(tuples) < PARSE_MIN_POINTS:
+        return None
+    dims = tuples[0].count(',') + 1
+    if dims < 3:
+        return None  # Altitude absente : la référence la remplace par l'entier 0
+    if any(t.count(',') != dims - 1 for t in tuples):
+        return None  # Tuples de dimensions différentes
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')  # Anciennes versions de numpy : avertissement au lieu d'erreur
+            values = np.fromstring(coord_text.replace(',', ' '), sep=' ')
+    except ValueError:
+        return None
+    if values.size != len(tuples) * dims:
+        return None  # Valeurs invalides : la référence ignore les tuples concernés
+    return values.reshape(-1, dims)[:, [1, 0, 2]].tolist()
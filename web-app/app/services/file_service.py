@@ -2,9 +2,12 @@
 Service de gestion des fichiers.
 """
 
+import mmap
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterator, List, Union
 from app.services.timing_tools import track_time
+from app.services.compression import strip_compression_suffix
 from werkzeug.utils import secure_filename
 from flask import current_app
 
@@ -12,15 +15,17 @@ from flask import current_app
 class FileService:
     """Service de gestion des fichiers KML/GPX."""
     
+    @staticmethod
+    def file_format(filename: str) -> str:
+        """Retourne le format d'un fichier d'après son extension (trace.kml.gz -> kml)."""
+        filename = strip_compression_suffix(filename)
+        return filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+    
     @staticmethod
     @track_time
     def allowed_file(filename: str) -> bool:
-        """Vérifie si le fichier a une extension autorisée."""
-        return (
-            '.' in filename
-            and filename.rsplit('.', 1)[1].lower()
-            in current_app.config['ALLOWED_EXTENSIONS']
-        )
+        """Vérifie si le fichier a une extension autorisée (éventuellement compressé)."""
+        return FileService.file_format(filename) in current_app.config['ALLOWED_EXTENSIONS']
     
     @staticmethod
     @track_time
@@ -45,9 +50,8 @@ class FileService:
         return sample_files
     
     @staticmethod
-    @track_time
-    def load_sample_file(filename: str) -> str:
-        """Charge le contenu d'un fichier d'exemple."""
+    def sample_file_path(filename: str) -> Path:
+        """Retourne le chemin d'un fichier d'exemple existant."""
         secure_name = secure_filename(filename)
         
         # Chercher d'abord dans le dossier sample_files monté par Docker
@@ -61,21 +65,51 @@ class FileService:
         
         if not file_path.exists() or file_path.suffix.lower() not in {'.kml', '.gpx'}:
             raise FileNotFoundError('Fichier non trouvé ou type invalide')
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
+        return file_path
+    
+    @staticmethod
+    @track_time
+    def load_sample_file(filename: str) -> bytes:
+        """Charge le contenu brut d'un fichier d'exemple.
+
+        Le contenu n'est pas décodé : le parser XML applique l'encodage
+        déclaré par le document.
+        """
+        with open(FileService.sample_file_path(filename), 'rb') as f:
             return f.read()
     
+    @staticmethod
+    @contextmanager
+    def map_file(path: Union[str, Path]) -> Iterator[Union[mmap.mmap, bytes]]:
+        """Projette un fichier en mémoire en lecture seule.
+
+        Le buffer obtenu est fourni tel quel au parser et au hachage, sans
+        copie du contenu dans le tas Python : les pages sont lues à la
+        demande par le système.
+        """
+        with open(path, 'rb') as f:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Un fichier vide ne peut pas être projeté
+                yield b''
+                return
+            try:
+                yield mapped
+            finally:
+                mapped.close()
+    
     @staticmethod
     @track_time
-    def save_uploaded_file(file) -> str:
-        """Sauvegarde un fichier uploadé et retourne son contenu."""
+    def save_uploaded_file(file) -> bytes:
+        """Sauvegarde un fichier uploadé et retourne son contenu brut.
+
+        Le contenu n'est pas décodé : le parser XML applique l'encodage
+        déclaré par le document (UTF-8 par défaut).
+        """
         if not file or not FileService.allowed_file(file.filename):
             raise ValueError('Type de fichier non autorisé')
         
         # Pour l'instant, on lit directement le contenu sans sauvegarder
         # Dans une version future, on pourrait sauvegarder le fichier
-        try:
-            content = file.read().decode('utf-8')
-            return content
-        except UnicodeDecodeError as exc:
-            raise ValueError("Erreur d'encodage du fichier. Assurez-vous qu'il s'agit d'un fichier valide.") from exc
+        return file.read()
@@ -0,0 +1,148 @@
+"""
+Détection du format d'un document d'après son contenu.
+Seuls les premiers kilo-octets sont examinés (signature d'archive ou de
+compression, élément racine XML et son namespace) : un fichier mal nommé
+est dirigé vers le bon parser et un contenu non supporté est rejeté avant
+tout traitement coûteux. Si le prologue XML (déclaration, commentaires,
+DOCTYPE) déborde de cette fenêtre, la recherche de l'élément racine se
+poursuit par blocs, sans consommer le flux.
+"""
+
+import io
+import mmap
+import xml.etree.ElementTree as ET
+import zlib
+
+from app.services.compression import detect_compression, peek, zstandard
+
+# Volume examiné en tête de document
+SNIFF_SIZE = 4096
+
+# Volume maximal parcouru lorsque le prologue XML dépasse SNIFF_SIZE
+MAX_PROLOG_SIZE = 1024 * 1024
+
+ZIP_MAGIC = b'PK\x03\x04'
+
+KML_NAMESPACES = {
+    'http://www.opengis.net/kml/2.2',
+    'http://earth.google.com/kml/2.0',
+    'http://earth.google.com/kml/2.1',
+    'http://earth.google.com/kml/2.2',
+}
+GPX_NAMESPACES = {
+    'http://www.topografix.com/GPX/1/0',
+    'http://www.topografix.com/GPX/1/1',
+}
+
+
+class UnsupportedFormatError(ValueError):
+    """Levée lorsque le contenu n'est ni du KML, ni du KMZ, ni du GPX."""
+
+    def __init__(self, message: str = 'Format de fichier non reconnu (KML, KMZ ou GPX attendu)'):
+        super().__init__(message)
+
+
+def _decompress_head(head: bytes, compression: str) -> bytes:
+    """Décompresse le début d'un contenu compressé (au plus SNIFF_SIZE octets)."""
+    try:
+        if compression == 'gzip':
+            return zlib.decompressobj(wbits=31).decompress(head, SNIFF_SIZE)
+        if zstandard is not None:
+            return zstandard.ZstdDecompressor().stream_reader(io.BytesIO(head)).read(SNIFF_SIZE)
+    except Exception as exc:  # noqa: BLE001 - erreurs zlib, d'E/S ou de zstandard
+        raise UnsupportedFormatError('Contenu compressé invalide') from exc
+    raise UnsupportedFormatError("Compression zstd non supportée (paquet 'zstandard' absent)")
+
+
+def _raw_chunks(source):
+    """Parcourt le contenu par blocs de SNIFF_SIZE, jusqu'à MAX_PROLOG_SIZE, sans consommer le flux."""
+    if isinstance(source, str) or not hasattr(source, 'read') or isinstance(source, mmap.mmap):
+        for start in range(0, min(len(source), MAX_PROLOG_SIZE), SNIFF_SIZE):
+            chunk = source[start:start + SNIFF_SIZE]
+            yield chunk if isinstance(chunk, str) else bytes(chunk)
+        return
+    if not (hasattr(source, 'seekable') and source.seekable()):
+        return
+    position = source.tell()
+    try:
+        for _ in range(MAX_PROLOG_SIZE // SNIFF_SIZE):
+            chunk = source.read(SNIFF_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        source.seek(position)
+
+
+def _decompressed_chunks(chunks, compression: str):
+    """Décompresse les blocs d'un contenu compressé, jusqu'à MAX_PROLOG_SIZE octets."""
+    if compression == 'gzip':
+        decompressor = zlib.decompressobj(wbits=31)
+    else:
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+    produced = 0
+    for chunk in chunks:
+        try:
+            data = decompressor.decompress(chunk)
+        except Exception as exc:  # noqa: BLE001 - erreurs zlib ou de zstandard
+            raise UnsupportedFormatError('Contenu compressé invalide') from exc
+        yield data
+        produced += len(data)
+        if produced >= MAX_PROLOG_SIZE:
+            return
+
+
+def _root_tag(chunks):
+    """Retourne (namespace, nom local) de l'élément racine, ou None s'il est introuvable."""
+    parser = ET.XMLPullParser(events=('start',))
+    try:
+        for chunk in chunks:
+            parser.feed(chunk)
+            for _, elem in parser.read_events():
+                if elem.tag.startswith('{'):
+                    namespace, local = elem.tag[1:].split('}', 1)
+                    return namespace, local
+                return '', elem.tag
+    except ET.ParseError:
+        pass
+    return None
+
+
+def detect_format(source) -> str:
+    """Détermine le format d'un document à partir de ses premiers octets.
+
+    Args:
+        source: Texte, octets, buffer ou fichier binaire ouvert (non consommé)
+
+    Returns:
+        str: 'kml', 'kmz' ou 'gpx'
+
+    Raises:
+        UnsupportedFormatError: si le contenu n'est pas reconnu
+    """
+    compression = None
+    if isinstance(source, str):
+        head = source[:SNIFF_SIZE]
+    else:
+        head = peek(source, SNIFF_SIZE)
+        if head.startswith(ZIP_MAGIC):
+            return 'kmz'
+        compression = detect_compression(head)
+        if compression is not None:
+            head = _decompress_head(head, compression)
+
+    root = _root_tag([head])
+    if root is None and len(head) >= SNIFF_SIZE:
+        # Fenêtre remplie sans élément racine : prologue long, la recherche continue par blocs
+        raw = _raw_chunks(source)
+        try:
+            root = _root_tag(raw if compression is None else _decompressed_chunks(raw, compression))
+        finally:
+            raw.close()  # Repositionne le flux
+    if root is not None:
+        namespace, local = root
+        if namespace in KML_NAMESPACES or local == 'kml':
+            return 'kml'
+        if namespace in GPX_NAMESPACES or local == 'gpx':
+            return 'gpx'
+    raise UnsupportedFormatError()
@@ -2,8 +2,9 @@
 import logging
 import xml.etree.ElementTree as ET
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from app.services.timing_tools import track_time
+from app.services.progress import ProgressTracker, XMLSource, parse_xml
 from app.services.trajectory_analyzer import TrajectoryAnalyzer
 
 logging.basicConfig(level=logging.DEBUG,
@@ -32,11 +33,18 @@ class GPXParser:
 
     @staticmethod
     @track_time
-    def parse_gpx_coordinates(gpx_content: str) -> Dict[str, Any]:
-        """Parse GPX content and return features and points."""
+    def parse_gpx_coordinates(gpx_content: XMLSource, progress: Optional[ProgressTracker] = None) -> Dict[str, Any]:
+        """Parse GPX content and return features and points.
+
+        ``gpx_content`` may be text, raw bytes (decoded according to the XML
+        declaration) or a binary file object.
+        ``progress`` optionally receives the parsing progress (background jobs).
+        """
         try:
             ns = GPXParser.NAMESPACES
-            root = ET.fromstring(gpx_content)
+            root = parse_xml(gpx_content, progress)
+            if progress is not None:
+                progress.set_stage('extract_points', len(root.findall('.//gpx:trkpt', ns)))
 
             metadata: Dict[str, Any] = {}
             meta_elem = root.find('gpx:metadata', ns)
@@ -92,6 +100,8 @@ class GPXParser:
 
                 for seg in trk.findall('gpx:trkseg', ns):
                     for idx, trkpt in enumerate(seg.findall('gpx:trkpt', ns)):
+                        if progress is not None and len(points) % progress.every == 0:
+                            progress.update(len(points))
                         lat = float(trkpt.get('lat'))
                         lon = float(trkpt.get('lon'))
                         ele_elem = trkpt.find('gpx:ele', ns)
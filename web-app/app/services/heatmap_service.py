@@ -0,0 +1,255 @@
+"""
+Service d'agrégation de densité des traces (heatmap).
+Rasterise les segments de toutes les traces parsées dans une grille fixe,
+alimentée de manière incrémentale à chaque nouveau document.
+"""
+
+import math
+import struct
+import threading
+import zlib
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+# Taille de cellule par défaut (en degrés, ~1 km à l'équateur)
+DEFAULT_CELL_SIZE = 0.01
+
+# Nombre de colonnes de la grille mondiale pour une taille de cellule donnée
+_WORLD_LON_SPAN = 360.0
+_WORLD_LAT_SPAN = 180.0
+
+TILE_SIZE = 256
+
+
+class DensityGrid:
+    """Grille de densité creuse couvrant le globe.
+
+    Les cellules sont indexées par ``ligne * n_colonnes + colonne`` et seules
+    les cellules non vides sont conservées, ce qui permet d'agréger des
+    centaines de documents sans allouer la grille mondiale complète.
+    """
+
+    def __init__(self, cell_size: float = DEFAULT_CELL_SIZE):
+        self._lock = threading.Lock()
+        self._counts: Dict[int, int] = {}
+        self._documents: set = set()
+        self._set_cell_size(cell_size)
+
+    def _set_cell_size(self, cell_size: float):
+        self.cell_size = float(cell_size)
+        self.n_cols = int(math.ceil(_WORLD_LON_SPAN / self.cell_size))
+        self.n_rows = int(math.ceil(_WORLD_LAT_SPAN / self.cell_size))
+
+    def configure(self, cell_size: float):
+        """Change la résolution de la grille (vide la grille si elle change)."""
+        with self._lock:
+            if float(cell_size) != self.cell_size:
+                self._counts.clear()
+                self._documents.clear()
+                self._set_cell_size(cell_size)
+
+    def clear(self):
+        """Vide la grille (principalement pour les tests)."""
+        with self._lock:
+            self._counts.clear()
+            self._documents.clear()
+
+    @property
+    def document_count(self) -> int:
+        return len(self._documents)
+
+    @staticmethod
+    def extract_tracks(features: List[Dict[str, Any]]) -> List[np.ndarray]:
+        """Extrait les traces (tableaux [lat, lon]) d'une liste de features."""
+        tracks = []
+        for feature in features:
+            feature_type = feature.get('type')
+            if feature_type in ('polyline', 'track'):
+                sequences = [feature.get('coordinates', [])]
+            elif feature_type == 'multitrack':
+                sequences = [t.get('coordinates', []) for t in feature.get('tracks', [])]
+            else:
+                continue
+            for coords in sequences:
+                if coords:
+                    tracks.append(np.array([c[:2] for c in coords], dtype=float))
+
+        # Export "un Placemark par point" sans LineString : relier les marqueurs
+        if not tracks:
+            markers = [f['coordinates'][:2] for f in features
+                       if f.get('type') == 'marker' and f.get('coordinates')]
+            if len(markers) >= 2:
+                tracks.append(np.array(markers, dtype=float))
+        return tracks
+
+    def _rasterize(self, track: np.ndarray) -> np.ndarray:
+        """Densifie les segments d'une trace et retourne les indices de cellules.
+
+        Chaque segment est échantillonné au pas de la cellule (tracé de ligne
+        vectorisé), de sorte que le poids d'une cellule est proportionnel à
+        la longueur de trace qui la traverse.
+        """
+        if len(track) == 1:
+            samples = track
+        else:
+            start = track[:-1]
+            delta = track[1:] - start
+            steps = np.ceil(np.abs(delta).max(axis=1) / self.cell_size).astype(np.int64)
+            steps = np.maximum(steps, 1)
+            seg_index = np.repeat(np.arange(len(steps)), steps)
+            # Position (0 <= t < 1) de chaque échantillon dans son segment
+            offsets = np.arange(seg_index.size) - np.repeat(np.cumsum(steps) - steps, steps)
+            t = offsets / steps[seg_index]
+            samples = start[seg_index] + delta[seg_index] * t[:, None]
+            samples = np.vstack([samples, track[-1:]])
+
+        rows = np.floor((samples[:, 0] + 90.0) / self.cell_size).astype(np.int64)
+        cols = np.floor((samples[:, 1] + 180.0) / self.cell_size).astype(np.int64)
+        np.clip(rows, 0, self.n_rows - 1, out=rows)
+        np.clip(cols, 0, self.n_cols - 1, out=cols)
+        return rows * self.n_cols + cols
+
+    def add_document(self, document_id: str, features: List[Dict[str, Any]]) -> bool:
+        """Ajoute les traces d'un document à la grille.
+
+        Args:
+            document_id: Identifiant du document (empreinte du contenu)
+            features: Features parsées du document
+
+        Returns:
+            bool: False si le document avait déjà été agrégé
+        """
+        with self._lock:
+            if document_id in self._documents:
+                return False
+
+        tracks = self.extract_tracks(features)
+        if tracks:
+            cells = np.concatenate([self._rasterize(track) for track in tracks])
+            unique, counts = np.unique(cells, return_counts=True)
+        else:
+            unique, counts = np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+
+        with self._lock:
+            if document_id in self._documents:
+                return False
+            self._documents.add(document_id)
+            for cell, count in zip(unique.tolist(), counts.tolist()):
+                self._counts[cell] = self._counts.get(cell, 0) + count
+        return True
+
+    def _snapshot(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Retourne (latitudes, longitudes, poids) des centres de cellules."""
+        with self._lock:
+            cells = np.fromiter(self._counts.keys(), dtype=np.int64, count=len(self._counts))
+            weights = np.fromiter(self._counts.values(), dtype=np.float64, count=len(self._counts))
+        rows, cols = np.divmod(cells, self.n_cols)
+        lats = (rows + 0.5) * self.cell_size - 90.0
+        lons = (cols + 0.5) * self.cell_size - 180.0
+        return lats, lons, weights
+
+    def bounds(self) -> Optional[List[float]]:
+        """Emprise [min_lon, min_lat, max_lon, max_lat] des cellules non vides."""
+        lats, lons, _ = self._snapshot()
+        if lats.size == 0:
+            return None
+        half = self.cell_size / 2
+        return [float(lons.min() - half), float(lats.min() - half),
+                float(lons.max() + half), float(lats.max() + half)]
+
+    def max_density(self) -> int:
+        with self._lock:
+            return max(self._counts.values()) if self._counts else 0
+
+    def grid(self, bbox: Optional[List[float]] = None, width: int = 256,
+             height: int = 256) -> Dict[str, Any]:
+        """Ré-échantillonne la densité sur une grille régulière.
+
+        Args:
+            bbox: [min_lon, min_lat, max_lon, max_lat] (emprise des données par défaut)
+            width: Nombre de colonnes de la grille retournée
+            height: Nombre de lignes de la grille retournée
+
+        Returns:
+            dict: Grille (lignes du nord vers le sud) et ses paramètres
+        """
+        bbox = bbox or self.bounds()
+        if bbox is None:
+            return {'bbox': None, 'width': 0, 'height': 0, 'max': 0, 'grid': []}
+
+        min_lon, min_lat, max_lon, max_lat = bbox
+        lats, lons, weights = self._snapshot()
+        histogram, _, _ = np.histogram2d(
+            lats, lons, bins=[height, width],
+            range=[[min_lat, max_lat], [min_lon, max_lon]], weights=weights
+        )
+        histogram = np.flipud(histogram).astype(np.int64)
+        return {
+            'bbox': [min_lon, min_lat, max_lon, max_lat],
+            'width': width,
+            'height': height,
+            'max': int(histogram.max()) if histogram.size else 0,
+            'grid': histogram.tolist()
+        }
+
+    def render_tile(self, z: int, x: int, y: int) -> bytes:
+        """Rend une tuile XYZ (Web Mercator) de la densité au format PNG."""
+        n = 2 ** z
+        lon_min = x / n * 360.0 - 180.0
+        lon_max = (x + 1) / n * 360.0 - 180.0
+        merc_top = math.pi * (1 - 2 * y / n)
+        merc_bottom = math.pi * (1 - 2 * (y + 1) / n)
+
+        lats, lons, weights = self._snapshot()
+        if lats.size:
+            clipped = np.clip(lats, -85.0511, 85.0511)
+            merc = np.log(np.tan(np.pi / 4 + np.radians(clipped) / 2))
+            histogram, _, _ = np.histogram2d(
+                merc, lons, bins=[TILE_SIZE, TILE_SIZE],
+                range=[[merc_bottom, merc_top], [lon_min, lon_max]], weights=weights
+            )
+            histogram = np.flipud(histogram)
+        else:
+            histogram = np.zeros((TILE_SIZE, TILE_SIZE))
+
+        return _encode_png(_colorize(histogram, self.max_density()))
+
+
+def _colorize(histogram: np.ndarray, max_value: float) -> np.ndarray:
+    """Convertit une grille de densité en image RGBA (échelle logarithmique)."""
+    rgba = np.zeros(histogram.shape + (4,), dtype=np.uint8)
+    if max_value <= 0:
+        return rgba
+    level = np.log1p(histogram) / math.log1p(max_value)
+    np.clip(level, 0.0, 1.0, out=level)
+    # Dégradé bleu -> jaune -> rouge
+    rgba[..., 0] = (255 * np.clip(level * 2, 0, 1)).astype(np.uint8)
+    rgba[..., 1] = (255 * np.clip(1 - np.abs(level * 2 - 1), 0, 1)).astype(np.uint8)
+    rgba[..., 2] = (255 * np.clip(1 - level * 2, 0, 1)).astype(np.uint8)
+    rgba[..., 3] = np.where(histogram > 0, (80 + 175 * level).astype(np.uint8), 0)
+    return rgba
+
+
+def _encode_png(rgba: np.ndarray) -> bytes:
+    """Encode une image RGBA (hauteur x largeur x 4) au format PNG."""
+    height, width, _ = rgba.shape
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    raw[:, 1:] = rgba.reshape(height, width * 4)
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return (struct.pack('>I', len(data)) + tag + data
+                + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)) + chunk(b'IEND', b''))
+
+
+# Grille partagée par toute l'application
+density_grid = DensityGrid()
+
+
+def init_app(app):
+    """Applique la configuration de l'application à la grille partagée."""
+    density_grid.configure(app.config.get('HEATMAP_CELL_SIZE', DEFAULT_CELL_SIZE))
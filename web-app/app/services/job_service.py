@@ -0,0 +1,144 @@
+"""
+File de traitements en arrière-plan pour les fichiers volumineux.
+Les jobs s'exécutent dans un pool de threads borné ; leur résultat est
+conservé pendant une durée limitée puis expire.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable
+
+from app.services.progress import ProgressTracker
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFullError(Exception):
+    """Levée lorsque la file de jobs a atteint sa capacité maximale."""
+
+
+class Job:
+    """Traitement en arrière-plan et son état."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    def __init__(self, name: str):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.status = Job.PENDING
+        self.progress = ProgressTracker()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (Job.DONE, Job.FAILED)
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = {
+            'job_id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'progress': self.progress.to_dict(),
+            'created_at': self.created_at,
+            'finished_at': self.finished_at
+        }
+        if self.error:
+            data['error'] = self.error
+        if include_result and self.status == Job.DONE:
+            data['result'] = self.result
+        return data
+
+
+class JobManager:
+    """Gestionnaire des jobs : pool de threads borné et rétention des résultats."""
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 16, result_ttl: float = 600):
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.max_workers = 0
+        self.configure(max_workers, max_pending, result_ttl)
+
+    def configure(self, max_workers: int, max_pending: int, result_ttl: float):
+        """Applique la configuration (recrée le pool si sa taille change)."""
+        with self._lock:
+            if self._executor is None or self.max_workers != max_workers:
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+            self.max_workers = max_workers
+            self.max_pending = max_pending
+            self.result_ttl = result_ttl
+
+    def _purge_expired(self):
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and now - job.finished_at > self.result_ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def submit(self, name: str, fn: Callable[..., Dict[str, Any]], *args, **kwargs) -> Job:
+        """
+        Soumet un traitement ; ``fn`` reçoit le tracker du job via l'argument ``progress``.
+
+        Raises:
+            JobQueueFullError: si trop de jobs sont déjà en attente ou en cours
+        """
+        job = Job(name)
+        with self._lock:
+            self._purge_expired()
+            active = sum(1 for j in self._jobs.values() if not j.finished)
+            if active >= self.max_workers + self.max_pending:
+                raise JobQueueFullError('Trop de traitements en cours, réessayez plus tard')
+            self._jobs[job.id] = job
+            executor = self._executor
+
+        executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    @staticmethod
+    def _run(job: Job, fn, args, kwargs):
+        job.status = Job.RUNNING
+        job.progress.touch()
+        try:
+            job.result = fn(*args, progress=job.progress, **kwargs)
+            job.status = Job.DONE
+        except Exception as e:  # noqa: BLE001
+            logger.exception("Échec du job %s (%s)", job.id, job.name)
+            job.error = str(e)
+            job.status = Job.FAILED
+        finally:
+            job.finished_at = time.time()
+            # Dernière notification : les flux de progression se terminent sur cet état
+            job.progress.set_stage(job.status)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Retourne un job (None s'il est inconnu ou expiré)."""
+        with self._lock:
+            self._purge_expired()
+            return self._jobs.get(job_id)
+
+    def clear(self):
+        """Oublie tous les jobs (principalement pour les tests)."""
+        with self._lock:
+            self._jobs.clear()
+
+
+# Gestionnaire partagé par toute l'application
+job_manager = JobManager()
+
+
+def init_app(app):
+    """Applique la configuration de l'application au gestionnaire de jobs."""
+    job_manager.configure(app.config.get('JOB_WORKERS', 2),
+                          app.config.get('JOB_MAX_PENDING', 16),
+                          app.config.get('JOB_RESULT_TTL', 600))
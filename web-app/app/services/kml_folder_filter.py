@@ -0,0 +1,163 @@
+"""
+Filtrage des dossiers KML pendant le parsing.
+Les sous-arbres des dossiers non retenus sont ignorés au fil de la lecture,
+sans jamais être construits : seul le contenu utile occupe de la mémoire et
+du temps d'extraction.
+"""
+
+import xml.etree.ElementTree as ET
+from typing import Iterable, List, Optional
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def _normalize(name: Optional[str]) -> Optional[str]:
+    return name.strip().lower() if name else None
+
+
+class FolderFilter:
+    """Sélection de dossiers par nom (insensible à la casse).
+
+    Un Placemark est conservé s'il se trouve dans (un descendant d')un
+    dossier inclus, ou partout si aucune inclusion n'est demandée, et
+    s'il n'appartient à aucun dossier exclu.
+    """
+
+    def __init__(self, include: Optional[Iterable[str]] = None, exclude: Optional[Iterable[str]] = None):
+        self.include = frozenset(n for n in map(_normalize, include or []) if n)
+        self.exclude = frozenset(n for n in map(_normalize, exclude or []) if n)
+
+    @classmethod
+    def from_strings(cls, include: Optional[str] = None, exclude: Optional[str] = None) -> Optional['FolderFilter']:
+        """Construit un filtre depuis des listes séparées par des virgules (None si vide)."""
+        folder_filter = cls((include or '').split(','), (exclude or '').split(','))
+        return folder_filter if folder_filter else None
+
+    def __bool__(self) -> bool:
+        return bool(self.include or self.exclude)
+
+    def cache_token(self) -> str:
+        """Représentation stable du filtre, utilisée dans les clés de cache."""
+        return f"include={','.join(sorted(self.include))};exclude={','.join(sorted(self.exclude))}"
+
+    def to_dict(self) -> dict:
+        return {'include': sorted(self.include), 'exclude': sorted(self.exclude)}
+
+
+class _FolderState:
+    __slots__ = ('included', 'excluded', 'resolved')
+
+    def __init__(self, included: bool, excluded: bool, resolved: bool = True):
+        self.included = included
+        self.excluded = excluded
+        self.resolved = resolved
+
+
+class FolderFilterBuilder:
+    """Cible de parser XML qui ne construit que les dossiers retenus.
+
+    Le nom d'un dossier n'est connu qu'après son ouverture : le dossier est
+    résolu à la fermeture de son élément ``name``, ou à sa propre fermeture
+    s'il n'en a pas. Les enfants qui précèdent ``name`` sont mis en attente
+    puis rejoués une fois le dossier résolu. Dès lors, un dossier exclu
+    n'est plus construit et les Placemarks hors sélection sont ignorés.
+    """
+
+    def __init__(self, folder_filter: FolderFilter):
+        self._filter = folder_filter
+        self._builder = ET.TreeBuilder()
+        self._folders: List[_FolderState] = [_FolderState(not folder_filter.include, False)]
+        self._skip_depth = 0
+        self._depth = 0
+        self._name_depth: Optional[int] = None
+        self._name_text: List[str] = []
+        # Événements du dossier non résolu en attente de son nom
+        self._pending: Optional[List[tuple]] = None
+        self._pending_depth = 0
+        self._pending_name: Optional[List[str]] = None
+        self.skipped_placemarks = 0
+
+    def _resolve(self, name: Optional[str]):
+        folder = self._folders[-1]
+        parent = self._folders[-2]
+        name = _normalize(name)
+        folder.included = parent.included or (name is not None and name in self._filter.include)
+        folder.excluded = parent.excluded or (name is not None and name in self._filter.exclude)
+        folder.resolved = True
+
+    def _replay(self, name: Optional[str]):
+        """Résout le dossier en attente puis rejoue les événements retenus."""
+        events, self._pending = self._pending, None
+        self._resolve(name)
+        for event, *args in events:
+            getattr(self, event)(*args)
+
+    def start(self, tag, attrib):
+        if self._skip_depth:
+            self._skip_depth += 1
+            return
+        local = _local_name(tag)
+        folder = self._folders[-1]
+        if self._pending is None and not folder.resolved and local != 'name':
+            self._pending = []
+            self._pending_depth = 0
+        if self._pending is not None:
+            if self._pending_depth == 0 and local == 'name':
+                self._pending_name = []
+            self._pending.append(('start', tag, attrib))
+            self._pending_depth += 1
+            return
+        if folder.excluded or (local == 'Placemark' and not folder.included):
+            if local == 'Placemark':
+                self.skipped_placemarks += 1
+            self._skip_depth = 1
+            return
+
+        self._depth += 1
+        if local == 'Folder':
+            self._folders.append(_FolderState(False, False, resolved=False))
+        elif local == 'name' and not folder.resolved and len(self._folders) > 1:
+            self._name_depth = self._depth
+            self._name_text = []
+        self._builder.start(tag, attrib)
+
+    def end(self, tag):
+        if self._skip_depth:
+            self._skip_depth -= 1
+            return
+        if self._pending is not None:
+            if self._pending_depth == 0:
+                # Fermeture du dossier sans nom
+                self._replay(None)
+            else:
+                self._pending.append(('end', tag))
+                self._pending_depth -= 1
+                if self._pending_depth == 0 and self._pending_name is not None:
+                    name, self._pending_name = ''.join(self._pending_name), None
+                    self._replay(name)
+                return
+        local = _local_name(tag)
+        if self._name_depth == self._depth:
+            self._name_depth = None
+            self._resolve(''.join(self._name_text))
+        elif local == 'Folder':
+            self._folders.pop()
+        self._depth -= 1
+        return self._builder.end(tag)
+
+    def data(self, data):
+        if self._skip_depth:
+            return
+        if self._pending is not None:
+            self._pending.append(('data', data))
+            if self._pending_name is not None:
+                self._pending_name.append(data)
+            return
+        if self._name_depth is not None:
+            self._name_text.append(data)
+        self._builder.data(data)
+
+    def close(self) -> ET.Element:
+        return self._builder.close()
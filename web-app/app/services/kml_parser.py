@@ -6,9 +6,14 @@ Extrait toutes les informations pertinentes des fichiers KML, y compris les exte
 import re
 import xml.etree.ElementTree as ET
 import logging
+from app.services import analysis_backend, fast_analysis
 from app.services.timing_tools import track_time
+from app.services.progress import ProgressTracker, XMLSource, iter_chunks, parse_xml
+from app.services.kmz_reader import KMZArchive
+from app.services.compression import decompress_source
+from app.services.kml_folder_filter import FolderFilter, FolderFilterBuilder
 from xml.etree.ElementTree import tostring
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 
 # Configuration du logger
 logging.basicConfig(
@@ -20,6 +25,83 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+_NUMBER = r'(?P<{}>\d+(?:\.\d+)?)'
+_SPEED_LABEL = r'(?:vitesse|speed|spd)[\s:]*'
+_KMH = r'\s*(?:km/h|kmh|kph)'
+_KTS = r'\s*(?:kt|kts|knots)'
+
+# Vitesse et cap extraits en une seule passe : une alternative par motif, par
+# ordre de priorité. Chaque alternative est un lookahead pour que toutes les
+# occurrences soient vues, comme avec une recherche séparée par motif.
+_DESCRIPTION_FIELDS = ('speed_kmh_label', 'speed_kts_label', 'speed_kmh', 'speed_kts',
+                       'heading', 'heading_dir')
+_DESCRIPTION_RE = re.compile('|'.join(f'(?={pattern})' for pattern in (
+    _SPEED_LABEL + _NUMBER.format('speed_kmh_label') + _KMH,
+    _SPEED_LABEL + _NUMBER.format('speed_kts_label') + _KTS,
+    _NUMBER.format('speed_kmh') + _KMH,
+    _NUMBER.format('speed_kts') + _KTS,
+    r'(?:cap|heading|hdg|course)[\s:]*' + _NUMBER.format('heading'),
+    r'(?:direction|dir)[\s:]*' + _NUMBER.format('heading_dir'),
+)), re.IGNORECASE)
+
+# Masque des chiffres ASCII : deux descriptions de même gabarit ont la même clé
+_DIGIT_MASK = bytes.maketrans(b'123456789', b'000000000')
+
+
+class DescriptionExtractor:
+    """Extraction de la vitesse et du cap des descriptions d'un document.
+
+    Les descriptions générées par un même outil partagent un gabarit où
+    seules les valeurs changent. L'expression régulière ne porte que sur
+    des classes de caractères (chiffres, lettres, espaces) : des textes qui
+    ne diffèrent que par leurs chiffres donnent les mêmes positions de
+    correspondance. Chaque gabarit est donc analysé une seule fois et les
+    descriptions suivantes sont lues directement aux positions mémorisées.
+    """
+
+    # Nombre maximal de gabarits mémorisés par document
+    MAX_TEMPLATES = 4096
+
+    def __init__(self):
+        self._plans: Dict[bytes, Tuple[Optional[Tuple[int, int]], bool, Optional[Tuple[int, int]]]] = {}
+
+    @staticmethod
+    def _scan(description: str):
+        """Positions de la vitesse (et son unité) et du cap les plus prioritaires."""
+        found: Dict[str, Tuple[int, int]] = {}
+        for match in _DESCRIPTION_RE.finditer(description):
+            name = match.lastgroup
+            if name not in found:
+                found[name] = match.span(name)
+                if 'speed_kmh_label' in found and 'heading' in found:
+                    break
+        speed = next((name for name in _DESCRIPTION_FIELDS[:4] if name in found), None)
+        heading = next((name for name in _DESCRIPTION_FIELDS[4:] if name in found), None)
+        return (found.get(speed), speed is not None and 'kts' in speed,
+                found.get(heading))
+
+    def extract(self, description: str) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+        """Retourne (vitesse km/h, vitesse kts, cap), chaque valeur pouvant être None."""
+        key = description.encode('utf-8').translate(_DIGIT_MASK)
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = self._scan(description)
+            if len(self._plans) < self.MAX_TEMPLATES:
+                self._plans[key] = plan
+        speed_span, knots, heading_span = plan
+
+        speed_kmh = speed_kts = heading = None
+        if speed_span is not None:
+            speed = float(description[speed_span[0]:speed_span[1]])
+            if knots:
+                speed_kts, speed_kmh = speed, round(speed * 1.852, 1)
+            else:
+                speed_kmh, speed_kts = speed, round(speed / 1.852, 1)
+        if heading_span is not None:
+            heading = float(description[heading_span[0]:heading_span[1]])
+        return speed_kmh, speed_kts, heading
+
+
 class KMLParser:
     """Service de parsing complet des fichiers KML avec support des extensions Google."""
     
@@ -32,24 +114,33 @@ class KMLParser:
     
     @staticmethod
     @track_time
-    def parse(kml_content: str) -> Dict[str, Any]:
+    def parse(kml_content: XMLSource, progress: Optional[ProgressTracker] = None,
+              folders: Optional[FolderFilter] = None) -> Dict[str, Any]:
         """
         Parse un fichier KML et extrait toutes les informations disponibles.
         
         Args:
-            kml_content: Contenu du fichier KML
+            kml_content: Contenu du fichier KML (texte, octets ou fichier binaire ouvert)
+            progress: Suivi de progression optionnel (traitements en arrière-plan)
+            folders: Filtre de dossiers ; les sous-arbres écartés ne sont pas construits
             
         Returns:
             dict: Structure complète avec success, features, metadata et error
         """
         try:
-            root = ET.fromstring(kml_content)
+            target = FolderFilterBuilder(folders) if folders else None
+            root = parse_xml(kml_content, progress, target)
             
             # Extraire les métadonnées globales
+            if progress is not None:
+                progress.set_stage('metadata')
             metadata = KMLParser._extract_metadata(root)
             
             # Extraire toutes les entités géographiques
-            features = KMLParser._extract_features(root)
+            features = KMLParser._extract_features(root, progress)
+            if target is not None:
+                metadata['folder_filter'] = {**folders.to_dict(),
+                                             'skipped_placemarks': target.skipped_placemarks}
             
             return {
                 'success': True,
@@ -268,22 +359,30 @@ class KMLParser:
             metadata['folders'] = folder_info
     
     @staticmethod
-    def _extract_features(root: ET.Element) -> List[Dict[str, Any]]:
+    def _extract_features(root: ET.Element, progress: Optional[ProgressTracker] = None) -> List[Dict[str, Any]]:
         """Extrait toutes les entités géographiques."""
         features = []
         ns = KMLParser.NAMESPACES
         
-        # Trouver tous les Placemark
+        # Trouver tous les Placemark ; un extracteur de descriptions par document
         placemarks = root.findall('.//kml:Placemark', ns)
+        extractor = DescriptionExtractor()
+        if progress is not None:
+            progress.set_stage('extract_features', len(placemarks))
         for i, placemark in enumerate(placemarks):
-            feature = KMLParser._extract_placemark_data(placemark, i)
+            if progress is not None and i % progress.every == 0:
+                progress.update(i)
+            feature = KMLParser._extract_placemark_data(placemark, i, extractor)
             if feature:
                 features.append(feature)
         
+        if progress is not None:
+            progress.update(len(placemarks))
         return features
     
     @staticmethod
-    def _extract_placemark_data(placemark: ET.Element, index: int) -> Optional[Dict[str, Any]]:
+    def _extract_placemark_data(placemark: ET.Element, index: int,
+                                extractor: Optional[DescriptionExtractor] = None) -> Optional[Dict[str, Any]]:
         """Extrait les données d'un Placemark."""
         ns = KMLParser.NAMESPACES
         # logger.debug("placemark : %s",placemark)
@@ -318,7 +417,7 @@ class KMLParser:
             if coords:
                 # logger.debug("Point avec coord")
                 lat, lon, alt = coords[0]
-                parsed_info = KMLParser.parse_gps_description(description, lat, lon, alt)
+                parsed_info = KMLParser._parse_gps_description(description, lat, lon, alt, extractor)
                 
                 return {
                     'type': 'marker',
@@ -375,6 +474,11 @@ class KMLParser:
     @staticmethod
     def _parse_coordinates(coord_text: str) -> List[List[float]]:
         """Parse une chaîne de coordonnées KML."""
+        if analysis_backend.is_fast():
+            coordinates = fast_analysis.parse_coordinates(coord_text)
+            if coordinates is not None:
+                return coordinates
+
         coordinates = []
         for coord_line in coord_text.split():
             if coord_line.strip():
@@ -589,7 +693,7 @@ class KMLParser:
     
     # Méthodes utilitaires conservées pour compatibilité
     @staticmethod
-    @track_time
+    @track_time(sample_rate=100)
     def parse_gps_description(description: str, lat: float, lon: float, alt: float) -> Dict[str, Any]:
         """
         Parse la description d'un point GPS pour extraire les informations de vol.
@@ -603,6 +707,12 @@ class KMLParser:
         Returns:
             dict: Informations parsées formatées
         """
+        return KMLParser._parse_gps_description(description, lat, lon, alt)
+
+    @staticmethod
+    def _parse_gps_description(description: str, lat: float, lon: float, alt: float,
+                               extractor: Optional[DescriptionExtractor] = None) -> Dict[str, Any]:
+        """Version interne, sans chronométrage, partageant l'extracteur du document."""
         parsed_info = {
             'speed_kmh': None,
             'speed_kts': None,
@@ -617,37 +727,11 @@ class KMLParser:
         if not description:
             return parsed_info
         
-        # Recherche de la vitesse (différents formats possibles)
-        speed_patterns = [
-            r'(?:vitesse|speed|spd)[\s:]*(\d+(?:\.\d+)?)\s*(?:km/h|kmh|kph)',
-            r'(?:vitesse|speed|spd)[\s:]*(\d+(?:\.\d+)?)\s*(?:kt|kts|knots)',
-            r'(\d+(?:\.\d+)?)\s*(?:km/h|kmh|kph)',
-            r'(\d+(?:\.\d+)?)\s*(?:kt|kts|knots)'
-        ]
-        
-        for pattern in speed_patterns:
-            match = re.search(pattern, description, re.IGNORECASE)
-            if match:
-                speed_value = float(match.group(1))
-                if 'kt' in pattern.lower() or 'knot' in pattern.lower():
-                    parsed_info['speed_kts'] = speed_value
-                    parsed_info['speed_kmh'] = round(speed_value * 1.852, 1)
-                else:
-                    parsed_info['speed_kmh'] = speed_value
-                    parsed_info['speed_kts'] = round(speed_value / 1.852, 1)
-                break
-        
-        # Recherche du cap/heading
-        heading_patterns = [
-            r'(?:cap|heading|hdg|course)[\s:]*(\d+(?:\.\d+)?)\s*(?:°|deg|degrees?)?',
-            r'(?:direction|dir)[\s:]*(\d+(?:\.\d+)?)\s*(?:°|deg|degrees?)?'
-        ]
-        
-        for pattern in heading_patterns:
-            match = re.search(pattern, description, re.IGNORECASE)
-            if match:
-                parsed_info['heading'] = float(match.group(1))
-                break
+        # Vitesse (km/h ou nœuds) et cap, en une seule passe
+        speed_kmh, speed_kts, heading = (extractor or DescriptionExtractor()).extract(description)
+        parsed_info['speed_kmh'] = speed_kmh
+        parsed_info['speed_kts'] = speed_kts
+        parsed_info['heading'] = heading
         
         # Conversion altitude en pieds
         if alt:
@@ -656,7 +740,7 @@ class KMLParser:
         return parsed_info
 
     @staticmethod
-    @track_time
+    @track_time(sample_rate=100)
     def format_point_description(parsed_info: Dict[str, Any], display_mode: str = 'double') -> str:
         """
         Formate la description d'un point selon le mode d'affichage choisi.
@@ -668,6 +752,11 @@ class KMLParser:
         Returns:
             str: Description formatée
         """
+        return KMLParser._format_point_description(parsed_info, display_mode)
+
+    @staticmethod
+    def _format_point_description(parsed_info: Dict[str, Any], display_mode: str = 'double') -> str:
+        """Version interne, sans chronométrage (appelée pour chaque point)."""
         lines = []
         
         # Ligne 1: Vitesse
@@ -697,26 +786,18 @@ class KMLParser:
     @staticmethod
     @track_time
     def get_placemarks_points(kml_content, folder_name_to_search):
-        """Méthode conservée pour compatibilité."""
-        placemarks = []
+        """Méthode conservée pour compatibilité.
+
+        Seul le dossier demandé est construit : les Placemarks des autres
+        dossiers sont ignorés pendant le parsing.
+        """
         namespaces = KMLParser.NAMESPACES
         
         try:
-            root = ET.fromstring(kml_content)
-            folders = root.findall('.//kml:Folder', namespaces)
-
-            for folder in folders:
-                folder_name_elem = folder.find('kml:name', namespaces)
-                folder_name = folder_name_elem.text if folder_name_elem is not None else None
-                logger.debug("Folder : %s", folder_name)
-
-                if folder_name and folder_name.strip().lower() != folder_name_to_search.strip().lower():
-                    continue
-            
-                placemarks = folder.findall('.//kml:Placemark', namespaces)
-                if not placemarks:
-                    placemarks = root.findall('.//Placemark')
-                logger.debug("Nombre de Placemark points : %d", len(placemarks))
+            target = FolderFilterBuilder(FolderFilter(include=[folder_name_to_search]))
+            root = parse_xml(kml_content, target=target)
+            placemarks = root.findall('.//kml:Placemark', namespaces) or root.findall('.//Placemark')
+            logger.debug("Nombre de Placemark points : %d", len(placemarks))
             
             return placemarks
         except ET.ParseError as e:
@@ -730,23 +811,92 @@ class KMLParser:
                 'error': f'Erreur lors du traitement: {str(e)}'
             }
 
+    @staticmethod
+    def _build_point(feature: Dict[str, Any], index: int, display_mode: str) -> Dict[str, Any]:
+        """Adapte un marqueur au format de point attendu par l'interface."""
+        parsed_info = feature.get('parsed_info', {})
+        formatted_description = KMLParser._format_point_description(parsed_info, display_mode)
+        
+        return {
+            'type': 'marker',
+            'name': feature['name'],
+            'description': formatted_description,
+            'raw_description': feature['description'],
+            'coordinates': feature['coordinates'],
+            'altitude': feature.get('altitude', 0),
+            'style': feature.get('style'),
+            'is_annotation': False,  # Valeur par défaut
+            'index': index,
+            'parsed_info': parsed_info
+        }
+
+    @staticmethod
+    def iter_parse(kml_content: XMLSource, chunk_size: int = 64 * 1024) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Parse un fichier KML de manière incrémentale.
+        
+        Chaque feature est produite dès la fermeture de son Placemark, sans
+        attendre la fin du document ; les métadonnées, qui portent sur le
+        document entier, sont produites en dernier.
+        
+        Args:
+            kml_content: Contenu du fichier KML (texte, octets ou fichier binaire ouvert)
+            chunk_size: Taille des blocs fournis au parser
+            
+        Yields:
+            ('feature', feature) pour chaque entité puis ('metadata', metadata)
+            
+        Raises:
+            ET.ParseError: si le document est mal formé
+        """
+        placemark_tag = f"{{{KMLParser.NAMESPACES['kml']}}}Placemark"
+        parser = ET.XMLPullParser(events=('end',))
+        root = None
+        index = 0
+        extractor = DescriptionExtractor()
+        
+        def placemark_features():
+            nonlocal root, index
+            for _, elem in parser.read_events():
+                root = elem
+                if elem.tag == placemark_tag:
+                    feature = KMLParser._extract_placemark_data(elem, index, extractor)
+                    index += 1
+                    if feature:
+                        yield feature
+        
+        for chunk in iter_chunks(decompress_source(kml_content), chunk_size):
+            parser.feed(chunk)
+            for feature in placemark_features():
+                yield 'feature', feature
+        parser.close()
+        for feature in placemark_features():
+            yield 'feature', feature
+        
+        # Le dernier élément fermé est la racine du document
+        yield 'metadata', KMLParser._extract_metadata(root)
+
     @staticmethod
     @track_time
-    def parse_kml_coordinates(kml_content: str, display_mode: str = 'double') -> Dict[str, Any]:
+    def parse_kml_coordinates(kml_content: XMLSource, display_mode: str = 'double',
+                              progress: Optional[ProgressTracker] = None,
+                              folders: Optional[FolderFilter] = None) -> Dict[str, Any]:
         """
         Parse un fichier KML et extrait les coordonnées des traces GPS et tous les points.
         Méthode conservée pour compatibilité avec l'ancien code.
         
         Args:
-            kml_content: Contenu du fichier KML
+            kml_content: Contenu du fichier KML (texte, octets ou fichier binaire ouvert)
             display_mode: Mode d'affichage ('double' ou 'simple')
+            progress: Suivi de progression optionnel
+            folders: Filtre de dossiers optionnel (seuls les dossiers retenus sont parsés)
             
         Returns:
             dict: Données formatées pour Leaflet avec traces et points séparés
         """
         try:
             # Utiliser la nouvelle méthode parse et adapter le format de sortie
-            result = KMLParser.parse(kml_content)
+            result = KMLParser.parse(kml_content, progress, folders)
             
             if not result['success']:
                 return result
@@ -757,24 +907,7 @@ class KMLParser:
             # Séparer les points des autres features et adapter le format
             for feature in features:
                 if feature['type'] == 'marker':
-                    # Adapter le format pour compatibilité
-                    parsed_info = feature.get('parsed_info', {})
-                    formatted_description = KMLParser.format_point_description(parsed_info, display_mode)
-                    
-                    point_data = {
-                        'type': 'marker',
-                        'name': feature['name'],
-                        'description': formatted_description,
-                        'raw_description': feature['description'],
-                        'coordinates': feature['coordinates'],
-                        'altitude': feature.get('altitude', 0),
-                        'style': feature.get('style'),
-                        'is_annotation': False,  # Valeur par défaut
-                        'index': len(points),
-                        'parsed_info': parsed_info
-                    }
-                    
-                    points.append(point_data)
+                    points.append(KMLParser._build_point(feature, len(points), display_mode))
             
             return {
                 'success': True,
@@ -789,3 +922,30 @@ class KMLParser:
                 'success': False,
                 'error': f'Erreur lors du traitement: {str(e)}'
             }
+
+    @staticmethod
+    @track_time
+    def parse_kmz_coordinates(kmz_content, display_mode: str = 'double',
+                              progress: Optional[ProgressTracker] = None,
+                              folders: Optional[FolderFilter] = None) -> Dict[str, Any]:
+        """
+        Parse une archive KMZ : le document KML principal est décompressé
+        en flux directement dans le parser, sans extraction sur disque.
+        
+        Args:
+            kmz_content: Contenu de l'archive (octets, buffer ou fichier binaire ouvert)
+            display_mode: Mode d'affichage ('double' ou 'simple')
+            progress: Suivi de progression optionnel
+            folders: Filtre de dossiers optionnel
+            
+        Returns:
+            dict: Même format que parse_kml_coordinates
+        """
+        try:
+            with KMZArchive(kmz_content) as archive, archive.open_document() as document:
+                return KMLParser.parse_kml_coordinates(document, display_mode, progress, folders)
+        except ValueError as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
@@ -0,0 +1,117 @@
+"""
+Lecture des archives KMZ (KML zippé accompagné de ses ressources).
+Le document KML principal est décompressé à la volée vers le parser, sans
+extraction sur disque ; les ressources (images d'overlay, icônes) ne sont
+indexées qu'à la première demande. La taille décompressée de chaque entrée est
+bornée comme celle des documents compressés.
+"""
+
+import io
+import posixpath
+import zipfile
+from typing import Dict, Any, IO, Optional, Union
+
+from app.services import compression
+
+
+class KMZArchive:
+    """Archive KMZ ouverte en lecture.
+
+    ``source`` est le contenu de l'archive (octets ou buffer projeté en
+    mémoire) ou un fichier binaire ouvert positionnable. ``max_size`` borne la
+    taille décompressée de chaque entrée (configuration de l'application par
+    défaut).
+    """
+
+    def __init__(self, source: Union[bytes, IO[bytes]], max_size: Optional[int] = None):
+        fileobj = source if hasattr(source, 'read') else io.BytesIO(source)
+        try:
+            self._zip = zipfile.ZipFile(fileobj)
+        except zipfile.BadZipFile as exc:
+            raise ValueError('Archive KMZ invalide') from exc
+        self._resources: Optional[Dict[str, zipfile.ZipInfo]] = None
+        self._max_size = compression._max_decompressed_size if max_size is None else max_size
+
+    def __enter__(self) -> 'KMZArchive':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._zip.close()
+
+    @property
+    def main_document(self) -> zipfile.ZipInfo:
+        """Entrée du document principal : doc.kml, sinon le premier .kml de l'archive."""
+        kml_entries = [info for info in self._zip.infolist()
+                       if not info.is_dir() and info.filename.lower().endswith('.kml')]
+        if not kml_entries:
+            raise ValueError('Aucun document KML dans l\'archive KMZ')
+        for info in kml_entries:
+            if info.filename.lower() == 'doc.kml':
+                return info
+        return kml_entries[0]
+
+    def _open(self, info: zipfile.ZipInfo) -> IO[bytes]:
+        """Ouvre une entrée en flux décompressé borné.
+
+        La taille annoncée par l'en-tête est vérifiée avant toute lecture ; le
+        flux reste borné car cet en-tête peut être falsifié.
+
+        Raises:
+            DecompressionError: si l'entrée dépasse la taille maximale
+        """
+        if info.file_size > self._max_size:
+            raise compression.DecompressionError(
+                f'Entrée KMZ trop volumineuse : {info.filename} (maximum {self._max_size} octets)'
+            )
+        return compression._BoundedReader(self._zip.open(info), self._max_size)
+
+    def open_document(self) -> IO[bytes]:
+        """Ouvre le document principal en flux décompressé."""
+        return self._open(self.main_document)
+
+    @property
+    def resources(self) -> Dict[str, zipfile.ZipInfo]:
+        """Index des ressources de l'archive (hors documents KML), construit à la demande."""
+        if self._resources is None:
+            self._resources = {
+                info.filename: info for info in self._zip.infolist()
+                if not info.is_dir() and not info.filename.lower().endswith('.kml')
+            }
+        return self._resources
+
+    def resolve(self, href: str) -> Optional[str]:
+        """Retrouve l'entrée correspondant à un lien relatif du document."""
+        name = posixpath.normpath(href.replace('\\', '/')).lstrip('/')
+        if name in self.resources:
+            return name
+        return None
+
+    def read_resource(self, href: str) -> Optional[bytes]:
+        """Lit une ressource de l'archive, ou None si elle n'existe pas.
+
+        Raises:
+            DecompressionError: si la ressource dépasse la taille maximale
+        """
+        name = self.resolve(href)
+        if name is None:
+            return None
+        chunks = []
+        with self._open(self.resources[name]) as stream:
+            while True:
+                chunk = stream.read(64 * 1024)
+                if not chunk:
+                    return b''.join(chunks)
+                chunks.append(chunk)
+
+    def describe(self) -> Dict[str, Any]:
+        """Description de l'archive : document principal et ressources."""
+        return {
+            'document': self.main_document.filename,
+            'resources': [
+                {'name': name, 'size': info.file_size}
+                for name, info in sorted(self.resources.items())
+            ]
+        }
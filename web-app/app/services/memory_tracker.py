@@ -0,0 +1,164 @@
+"""
+Suivi optionnel de la mémoire allouée, par requête et par étape instrumentée.
+Activé par ``MEMORY_TRACKING``, il s'appuie sur ``tracemalloc`` : chaque
+requête et chaque fonction décorée par ``track_time`` relève le pic
+d'allocation atteint pendant son exécution (au-dessus de la mémoire déjà
+allouée à son entrée). Au-delà d'un seuil, les principaux sites
+d'allocation sont journalisés en JSON.
+
+``tracemalloc`` ralentit les allocations : le suivi est désactivé par
+défaut. Son pic est global au processus ; avec des requêtes concurrentes,
+les mesures d'une requête incluent les allocations des autres threads.
+"""
+
+import json
+import logging
+import threading
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+# Nombre de sites d'allocation journalisés au-delà du seuil
+TOP_ALLOCATION_SITES = 10
+
+enabled = False
+_threshold: Optional[int] = None
+_local = threading.local()
+_lock = threading.Lock()
+# Nom (fonction ou « MÉTHODE route ») -> [appels, pic maximal, somme des pics]
+_peaks: Dict[str, List[int]] = {}
+
+
+class _Frame:
+    """Étape en cours : mémoire à l'entrée et pic observé hors des sous-étapes."""
+
+    __slots__ = ('baseline', 'max_peak', 'dumped')
+
+    def __init__(self, baseline: int):
+        self.baseline = baseline
+        self.max_peak = baseline
+        self.dumped = False
+
+
+def _stack() -> List[_Frame]:
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def enter() -> _Frame:
+    """Ouvre une étape ; le pic de tracemalloc est remis à zéro pour elle."""
+    current, peak = tracemalloc.get_traced_memory()
+    stack = _stack()
+    if stack:
+        # Le pic atteint jusqu'ici appartient à l'étape englobante
+        stack[-1].max_peak = max(stack[-1].max_peak, peak)
+    frame = _Frame(current)
+    stack.append(frame)
+    tracemalloc.reset_peak()
+    return frame
+
+
+def leave(name: str, frame: _Frame) -> int:
+    """Ferme une étape ; retourne son pic d'allocation (octets au-dessus de l'entrée)."""
+    _, peak = tracemalloc.get_traced_memory()
+    stack = _stack()
+    if stack and stack[-1] is frame:
+        stack.pop()
+    absolute_peak = max(frame.max_peak, peak)
+    if stack:
+        stack[-1].max_peak = max(stack[-1].max_peak, absolute_peak)
+    stage_peak = absolute_peak - frame.baseline
+
+    with _lock:
+        entry = _peaks.get(name)
+        if entry is None:
+            entry = _peaks[name] = [0, 0, 0]
+        entry[0] += 1
+        entry[1] = max(entry[1], stage_peak)
+        entry[2] += stage_peak
+
+    if _threshold is not None and stage_peak >= _threshold:
+        root = stack[0] if stack else frame
+        if not root.dumped:
+            root.dumped = True
+            _dump_allocation_sites(name, stage_peak)
+    return stage_peak
+
+
+def _dump_allocation_sites(name: str, stage_peak: int):
+    """Journalise les principaux sites d'allocation encore vivants."""
+    statistics = tracemalloc.take_snapshot().statistics('lineno')[:TOP_ALLOCATION_SITES]
+    logger.warning(json.dumps({
+        'event': 'memory_threshold',
+        'stage': name,
+        'peak_bytes': stage_peak,
+        'threshold_bytes': _threshold,
+        'top_allocations': [
+            {'site': str(stat.traceback), 'size_bytes': stat.size, 'count': stat.count}
+            for stat in statistics
+        ],
+    }, ensure_ascii=False))
+
+
+def get_stats() -> Dict[str, Dict[str, Any]]:
+    """Pics d'allocation par étape et par route."""
+    with _lock:
+        return {
+            name: {
+                'memory_samples': calls,
+                'peak_memory_max_bytes': max_peak,
+                'peak_memory_avg_bytes': round(total / calls) if calls else 0,
+            }
+            for name, (calls, max_peak, total) in _peaks.items()
+        }
+
+
+def reset_stats():
+    with _lock:
+        _peaks.clear()
+
+
+def configure(enable: bool, threshold: Optional[int] = None, frames: int = 1):
+    """Active ou désactive le suivi (démarre ou arrête tracemalloc)."""
+    global enabled, _threshold
+    _threshold = threshold
+    if enable and not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    elif not enable and enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    enabled = enable
+
+
+def _start_request():
+    if enabled:
+        g.memory_frame = enter()
+
+
+def _finish_request(response):
+    frame = g.pop('memory_frame', None)
+    if frame is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        leave(f'{request.method} {route}', frame)
+    return response
+
+
+def _abandon_request(_exc):
+    # Requête interrompue par une exception : ne pas laisser ses trames sur la pile
+    if g.pop('memory_frame', None) is not None:
+        _stack().clear()
+
+
+def init_app(app):
+    """Applique la configuration de suivi mémoire de l'application."""
+    alert_mb = app.config.get('MEMORY_ALERT_MB')
+    configure(app.config.get('MEMORY_TRACKING', False),
+              int(alert_mb * 1024 ** 2) if alert_mb is not None else None,
+              app.config.get('MEMORY_TRACKING_FRAMES', 1))
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_abandon_request)
@@ -0,0 +1,328 @@
+"""
+Métriques au format d'exposition texte Prometheus, sans bibliothèque cliente.
+Chaque processus tient ses compteurs, jauges et histogrammes en mémoire. Avec
+un répertoire partagé (``METRICS_DIR``), il y dépose périodiquement un
+instantané (un fichier par processus, remplacé atomiquement) et ``/metrics``
+agrège les fichiers de tous les processus : compteurs et histogrammes sont
+sommés, les jauges ne sont retenues que pour les processus encore vivants.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import Response, g, request
+
+# Bornes (secondes) des histogrammes de durée
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Tranches de taille des documents parsés (bornes en octets)
+SIZE_BUCKETS = ((1024 ** 2, 'lt_1mb'), (10 * 1024 ** 2, '1mb_10mb'), (100 * 1024 ** 2, '10mb_100mb'))
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LabelValues = Tuple[str, ...]
+
+
+def size_bucket(size: Optional[int]) -> str:
+    """Tranche de taille d'un document, utilisée comme étiquette."""
+    if size is None:
+        return 'unknown'
+    for limit, label in SIZE_BUCKETS:
+        if size < limit:
+            return label
+    return 'ge_100mb'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric:
+    """Métrique nommée, avec ses valeurs par combinaison d'étiquettes."""
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def reset(self):
+        self._values.clear()
+
+    def dump(self, collectors: bool = True) -> List[list]:
+        """Valeurs sérialisables en JSON : [[étiquettes...], valeur]."""
+        return [[list(key), list(value) if isinstance(value, list) else value]
+                for key, value in self._values.items()]
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with registry.lock:
+            registry.check_fork()
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels):
+        with registry.lock:
+            registry.check_fork()
+            self._values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], float]):
+        """Valeur calculée à chaque collecte (jauge sans étiquette)."""
+        self._function = function
+
+    def dump(self, collectors: bool = True) -> List[list]:
+        if self._function is not None:
+            return [[[], float(self._function())]] if collectors else []
+        return super().dump()
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with registry.lock:
+            registry.check_fork()
+            # Comptes par intervalle (non cumulés), puis somme et nombre d'observations
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    break
+            else:
+                index = len(self.buckets)
+            counts[index] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+
+class MetricsRegistry:
+    """Métriques du processus et agrégation entre processus."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.metrics: Dict[str, Metric] = {}
+        self.directory: Optional[str] = None
+        self.flush_interval = 5.0
+        self._pid = os.getpid()
+        self._last_flush = 0.0
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def check_fork(self):
+        """Dans un processus issu d'un fork, repart de zéro (le parent publie ses propres valeurs)."""
+        pid = os.getpid()
+        if pid != self._pid:
+            self._pid = pid
+            self._last_flush = 0.0
+            for metric in self.metrics.values():
+                metric.reset()
+
+    def snapshot(self, collectors: bool = True) -> Dict[str, list]:
+        """Valeurs du processus ; ``collectors=False`` omet les jauges calculées.
+
+        Un processus du pool de parsing hérite de l'état du processus web
+        (cache, file d'attente) : il ne doit publier que ses propres mesures.
+        """
+        with self.lock:
+            self.check_fork()
+            return {name: metric.dump(collectors) for name, metric in self.metrics.items()}
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f'metrics_{pid}.json')
+
+    def flush(self, force: bool = True, collectors: bool = True):
+        """Publie l'instantané du processus dans le répertoire partagé."""
+        if self.directory is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        self._last_flush = now
+        data = json.dumps({'pid': os.getpid(), 'metrics': self.snapshot(collectors)})
+        path = self._path(os.getpid())
+        temporary = f'{path}.{threading.get_ident()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as handle:
+            handle.write(data)
+        os.replace(temporary, path)
+
+    @staticmethod
+    def _alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def _snapshots(self) -> List[Tuple[Dict[str, list], bool]]:
+        """Instantanés à agréger : (métriques, processus vivant)."""
+        own_pid = os.getpid()
+        snapshots = [(self.snapshot(), True)]
+        if self.directory is None or not os.path.isdir(self.directory):
+            return snapshots
+        for filename in os.listdir(self.directory):
+            if not (filename.startswith('metrics_') and filename.endswith('.json')):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename), encoding='utf-8') as handle:
+                    data = json.load(handle)
+            except (OSError, ValueError):
+                continue  # Fichier en cours de remplacement ou illisible
+            if data.get('pid') != own_pid:
+                snapshots.append((data.get('metrics', {}), self._alive(data.get('pid', 0))))
+        return snapshots
+
+    def collect(self) -> Dict[str, Dict[LabelValues, object]]:
+        """Valeurs agrégées de tous les processus, par métrique."""
+        merged: Dict[str, Dict[LabelValues, object]] = {name: {} for name in self.metrics}
+        for snapshot, alive in self._snapshots():
+            for name, samples in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None or (metric.kind == 'gauge' and not alive):
+                    continue
+                values = merged[name]
+                for labels, value in samples:
+                    key = tuple(labels)
+                    if metric.kind == 'histogram':
+                        current = values.get(key)
+                        values[key] = value if current is None else [a + b for a, b in zip(current, value)]
+                    else:
+                        values[key] = values.get(key, 0) + value
+        return merged
+
+    def render(self) -> str:
+        """Exposition texte de toutes les métriques."""
+        lines = []
+        for name, values in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for key, value in sorted(values.items()):
+                if metric.kind != 'histogram':
+                    lines.append(f'{name}{_format_labels(metric.labelnames, key)} {_format_value(value)}')
+                    continue
+                cumulated = 0
+                bounds = list(metric.buckets) + [float('inf')]
+                for bound, count in zip(bounds, value[:-2]):
+                    cumulated += count
+                    labels = _format_labels(metric.labelnames + ('le',), key + (_format_value(bound),))
+                    lines.append(f'{name}_bucket{labels} {cumulated}')
+                labels = _format_labels(metric.labelnames, key)
+                lines.append(f'{name}_sum{labels} {_format_value(value[-2])}')
+                lines.append(f'{name}_count{labels} {value[-1]}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """Remet à zéro les métriques du processus (principalement pour les tests)."""
+        with self.lock:
+            for metric in self.metrics.values():
+                metric.reset()
+
+
+registry = MetricsRegistry()
+
+REQUEST_DURATION = registry.register(Histogram(
+    'http_request_duration_seconds', 'Durée de traitement des requêtes HTTP par route',
+    ('method', 'route', 'status')))
+PARSE_DURATION = registry.register(Histogram(
+    'document_parse_duration_seconds', 'Durée de parsing des documents par format et taille',
+    ('format', 'size')))
+CACHE_HITS = registry.register(Counter(
+    'parse_cache_hits_total', 'Résultats de parsing servis depuis le cache'))
+CACHE_MISSES = registry.register(Counter(
+    'parse_cache_misses_total', 'Documents absents du cache de parsing'))
+CACHE_EVICTIONS = registry.register(Counter(
+    'parse_cache_evictions_total', 'Résultats retirés du cache de parsing'))
+CACHE_ENTRIES = registry.register(Gauge(
+    'parse_cache_entries', 'Résultats présents dans le cache de parsing'))
+DOCUMENT_STORE_BYTES = registry.register(Gauge(
+    'document_store_bytes', 'Mémoire estimée des documents conservés (résultats sérialisés et archives KMZ)'))
+WORKER_QUEUE_DEPTH = registry.register(Gauge(
+    'worker_pool_queue_depth', 'Tâches soumises au pool de processus et non terminées'))
+
+
+def observe_parse(file_format: str, size: Optional[int], seconds: float):
+    """Enregistre la durée d'un parsing complet."""
+    PARSE_DURATION.observe(seconds, format=file_format, size=size_bucket(size))
+
+
+def configure(directory: Optional[str], flush_interval: float = 5.0):
+    """Active (ou non) le partage des métriques entre processus via ``directory``."""
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    registry.directory = directory or None
+    registry.flush_interval = flush_interval
+
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+
+
+def _after_request(response):
+    start = g.pop('metrics_start', None)
+    if start is not None:
+        # Réponses en flux : durée jusqu'au début de la réponse
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        REQUEST_DURATION.observe(time.perf_counter() - start, method=request.method,
+                                 route=route, status=str(response.status_code))
+    registry.flush(force=False)
+    return response
+
+
+def metrics_endpoint():
+    """Exposition des métriques au format texte Prometheus."""
+    return Response(registry.render(), mimetype=None, content_type=CONTENT_TYPE)
+
+
+def init_app(app):
+    """Installe la mesure des requêtes, les jauges calculées et la route ``/metrics``."""
+    from app.services import cache_service, worker_pool
+
+    configure(app.config.get('METRICS_DIR'), app.config.get('METRICS_FLUSH_INTERVAL', 5.0))
+    CACHE_ENTRIES.set_function(cache_service.cache_size)
+    DOCUMENT_STORE_BYTES.set_function(cache_service.store_size_bytes)
+    WORKER_QUEUE_DEPTH.set_function(worker_pool.queue_depth)
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_endpoint)
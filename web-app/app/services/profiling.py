@@ -0,0 +1,223 @@
+"""
+Profilage à la demande d'une requête.
+Une requête portant ``X-Profile: cprofile`` (ou ``sample``), ou le paramètre
+``?profile=...``, accompagnée du jeton d'administration, est exécutée sous
+``cProfile`` ou sous un échantillonneur de piles léger. Le profil obtenu
+(``.pstats`` ou piles repliées) est conservé dans un tampon circulaire des N
+derniers profils et récupérable via ``/api/profiles/<id>``.
+"""
+
+import cProfile
+import hmac
+import io
+import logging
+import marshal
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+PROFILERS = ('cprofile', 'sample')
+
+# Période d'échantillonnage des piles (secondes)
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+
+class StackSampler:
+    """Échantillonneur de piles d'un thread : relève périodiquement sa pile d'appels."""
+
+    def __init__(self, thread_id: int, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self._thread_id = thread_id
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({code.co_filename.rsplit("/", 1)[-1]}:{code.co_firstlineno})')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> bytes:
+        """Piles au format replié (une pile et son nombre d'échantillons par ligne)."""
+        lines = [f'{stack} {count}' for stack, count in self.stacks.most_common()]
+        return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class Profile:
+    """Profil d'une requête."""
+
+    def __init__(self, kind: str, method: str, path: str, duration: float, data: bytes):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.method = method
+        self.path = path
+        self.duration = duration
+        self.data = data
+        self.created_at = time.time()
+
+    @property
+    def filename(self) -> str:
+        return f"profile-{self.id}.{'pstats' if self.kind == 'cprofile' else 'collapsed'}"
+
+    def summary(self, limit: int = 40) -> str:
+        """Résumé texte : fonctions les plus coûteuses (cProfile) ou piles les plus fréquentes."""
+        if self.kind != 'cprofile':
+            return '\n'.join(self.data.decode('utf-8').splitlines()[:limit]) + '\n'
+        stats = pstats.Stats(_StatsSource(marshal.loads(self.data)), stream=io.StringIO())
+        stats.sort_stats('cumulative').print_stats(limit)
+        return stats.stream.getvalue()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'profile_id': self.id,
+            'kind': self.kind,
+            'method': self.method,
+            'path': self.path,
+            'duration_ms': round(self.duration * 1000, 3),
+            'size': len(self.data),
+            'created_at': self.created_at,
+        }
+
+
+class _StatsSource:
+    """Source minimale pour ``pstats.Stats`` à partir de statistiques déjà chargées."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class ProfileStore:
+    """Tampon circulaire des derniers profils."""
+
+    def __init__(self, capacity: int = 20):
+        self._lock = threading.Lock()
+        self._profiles: 'OrderedDict[str, Profile]' = OrderedDict()
+        self.capacity = capacity
+        self.token: Optional[str] = None
+
+    def configure(self, token: Optional[str], capacity: int):
+        with self._lock:
+            self.token = token or None
+            self.capacity = capacity
+            self._trim()
+
+    @property
+    def enabled(self) -> bool:
+        return self.token is not None
+
+    def authorized(self, provided: Optional[str]) -> bool:
+        """Vérifie le jeton d'administration (comparaison à temps constant).
+
+        Les valeurs sont comparées en octets : compare_digest refuse les
+        chaînes non ASCII qu'un en-tête peut contenir.
+        """
+        return (self.enabled and provided is not None
+                and hmac.compare_digest(provided.encode('utf-8'), self.token.encode('utf-8')))
+
+    def _trim(self):
+        while len(self._profiles) > self.capacity:
+            self._profiles.popitem(last=False)
+
+    def add(self, profile: Profile) -> Profile:
+        with self._lock:
+            self._profiles[profile.id] = profile
+            self._trim()
+        return profile
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> List[Profile]:
+        with self._lock:
+            return list(reversed(self._profiles.values()))
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+
+
+# Profils partagés par toute l'application
+profile_store = ProfileStore()
+
+
+def _requested_profiler() -> Optional[str]:
+    kind = request.headers.get('X-Profile') or request.args.get('profile')
+    if kind not in PROFILERS:
+        return None
+    if not profile_store.authorized(request.headers.get('X-Profile-Token')):
+        logger.warning("Profilage refusé pour %s %s : jeton absent ou invalide", request.method, request.path)
+        return None
+    return kind
+
+
+def _start_profile():
+    kind = _requested_profiler()
+    if kind is None:
+        return
+    if kind == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+    else:
+        profiler = StackSampler(threading.get_ident())
+        profiler.start()
+    g.profile_state = (kind, profiler, time.perf_counter())
+
+
+def _stop_profile() -> Optional[Profile]:
+    state = g.pop('profile_state', None)
+    if state is None:
+        return None
+    kind, profiler, start = state
+    duration = time.perf_counter() - start
+    if kind == 'cprofile':
+        profiler.disable()
+        profiler.create_stats()
+        data = marshal.dumps(profiler.stats)
+    else:
+        profiler.stop()
+        data = profiler.collapsed()
+    return profile_store.add(Profile(kind, request.method, request.path, duration, data))
+
+
+def _finish_profile(response):
+    profile = _stop_profile()
+    if profile is not None:
+        response.headers['X-Profile-Id'] = profile.id
+    return response
+
+
+def init_app(app):
+    """Active le profilage si un jeton d'administration est configuré."""
+    profile_store.configure(app.config.get('PROFILING_TOKEN'), app.config.get('PROFILE_HISTORY', 20))
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    # Requête interrompue par une exception : arrêter le profileur quand même
+    app.teardown_request(lambda _exc: _stop_profile())
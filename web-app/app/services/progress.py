@@ -0,0 +1,139 @@
+"""
+Suivi de progression des traitements longs (parsing, analyses).
+"""
+
+import io
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from typing import Dict, Any, AnyStr, BinaryIO, Iterator, Optional, Union
+
+from app.services.compression import decompress_source
+
+# Taille des blocs fournis au parser XML lorsque la progression est suivie
+XML_FEED_CHUNK_SIZE = 1024 * 1024
+
+# Document XML accepté par les parsers : texte, octets bruts ou fichier binaire ouvert
+XMLSource = Union[str, bytes, BinaryIO]
+
+
+class ProgressTracker:
+    """Progression d'un traitement : étape courante et avancement dans cette étape.
+
+    Les services reçoivent un tracker optionnel et ne le mettent à jour que
+    tous les ``every`` éléments pour ne pas ralentir les boucles de traitement.
+    Chaque mise à jour incrémente ``version`` et réveille les observateurs
+    (flux SSE) en attente dans ``wait_for_change``.
+    """
+
+    def __init__(self, every: int = 500):
+        self.every = max(1, every)
+        self.stage = 'pending'
+        self.current = 0
+        self.total: Optional[int] = None
+        self.bytes_consumed = 0
+        self.bytes_total: Optional[int] = None
+        self.updated_at = time.time()
+        self.version = 0
+        self._changed = threading.Condition()
+
+    def _notify(self):
+        with self._changed:
+            self.updated_at = time.time()
+            self.version += 1
+            self._changed.notify_all()
+
+    def set_stage(self, stage: str, total: Optional[int] = None):
+        """Démarre une nouvelle étape du traitement."""
+        self.stage = stage
+        self.current = 0
+        self.total = total
+        self._notify()
+
+    def update(self, current: int, total: Optional[int] = None):
+        """Met à jour l'avancement dans l'étape courante."""
+        self.current = current
+        if total is not None:
+            self.total = total
+        self._notify()
+
+    def update_bytes(self, consumed: int, total: Optional[int] = None):
+        """Met à jour le volume de données source déjà lu."""
+        self.bytes_consumed = consumed
+        if total is not None:
+            self.bytes_total = total
+        self._notify()
+
+    def touch(self):
+        """Signale un changement d'état sans modifier la progression."""
+        self._notify()
+
+    def wait_for_change(self, version: int, timeout: Optional[float] = None) -> bool:
+        """Attend une mise à jour postérieure à ``version`` ; False si le délai expire."""
+        with self._changed:
+            return self._changed.wait_for(lambda: self.version != version, timeout)
+
+    def to_dict(self) -> Dict[str, Any]:
+        percent = None
+        if self.total:
+            percent = round(min(100.0, 100.0 * self.current / self.total), 1)
+        return {
+            'stage': self.stage,
+            'current': self.current,
+            'total': self.total,
+            'percent': percent,
+            'bytes_consumed': self.bytes_consumed,
+            'bytes_total': self.bytes_total,
+            'updated_at': self.updated_at
+        }
+
+
+def iter_chunks(source: XMLSource, chunk_size: int = XML_FEED_CHUNK_SIZE) -> Iterator[AnyStr]:
+    """Découpe un document (texte, octets ou fichier binaire ouvert) en blocs."""
+    if hasattr(source, 'read'):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+
+
+def source_size(source: XMLSource) -> Optional[int]:
+    """Taille d'un document, ou None pour un flux de taille inconnue."""
+    if not hasattr(source, 'read'):
+        return len(source)
+    try:
+        return os.fstat(source.fileno()).st_size
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+def parse_xml(source: XMLSource, progress: Optional[ProgressTracker] = None, target=None) -> ET.Element:
+    """Construit l'arbre XML d'un document en rapportant le volume lu.
+
+    ``source`` est le document sous forme de texte, d'octets ou de fichier
+    binaire ouvert. Fournis en octets, l'encodage est celui de la déclaration
+    XML (UTF-8 par défaut) et le contenu n'est jamais décodé en une chaîne
+    Python ; un fichier est lu par blocs sans être chargé entièrement. Un
+    contenu compressé (gzip, zstd) est décompressé en flux. ``target``
+    remplace la construction d'arbre par défaut (voir ``ET.XMLParser``).
+    """
+    source = decompress_source(source)
+    if progress is None and target is None and not hasattr(source, 'read'):
+        return ET.fromstring(source)
+
+    if progress is not None:
+        progress.set_stage('parse_xml')
+        progress.update_bytes(0, source_size(source))
+    parser = ET.XMLParser(target=target)
+    consumed = 0
+    for chunk in iter_chunks(source):
+        parser.feed(chunk)
+        consumed += len(chunk)
+        if progress is not None:
+            progress.update_bytes(consumed)
+    return parser.close()
@@ -1,33 +1,212 @@
+"""
+Instrumentation des temps d'exécution.
+Chaque fonction décorée alimente un histogramme logarithmique (façon HDR)
+d'où sont tirés les percentiles p50/p95/p99. Les mesures sont d'abord
+déposées dans une file (ajout atomique, sans verrou) puis agrégées par lots
+sous verrou : les comptes restent exacts entre threads. Les
+fonctions appelées très souvent peuvent n'être mesurées qu'une fois sur N,
+et ``TIMING_ENABLED=0`` désactive entièrement l'instrumentation : le
+décorateur retourne alors la fonction d'origine, sans aucun surcoût.
+Pendant une requête tracée, chaque appel mesuré (hors fonctions
+échantillonnées) ouvre aussi un nœud de l'arbre de traçage ; si le suivi
+mémoire est actif, ces mêmes appels relèvent leur pic d'allocation.
+"""
+
+import itertools
+import os
+from collections import deque
+import threading
 import time
 from functools import wraps  # Import pour conserver le nom de la fonction d'origine
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from app.services import memory_tracker
+from app.services.tracing import current_span
+
+# Lu à l'import : les fonctions sont décorées avant la création de l'application
+TIMING_ENABLED = os.environ.get('TIMING_ENABLED', '1').lower() not in ('0', 'false', 'no')
+
+# Sous-intervalles linéaires par puissance de deux : erreur relative <= 1/16
+_SUB_BUCKET_BITS = 4
+
+# Nombre de mesures en attente au-delà duquel elles sont agrégées
+_DRAIN_THRESHOLD = 1024
+
+
+def _buckets(durations: np.ndarray) -> np.ndarray:
+    """Bornes inférieures des intervalles d'histogramme contenant chaque durée (ns)."""
+    exponents = np.floor(np.log2(np.maximum(durations, 1))).astype(np.int64)
+    shifts = np.maximum(exponents - _SUB_BUCKET_BITS, 0)
+    return (durations >> shifts) << shifts
+
+
+def _bucket_width(lower: int) -> int:
+    shift = lower.bit_length() - _SUB_BUCKET_BITS - 1
+    return 1 << shift if shift > 0 else 1
+
+
+def _percentile(buckets: Dict[int, int], samples: int, quantile: float, max_ns: int) -> float:
+    """Percentile estimé (milieu de l'intervalle), en nanosecondes."""
+    rank = quantile * samples
+    cumulated = 0
+    for lower in sorted(buckets):
+        cumulated += buckets[lower]
+        if cumulated >= rank:
+            return min(lower + _bucket_width(lower) / 2, max_ns)
+    return float(max_ns)
+
+
+class FunctionStats:
+    """Durées mesurées d'une fonction (en nanosecondes)."""
+
+    def __init__(self, name: str, sample_rate: int = 1):
+        self.name = name
+        self.sample_rate = sample_rate
+        self.calls = itertools.count()  # next() est atomique : pas de verrou pour compter
+        self.last_call = -1  # Dernier appel mesuré (fonctions échantillonnées)
+        self.pending: deque = deque()  # append/popleft atomiques
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.pending.clear()
+            # Les appels sont comptés à partir de la remise à zéro
+            self._first_call = next(self.calls) + 1
+            self.samples = 0
+            self.total_ns = 0
+            self.min_ns: Optional[int] = None
+            self.max_ns = 0
+            self.buckets: Dict[int, int] = {}
 
-# Dictionnaire global pour stocker les durées cumulées des fonctions
-execution_times = {}
+    def drain(self):
+        """Agrège par lot les mesures en attente."""
+        with self._lock:
+            count = len(self.pending)
+            if not count:
+                return
+            durations = np.fromiter((self.pending.popleft() for _ in range(count)), np.int64, count)
+            self.samples += count
+            self.total_ns += int(durations.sum())
+            low, high = int(durations.min()), int(durations.max())
+            self.min_ns = low if self.min_ns is None else min(self.min_ns, low)
+            self.max_ns = max(self.max_ns, high)
+            lowers, counts = np.unique(_buckets(durations), return_counts=True)
+            for lower, n in zip(lowers.tolist(), counts.tolist()):
+                self.buckets[lower] = self.buckets.get(lower, 0) + n
 
-def track_time(func):
+    def snapshot(self) -> Dict[str, Any]:
+        """Statistiques de la fonction ; les totaux sont extrapolés si elle est échantillonnée."""
+        self.drain()
+        with self._lock:
+            samples, total_ns, buckets = self.samples, self.total_ns, dict(self.buckets)
+            calls = max(self.last_call + 1 - self._first_call, samples)
+            min_ns, max_ns = self.min_ns or 0, self.max_ns
+        average_ns = total_ns / samples if samples else 0
+        estimated_total = average_ns * calls
+        return {
+            'call_count': calls,
+            'sampled_calls': samples,
+            'sample_rate': self.sample_rate,
+            'total_time': round(estimated_total / 1e9, 4),
+            'average_time': round(average_ns / 1e9, 6),
+            'min_ms': round(min_ns / 1e6, 4),
+            'max_ms': round(max_ns / 1e6, 4),
+            'p50_ms': round(_percentile(buckets, samples, 0.50, max_ns) / 1e6, 4),
+            'p95_ms': round(_percentile(buckets, samples, 0.95, max_ns) / 1e6, 4),
+            'p99_ms': round(_percentile(buckets, samples, 0.99, max_ns) / 1e6, 4),
+        }
+
+
+# Statistiques par nom qualifié (module.Classe.fonction) : une route et une
+# méthode d'analyse de même nom restent distinctes
+_registry: Dict[str, FunctionStats] = {}
+_registry_lock = threading.Lock()
+
+
+def _stats_for(name: str, sample_rate: int) -> FunctionStats:
+    with _registry_lock:
+        stats = _registry.get(name)
+        if stats is None:
+            stats = _registry[name] = FunctionStats(name, sample_rate)
+        return stats
+
+
+def track_time(func: Optional[Callable] = None, *, sample_rate: int = 1):
     """
     Décorateur pour suivre le temps d'exécution d'une fonction et le cumuler.
+
+    Utilisable tel quel (``@track_time``) ou avec un taux d'échantillonnage
+    pour les fonctions appelées en boucle (``@track_time(sample_rate=100)`` :
+    une mesure tous les 100 appels).
     """
-    @wraps(func)  # Conserve le nom et les métadonnées de la fonction décorée
-    def wrapper(*args, **kwargs):
-        # Heure de début
-        start_time = time.time()
-        # Appel de la fonction originale
-        result = func(*args, **kwargs)
-        # Heure de fin
-        end_time = time.time()
-        
-        # Temps d'exécution
-        duration = end_time - start_time
-        
-        # Cumuler la durée dans le dictionnaire
-        func_name = func.__name__
-        if func_name not in execution_times:
-            execution_times[func_name] = {'total_time': 0, 'count': 0}
-            
-        execution_times[func_name]['total_time'] += duration
-        execution_times[func_name]['count'] += 1
-        
-        return result
-
-    return wrapper
\ No newline at end of file
+    if func is None:
+        return lambda f: track_time(f, sample_rate=sample_rate)
+    if not TIMING_ENABLED:
+        return func
+
+    stats = _stats_for(f'{func.__module__}.{func.__qualname__}', max(1, sample_rate))
+    clock = time.perf_counter_ns
+    pending = stats.pending
+
+    if stats.sample_rate == 1:
+        # Nom court dans l'arbre de traçage, qualifié pour les pics mémoire (fusionnés à /api/stats)
+        name, qualified_name = func.__name__, stats.name
+
+        @wraps(func)  # Conserve le nom et les métadonnées de la fonction décorée
+        def wrapper(*args, **kwargs):
+            parent = current_span.get()
+            if parent is not None:
+                node = parent.child(name)
+                token = current_span.set(node)
+            memory_frame = memory_tracker.enter() if memory_tracker.enabled else None
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                duration = clock() - start
+                pending.append(duration)
+                if memory_frame is not None:
+                    memory_tracker.leave(qualified_name, memory_frame)
+                if parent is not None:
+                    node.record(duration)
+                    current_span.reset(token)
+                if len(pending) >= _DRAIN_THRESHOLD:
+                    stats.drain()
+        return wrapper
+
+    rate = stats.sample_rate
+    calls = stats.calls
+
+    @wraps(func)
+    def sampled_wrapper(*args, **kwargs):
+        call_index = next(calls)
+        if call_index % rate:
+            return func(*args, **kwargs)
+        start = clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            pending.append(clock() - start)
+            stats.last_call = call_index
+            if len(pending) >= _DRAIN_THRESHOLD:
+                stats.drain()
+    return sampled_wrapper
+
+
+def get_stats() -> Dict[str, Dict[str, Any]]:
+    """Statistiques de toutes les fonctions mesurées au moins une fois."""
+    with _registry_lock:
+        registry = list(_registry.values())
+    snapshots = {stats.name: stats.snapshot() for stats in registry}
+    return {name: data for name, data in snapshots.items() if data['sampled_calls']}
+
+
+def reset_stats():
+    """Remet à zéro les mesures (les fonctions restent instrumentées)."""
+    with _registry_lock:
+        registry = list(_registry.values())
+    for stats in registry:
+        stats.reset()
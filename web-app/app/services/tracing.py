@@ -0,0 +1,164 @@
+"""
+Traçage hiérarchique des requêtes.
+Pour une requête échantillonnée, chaque fonction instrumentée par
+``track_time`` (et chaque bloc ``span``) ouvre un nœud dans l'arbre de la
+requête ; les appels répétés d'une même fonction sous un même parent sont
+cumulés dans un seul nœud, l'arbre reste donc borné. La décomposition est
+renvoyée dans l'en-tête ``Server-Timing`` et l'arbre complet est journalisé
+en JSON au-delà d'un seuil de durée. Hors échantillon, le coût se limite à
+la lecture d'une variable de contexte.
+"""
+
+import json
+import logging
+import random
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+# Nombre maximal d'entrées dans l'en-tête Server-Timing
+MAX_SERVER_TIMING_ENTRIES = 20
+
+_TOKEN_RE = re.compile(r'[^A-Za-z0-9_.\-]')
+
+
+class Span:
+    """Nœud de l'arbre : appels cumulés d'une fonction sous un même parent."""
+
+    __slots__ = ('name', 'count', 'total_ns', 'children')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.total_ns = 0
+        self.children: Dict[str, 'Span'] = {}
+
+    def child(self, name: str) -> 'Span':
+        node = self.children.get(name)
+        if node is None:
+            node = self.children[name] = Span(name)
+        return node
+
+    def record(self, duration_ns: int):
+        self.count += 1
+        self.total_ns += duration_ns
+
+    def to_dict(self) -> Dict[str, Any]:
+        children_ns = sum(child.total_ns for child in self.children.values())
+        data = {
+            'name': self.name,
+            'count': self.count,
+            'duration_ms': round(self.total_ns / 1e6, 3),
+            'self_ms': round(max(self.total_ns - children_ns, 0) / 1e6, 3),
+        }
+        if self.children:
+            data['children'] = [child.to_dict() for child in self.children.values()]
+        return data
+
+    def flatten(self, prefix: str = '') -> Iterator[Tuple[str, 'Span']]:
+        """Parcours en profondeur : (chemin pointé, nœud)."""
+        path = f'{prefix}.{self.name}' if prefix else self.name
+        yield path, self
+        for child in self.children.values():
+            yield from child.flatten(path)
+
+
+# Nœud courant de la requête tracée (None hors traçage)
+current_span: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+
+@contextmanager
+def span(name: str):
+    """Ouvre un nœud explicite pour un bloc de code (sans effet hors traçage)."""
+    parent = current_span.get()
+    if parent is None:
+        yield
+        return
+    node = parent.child(name)
+    token = current_span.set(node)
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        node.record(time.perf_counter_ns() - start)
+        current_span.reset(token)
+
+
+def server_timing(root: Span) -> str:
+    """Valeur de l'en-tête Server-Timing : une entrée par nœud, les plus longs d'abord."""
+    entries: List[Tuple[str, Span]] = list(root.flatten())
+    total, nodes = entries[0], entries[1:]
+    nodes.sort(key=lambda entry: entry[1].total_ns, reverse=True)
+    parts = []
+    for path, node in [total] + nodes[:MAX_SERVER_TIMING_ENTRIES - 1]:
+        part = f'{_TOKEN_RE.sub("_", path)};dur={node.total_ns / 1e6:.3f}'
+        if node.count > 1:
+            part += f';desc="x{node.count}"'
+        parts.append(part)
+    return ', '.join(parts)
+
+
+class RequestTracer:
+    """Échantillonnage des requêtes et restitution de leur arbre."""
+
+    def __init__(self, sample_rate: float = 1.0, slow_request_ms: Optional[float] = None):
+        self.sample_rate = sample_rate
+        self.slow_request_ms = slow_request_ms
+
+    def sampled(self, forced: bool = False) -> bool:
+        return forced or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def start(self):
+        """Démarre le traçage de la requête courante ; retourne l'état à passer à ``finish``."""
+        root = Span('total')
+        return root, current_span.set(root), time.perf_counter_ns()
+
+    def finish(self, state, method: str, path: str, status: int) -> Span:
+        root, token, start = state
+        root.record(time.perf_counter_ns() - start)
+        current_span.reset(token)
+        if self.slow_request_ms is not None and root.total_ns / 1e6 >= self.slow_request_ms:
+            logger.warning(json.dumps({
+                'event': 'slow_request',
+                'method': method,
+                'path': path,
+                'status': status,
+                'duration_ms': round(root.total_ns / 1e6, 3),
+                'trace': root.to_dict(),
+            }, ensure_ascii=False))
+        return root
+
+
+tracer = RequestTracer()
+
+
+def init_app(app):
+    """Installe le traçage des requêtes selon la configuration de l'application."""
+    tracer.sample_rate = app.config.get('TRACE_SAMPLE_RATE', 1.0)
+    tracer.slow_request_ms = app.config.get('TRACE_SLOW_REQUEST_MS')
+
+    @app.before_request
+    def _start_trace():
+        if tracer.sampled(request.headers.get('X-Trace') == '1'):
+            g.trace_state = tracer.start()
+
+    @app.after_request
+    def _finish_trace(response):
+        state = g.pop('trace_state', None)
+        if state is not None:
+            root = tracer.finish(state, request.method, request.path, response.status_code)
+            response.headers['Server-Timing'] = server_timing(root)
+        return response
+
+    @app.teardown_request
+    def _abandon_trace(_exc):
+        # Requête interrompue par une exception : ne pas laisser le contexte tracé
+        state = g.pop('trace_state', None)
+        if state is not None:
+            current_span.reset(state[1])
@@ -5,11 +5,13 @@ Implémente les fonctionnalités d'analyse de base de la Phase 3.
 
 import math
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 import numpy as np
 from geopy.distance import geodesic
+from app.services import analysis_backend, fast_analysis
 from app.services.timing_tools import track_time
+from app.services.progress import ProgressTracker
 
 # Configuration du logger
 logging.basicConfig(
@@ -48,7 +50,7 @@ class TrajectoryAnalyzer:
         return filtered or values
     
     @staticmethod
-    @track_time
+    @track_time(sample_rate=100)
     def calculate_distance_between_points(
         point1: List[float], point2: List[float], include_altitude: bool = False
     ) -> float:
@@ -113,6 +115,16 @@ class TrajectoryAnalyzer:
 
         return float(distance_2d)
 
+    @staticmethod
+    def _pair_distances(coordinates: List[List[float]]) -> List[float]:
+        """Distances entre points consécutifs, selon le backend d'analyse."""
+        if analysis_backend.is_fast():
+            return fast_analysis.pair_distances(coordinates).tolist()
+        return [
+            TrajectoryAnalyzer.calculate_distance_between_points(coordinates[i - 1], coordinates[i])
+            for i in range(1, len(coordinates))
+        ]
+
     @staticmethod
     @track_time
     def calculate_elevation_profile(coordinates: List[List[float]]) -> Dict[str, Any]:
@@ -125,6 +137,9 @@ class TrajectoryAnalyzer:
         Returns:
             Dictionnaire avec les statistiques d'élévation
         """
+        if analysis_backend.is_fast():
+            return fast_analysis.elevation_profile(coordinates)
+
         if len(coordinates) < 2:
             return {
                 "total_ascent": 0.0,
@@ -316,12 +331,15 @@ class TrajectoryAnalyzer:
 
     @staticmethod
     @track_time
-    def analyze_trajectory(features: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def analyze_trajectory(
+        features: List[Dict[str, Any]], progress: Optional[ProgressTracker] = None
+    ) -> Dict[str, Any]:
         """
         Analyse complète d'une trajectoire GPS.
 
         Args:
             features: Liste des features (polylines et points) du KML
+            progress: Suivi de progression optionnel
 
         Returns:
             Dictionnaire avec toutes les analyses
@@ -345,8 +363,12 @@ class TrajectoryAnalyzer:
         }
 
         # Analyser chaque trace
+        if progress is not None:
+            progress.set_stage("distance", len(polylines))
         all_coordinates = []
-        for polyline in polylines:
+        for index, polyline in enumerate(polylines, 1):
+            if progress is not None:
+                progress.update(index)
             coordinates = polyline.get("coordinates", [])
             if coordinates:
                 all_coordinates.extend(coordinates)
@@ -364,6 +386,8 @@ class TrajectoryAnalyzer:
 
         # Analyse d'élévation si on a des coordonnées
         if all_coordinates and analysis["basic_stats"]["has_elevation_data"]:
+            if progress is not None:
+                progress.set_stage("elevation")
             analysis["elevation"] = TrajectoryAnalyzer.calculate_elevation_profile(all_coordinates)
 
         # Analyse de vitesse si on a des points avec des données de vitesse
@@ -373,6 +397,8 @@ class TrajectoryAnalyzer:
             analysis["basic_stats"]["has_speed_data"] = has_speed
 
             if has_speed:
+                if progress is not None:
+                    progress.set_stage("speed")
                 analysis["speed"] = TrajectoryAnalyzer.calculate_speed_statistics(points)
 
                 # Analyse de durée
@@ -456,6 +482,7 @@ class TrajectoryAnalyzer:
         if len(coordinates) < 3:
             return []
 
+        distances = TrajectoryAnalyzer._pair_distances(coordinates)
         segments = []
         current_segment = {
             "start_index": 0,
@@ -470,7 +497,7 @@ class TrajectoryAnalyzer:
             prev_coord = coordinates[i - 1]
 
             # Calculer la distance et le changement d'élévation
-            distance = TrajectoryAnalyzer.calculate_distance_between_points(prev_coord, coord)
+            distance = distances[i - 1]
             elevation_change = 0
             if len(coord) > 2 and len(prev_coord) > 2:
                 elevation_change = coord[2] - prev_coord[2]
@@ -760,6 +787,11 @@ class TrajectoryAnalyzer:
         Returns:
             Dictionnaire avec l'analyse du terrain
         """
+        if analysis_backend.is_fast():
+            result = fast_analysis.terrain(coordinates)
+            if result is not None:
+                return result
+
         if len(coordinates) < 3:
             return {"slopes": [], "avg_slope": 0, "max_slope": 0, "min_slope": 0, "terrain_analysis": {}}
 
@@ -871,12 +903,18 @@ class TrajectoryAnalyzer:
 
     @staticmethod
     @track_time
-    def advanced_trajectory_analysis(features: List[Dict[str, Any]], points: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def advanced_trajectory_analysis(
+        features: List[Dict[str, Any]],
+        points: List[Dict[str, Any]],
+        progress: Optional[ProgressTracker] = None,
+    ) -> Dict[str, Any]:
         """
         Analyse avancée complète d'une trajectoire GPS (Phase 4).
 
         Args:
             features: Liste des features (polylines et points) du KML
+            points: Points GPS avec informations parsées
+            progress: Suivi de progression optionnel (une étape par analyse)
 
         Returns:
             Dictionnaire avec toutes les analyses avancées
@@ -906,26 +944,38 @@ class TrajectoryAnalyzer:
         }
 
         # Analyse des arrêts
+        if progress is not None:
+            progress.set_stage("stops")
         if markers:
             analysis['stops'] = TrajectoryAnalyzer.detect_stops(markers)
         
         # Segmentation de trajectoire
+        if progress is not None:
+            progress.set_stage("segments")
         if all_coordinates:
             analysis['segments'] = TrajectoryAnalyzer.segment_trajectory(all_coordinates, markers)
         
         # Analyse des zones de vitesse
+        if progress is not None:
+            progress.set_stage("speed_zones")
         if markers:
             analysis['speed_zones'] = TrajectoryAnalyzer.analyze_speed_zones(markers)
         
         # Analyse des zones d'accélération
+        if progress is not None:
+            progress.set_stage("acceleration_zones")
         if markers:
             analysis['acceleration_zones'] = TrajectoryAnalyzer.calculate_acceleration_zones(markers)
         
         # Analyse du terrain
+        if progress is not None:
+            progress.set_stage("terrain")
         if all_coordinates:
             analysis["terrain"] = TrajectoryAnalyzer.analyze_terrain(all_coordinates)
 
         # Points d'intérêt automatiques (virages importants, changements significatifs)
+        if progress is not None:
+            progress.set_stage("points_of_interest")
         analysis["points_of_interest"] = TrajectoryAnalyzer.detect_points_of_interest(all_coordinates)
 
         return analysis
@@ -943,6 +993,11 @@ class TrajectoryAnalyzer:
         Returns:
             Liste des points d'intérêt détectés
         """
+        if analysis_backend.is_fast():
+            result = fast_analysis.points_of_interest(coordinates)
+            if result is not None:
+                return result
+
         if len(coordinates) < 5:
             return []
 
@@ -0,0 +1,187 @@
+"""
+Uploads par morceaux (chunked) et reprenables pour les fichiers volumineux.
+Chaque morceau est écrit dans un fichier temporaire sur disque et haché au fil
+de l'eau : le fichier n'est jamais chargé en mémoire en une seule chaîne.
+
+Protocole : init -> PUT des morceaux à leur position (offset) -> finalize.
+Après une coupure, le client relit la position courante et reprend l'envoi.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Taille des blocs copiés du flux de la requête vers le fichier temporaire
+COPY_BLOCK_SIZE = 1024 * 1024
+
+
+class UploadOffsetError(Exception):
+    """Levée lorsqu'un morceau n'est pas envoyé à la position attendue."""
+
+    def __init__(self, expected: int):
+        super().__init__(f"Position invalide, reprise attendue à l'octet {expected}")
+        self.expected = expected
+
+
+class UploadTooLargeError(Exception):
+    """Levée lorsque le fichier dépasse la taille maximale autorisée."""
+
+
+class ChunkedUpload:
+    """Upload en cours et son fichier temporaire."""
+
+    def __init__(self, filename: str, spool_dir: str, total_size: Optional[int] = None):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.path = os.path.join(spool_dir, f'{self.id}.part')
+        self.total_size = total_size
+        self.offset = 0
+        self.hasher = hashlib.sha256()
+        self.lock = threading.Lock()
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'upload_id': self.id,
+            'filename': self.filename,
+            'offset': self.offset,
+            'total_size': self.total_size,
+            'updated_at': self.updated_at
+        }
+
+
+class ChunkedUploadManager:
+    """Gestionnaire des uploads par morceaux en cours."""
+
+    def __init__(self, spool_dir: str = 'uploads/chunks', max_size: int = 1024 ** 3, ttl: float = 86400):
+        self._lock = threading.Lock()
+        self._uploads: Dict[str, ChunkedUpload] = {}
+        self.configure(spool_dir, max_size, ttl)
+
+    def configure(self, spool_dir: str, max_size: int, ttl: float):
+        self.spool_dir = spool_dir
+        self.max_size = max_size
+        self.ttl = ttl
+
+    def _purge_expired(self):
+        """Supprime les uploads abandonnés depuis plus de ``ttl`` secondes."""
+        now = time.time()
+        with self._lock:
+            expired = [u for u in self._uploads.values() if now - u.updated_at > self.ttl]
+            for upload in expired:
+                del self._uploads[upload.id]
+        for upload in expired:
+            logger.info("Upload %s abandonné, suppression du fichier temporaire", upload.id)
+            self._remove_file(upload.path)
+
+    @staticmethod
+    def _remove_file(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def create(self, filename: str, total_size: Optional[int] = None) -> ChunkedUpload:
+        """Démarre un upload et crée son fichier temporaire vide."""
+        self._purge_expired()
+        if total_size is not None and total_size > self.max_size:
+            raise UploadTooLargeError(f'Fichier trop volumineux (maximum {self.max_size} octets)')
+
+        os.makedirs(self.spool_dir, exist_ok=True)
+        upload = ChunkedUpload(filename, self.spool_dir, total_size)
+        open(upload.path, 'wb').close()
+        with self._lock:
+            self._uploads[upload.id] = upload
+        return upload
+
+    def get(self, upload_id: str) -> Optional[ChunkedUpload]:
+        with self._lock:
+            return self._uploads.get(upload_id)
+
+    def write_chunk(self, upload: ChunkedUpload, offset: int, stream) -> int:
+        """Ajoute un morceau lu depuis ``stream`` à la position ``offset``.
+
+        Le morceau n'est validé qu'une fois entièrement reçu : en cas de
+        coupure, le fichier et l'empreinte reviennent à leur état précédent
+        et le client peut renvoyer le morceau depuis la même position.
+
+        Returns:
+            int: Nouvelle position (nombre d'octets reçus)
+        """
+        with upload.lock:
+            if offset != upload.offset:
+                raise UploadOffsetError(upload.offset)
+
+            hasher = upload.hasher.copy()
+            written = 0
+            with open(upload.path, 'r+b') as f:
+                f.seek(offset)
+                try:
+                    while True:
+                        block = stream.read(COPY_BLOCK_SIZE)
+                        if not block:
+                            break
+                        written += len(block)
+                        if offset + written > self.max_size:
+                            raise UploadTooLargeError(f'Fichier trop volumineux (maximum {self.max_size} octets)')
+                        f.write(block)
+                        hasher.update(block)
+                except BaseException:
+                    f.truncate(offset)
+                    raise
+                f.truncate(offset + written)
+
+            upload.hasher = hasher
+            upload.offset = offset + written
+            upload.updated_at = time.time()
+            return upload.offset
+
+    def finalize(self, upload: ChunkedUpload, expected_sha256: Optional[str] = None) -> str:
+        """Termine un upload et retourne l'empreinte SHA-256 du fichier.
+
+        Le fichier temporaire reste en place : l'appelant le parse puis le
+        libère avec ``discard``.
+        """
+        with upload.lock:
+            if upload.total_size is not None and upload.offset != upload.total_size:
+                raise ValueError(f'Upload incomplet : {upload.offset}/{upload.total_size} octets reçus')
+            digest = upload.hasher.hexdigest()
+            if expected_sha256 and expected_sha256.lower() != digest:
+                raise ValueError("L'empreinte SHA-256 du fichier reçu ne correspond pas")
+        with self._lock:
+            self._uploads.pop(upload.id, None)
+        return digest
+
+    def discard(self, upload: ChunkedUpload):
+        """Abandonne un upload et supprime son fichier temporaire."""
+        with self._lock:
+            self._uploads.pop(upload.id, None)
+        self._remove_file(upload.path)
+
+    def clear(self):
+        """Abandonne tous les uploads (principalement pour les tests)."""
+        with self._lock:
+            uploads = list(self._uploads.values())
+            self._uploads.clear()
+        for upload in uploads:
+            self._remove_file(upload.path)
+
+
+# Gestionnaire partagé par toute l'application
+upload_manager = ChunkedUploadManager()
+
+
+def init_app(app):
+    """Applique la configuration de l'application au gestionnaire partagé."""
+    upload_manager.configure(
+        os.path.join(app.config['UPLOAD_FOLDER'], 'chunks'),
+        app.config.get('CHUNKED_UPLOAD_MAX_SIZE', 1024 ** 3),
+        app.config.get('CHUNKED_UPLOAD_TTL', 86400)
+    )
@@ -0,0 +1,142 @@
+"""
+Pool de processus partagé pour le traitement parallèle des documents.
+Le parsing KML/GPX est lié au CPU : le déporter dans des processus permet
+d'exploiter tous les cœurs malgré le GIL.
+"""
+
+import os
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Dict, Any, Optional, Union
+
+from app.services.kml_parser import KMLParser
+from app.services.gpx_parser import GPXParser
+from app.services.trajectory_analyzer import TrajectoryAnalyzer
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = 0
+_lock = threading.Lock()
+# Tâches soumises et non terminées
+_queue_depth = 0
+
+# Analyses disponibles pour le traitement par lot : nom -> f(features, points)
+ANALYSES = {
+    'trajectory': lambda features, points: TrajectoryAnalyzer.analyze_trajectory(features),
+    'advanced': TrajectoryAnalyzer.advanced_trajectory_analysis,
+}
+
+
+def parse_document(content: Union[str, bytes], file_format: str, display_mode: str = 'double') -> Dict[str, Any]:
+    """Parse un document KML, KMZ ou GPX (exécuté dans un processus du pool)."""
+    start = time.perf_counter()
+    if file_format == 'gpx':
+        result = GPXParser.parse_gpx_coordinates(content)
+    elif file_format == 'kmz':
+        result = KMLParser.parse_kmz_coordinates(content, display_mode)
+    else:
+        result = KMLParser.parse_kml_coordinates(content, display_mode)
+    metrics.observe_parse(file_format, len(content), time.perf_counter() - start)
+    if multiprocessing.parent_process() is not None:
+        # Le processus du pool ne sert pas de requêtes : il publie ses mesures lui-même
+        metrics.registry.flush(collectors=False)
+    return result
+
+
+def analyze_document(analyses, features=None, points=None, content: Optional[Union[str, bytes]] = None,
+                     file_format: str = 'kml', display_mode: str = 'double') -> Dict[str, Any]:
+    """Exécute les analyses demandées sur un document (exécuté dans un processus du pool).
+
+    Le document est fourni soit déjà parsé (features/points), soit sous forme
+    de contenu brut, parsé alors dans le processus.
+    """
+    if content is not None:
+        parsed = parse_document(content, file_format, display_mode)
+        if not parsed['success']:
+            return parsed
+        features, points = parsed['features'], parsed['points']
+
+    return {
+        'success': True,
+        'analyses': {name: ANALYSES[name](features or [], points or []) for name in analyses}
+    }
+
+
+def _warmup() -> int:
+    """Tâche vide servant à démarrer les processus du pool."""
+    return os.getpid()
+
+
+def configure(max_workers: int, warmup: bool = False):
+    """(Re)crée le pool partagé avec le nombre de processus demandé.
+
+    Args:
+        max_workers: Nombre de processus (0 désactive le pool)
+        warmup: Démarre immédiatement les processus
+    """
+    global _pool, _pool_size
+    with _lock:
+        if _pool is not None and max_workers == _pool_size:
+            return
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = ProcessPoolExecutor(max_workers=max_workers) if max_workers > 0 else None
+        _pool_size = max_workers
+
+    if warmup and _pool is not None:
+        pids = {future.result() for future in [_pool.submit(_warmup) for _ in range(max_workers)]}
+        logger.info("Pool de processus démarré (%d processus)", len(pids))
+
+
+def get_pool() -> Optional[ProcessPoolExecutor]:
+    """Retourne le pool partagé (None si le traitement parallèle est désactivé)."""
+    return _pool
+
+
+def pool_size() -> int:
+    """Nombre de processus du pool partagé (0 si désactivé)."""
+    return _pool_size
+
+
+def _task_done(_future: Future):
+    global _queue_depth
+    with _lock:
+        _queue_depth -= 1
+
+
+def submit(fn, *args, **kwargs) -> Optional[Future]:
+    """Soumet une tâche au pool partagé, ou retourne None si le pool est désactivé."""
+    global _queue_depth
+    pool = get_pool()
+    if pool is None:
+        return None
+    future = pool.submit(fn, *args, **kwargs)
+    with _lock:
+        _queue_depth += 1
+    future.add_done_callback(_task_done)
+    return future
+
+
+def queue_depth() -> int:
+    """Nombre de tâches soumises au pool et non terminées."""
+    return _queue_depth
+
+
+def shutdown():
+    """Arrête le pool partagé."""
+    global _pool, _pool_size
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+        _pool_size = 0
+
+
+def init_app(app):
+    """Crée et préchauffe le pool selon la configuration de l'application."""
+    configure(app.config.get('WORKER_POOL_SIZE', 0), app.config.get('WORKER_POOL_WARMUP', False))
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark de /api/multi-upload en fonction du nombre de processus du pool.
+
+Usage :
+    python -m benchmarks.bench_multi_upload [--files 20] [--points 20000]
+"""
+
+import argparse
+import json
+import os
+import time
+from io import BytesIO
+
+from app import create_app
+from app.config import TestingConfig
+from app.services import worker_pool
+from app.services.cache_service import clear_cache
+from benchmarks.generators import generate
+
+
+def run(files: int, points: int, workers_list):
+    app = create_app(TestingConfig)
+    client = app.test_client()
+    payloads = [generate('gpx', points, seed) for seed in range(files)]
+
+    results = []
+    for workers in workers_list:
+        worker_pool.configure(workers, warmup=True)
+        clear_cache()
+        data = {'files': [(BytesIO(p), f'track_{i}.gpx') for i, p in enumerate(payloads)]}
+        start = time.perf_counter()
+        response = client.post('/api/multi-upload', data=data, content_type='multipart/form-data')
+        elapsed = time.perf_counter() - start
+        assert response.status_code == 200
+        results.append({'workers': workers, 'seconds': round(elapsed, 3)})
+
+    worker_pool.shutdown()
+    baseline = results[0]['seconds']
+    for entry in results:
+        entry['speedup'] = round(baseline / entry['seconds'], 2) if entry['seconds'] else None
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=20)
+    parser.add_argument('--points', type=int, default=20000)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    # 0 = parsing séquentiel dans la requête (référence)
+    workers_list = [0] + [w for w in (1, 2, 4, 8, 16, 32) if w <= args.max_workers]
+    print(json.dumps({'files': args.files, 'points_per_file': args.points,
+                      'results': run(args.files, args.points, workers_list)}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Garde-fou de régression : compare la suite de benchmarks à une référence.
+
+La suite est réexécutée avec les paramètres de la référence (tailles, cas,
+nombre d'exécutions), puis chaque cas est comparé : médiane des durées et pic
+d'allocation. Une durée n'est en régression que si elle dépasse la référence
+de plus que la tolérance, elle-même élargie au bruit mesuré (dispersion des
+exécutions de chaque côté), et au-delà d'un écart absolu minimal. Le code
+de sortie est 1 en cas de régression.
+
+Usage :
+    python -m benchmarks.compare [--baseline benchmarks/baseline.json] [--current results.json]
+    python -m benchmarks.compare --update-baseline [--sizes 1k] [--filter REGEX]
+
+Les durées dépendent de la machine : la référence se régénère volontairement
+(``--update-baseline``) sur la machine où le garde-fou est exécuté.
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks import suite
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Hausse relative tolérée de la médiane et du pic mémoire
+TIME_THRESHOLD = 0.15
+MEMORY_THRESHOLD = 0.10
+# La tolérance de durée couvre au moins NOISE_FACTOR fois la dispersion mesurée
+NOISE_FACTOR = 2.0
+# Écarts absolus en deçà desquels aucune régression n'est signalée
+MIN_TIME_DELTA_S = 0.001
+MIN_MEMORY_DELTA_BYTES = 64 * 1024
+
+Key = Tuple[str, int]
+
+
+class Comparison:
+    """Comparaison d'un cas à une taille donnée."""
+
+    def __init__(self, name: str, size: int, baseline: Optional[Dict[str, Any]],
+                 current: Optional[Dict[str, Any]]):
+        self.name = name
+        self.size = size
+        self.baseline = baseline
+        self.current = current
+        self.time_tolerance: Optional[float] = None
+        self.time_regression = False
+        self.memory_regression = False
+
+    @property
+    def status(self) -> str:
+        if self.baseline is None:
+            return 'nouveau'
+        if self.current is None:
+            return 'absent'
+        if self.time_regression or self.memory_regression:
+            return 'RÉGRESSION'
+        return 'ok'
+
+    def time_change(self) -> Optional[float]:
+        if self.baseline is None or self.current is None or not self.baseline['median_s']:
+            return None
+        return self.current['median_s'] / self.baseline['median_s'] - 1
+
+    def memory_change(self) -> Optional[float]:
+        if self.baseline is None or self.current is None:
+            return None
+        before, after = self.baseline.get('peak_memory_bytes'), self.current.get('peak_memory_bytes')
+        if not before or after is None:
+            return None
+        return after / before - 1
+
+
+def _spread(entry: Dict[str, Any]) -> float:
+    """Dispersion relative des exécutions : (médiane - min) / médiane.
+
+    Contrairement à l'écart-type, elle n'est pas gonflée par une exécution
+    isolée ralentie (ramasse-miettes, autre processus).
+    """
+    return (entry['median_s'] - entry['min_s']) / entry['median_s'] if entry['median_s'] else 0.0
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], time_threshold: float = TIME_THRESHOLD,
+            memory_threshold: float = MEMORY_THRESHOLD, noise_factor: float = NOISE_FACTOR) -> List[Comparison]:
+    """Compare deux documents de résultats de ``benchmarks.suite``, cas par cas."""
+    before: Dict[Key, Dict[str, Any]] = {(e['name'], e['size']): e for e in baseline['results']}
+    after: Dict[Key, Dict[str, Any]] = {(e['name'], e['size']): e for e in current['results']}
+    keys = list(before) + [key for key in after if key not in before]
+
+    comparisons = []
+    for name, size in keys:
+        row = Comparison(name, size, before.get((name, size)), after.get((name, size)))
+        if row.baseline is not None and row.current is not None:
+            old, new = row.baseline, row.current
+            row.time_tolerance = max(time_threshold, noise_factor * max(_spread(old), _spread(new)))
+            row.time_regression = (new['median_s'] > old['median_s'] * (1 + row.time_tolerance)
+                                   and new['median_s'] - old['median_s'] >= MIN_TIME_DELTA_S)
+            old_peak, new_peak = old.get('peak_memory_bytes'), new.get('peak_memory_bytes')
+            if old_peak is not None and new_peak is not None:
+                row.memory_regression = (new_peak > old_peak * (1 + memory_threshold)
+                                         and new_peak - old_peak >= MIN_MEMORY_DELTA_BYTES)
+        comparisons.append(row)
+    return comparisons
+
+
+def _percent(value: Optional[float]) -> str:
+    return '' if value is None else f'{value * 100:+.1f}%'
+
+
+def _ms(entry: Optional[Dict[str, Any]]) -> str:
+    return '' if entry is None else f"{entry['median_s'] * 1000:.2f}"
+
+
+def _mib(entry: Optional[Dict[str, Any]]) -> str:
+    if entry is None or entry.get('peak_memory_bytes') is None:
+        return ''
+    return f"{entry['peak_memory_bytes'] / 1024 ** 2:.2f}"
+
+
+def format_table(comparisons: List[Comparison], only_changes: bool = False) -> str:
+    """Tableau texte des comparaisons (régressions marquées)."""
+    header = ('cas', 'taille', 'réf. ms', 'ms', 'écart', 'tolérance', 'réf. Mio', 'Mio', 'écart', 'statut')
+    rows = [header]
+    for row in comparisons:
+        if only_changes and row.status == 'ok':
+            continue
+        rows.append((
+            row.name, str(row.size), _ms(row.baseline), _ms(row.current),
+            _percent(row.time_change()) + (' !' if row.time_regression else ''),
+            '' if row.time_tolerance is None else f'±{row.time_tolerance * 100:.0f}%',
+            _mib(row.baseline), _mib(row.current),
+            _percent(row.memory_change()) + (' !' if row.memory_regression else ''),
+            row.status,
+        ))
+    widths = [max(len(cells[column]) for cells in rows) for column in range(len(header))]
+    lines = []
+    for index, cells in enumerate(rows):
+        # Première colonne alignée à gauche, valeurs à droite
+        lines.append('  '.join(cell.ljust(width) if column in (0, len(header) - 1) else cell.rjust(width)
+                               for column, (cell, width) in enumerate(zip(cells, widths))).rstrip())
+        if index == 0:
+            lines.append('  '.join('-' * width for width in widths))
+    return '\n'.join(lines)
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path, encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def _save(path: str, document: Dict[str, Any]):
+    with open(path, 'w', encoding='utf-8') as handle:
+        handle.write(json.dumps(document, indent=2) + '\n')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    suite.add_arguments(parser)
+    parser.set_defaults(sizes=None, repeat=None)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Fichier de référence')
+    parser.add_argument('--current', help='Résultats déjà mesurés (sinon la suite est réexécutée)')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Remplace la référence par les résultats courants')
+    parser.add_argument('--time-threshold', type=float, default=TIME_THRESHOLD)
+    parser.add_argument('--memory-threshold', type=float, default=MEMORY_THRESHOLD)
+    parser.add_argument('--noise-factor', type=float, default=NOISE_FACTOR)
+    parser.add_argument('--all', action='store_true', help='Affiche aussi les cas sans changement')
+    args = parser.parse_args(argv)
+
+    baseline = _load(args.baseline) if os.path.exists(args.baseline) else None
+    if baseline is None and not args.update_baseline:
+        print(f'Référence absente : {args.baseline} (créez-la avec --update-baseline)', file=sys.stderr)
+        return 2
+
+    if args.current:
+        current = _load(args.current)
+    else:
+        # Mêmes paramètres que la référence, sauf indication contraire
+        settings = (baseline or {}).get('meta', {})
+        sizes = ([suite.parse_size(size) for size in args.sizes.split(',')] if args.sizes
+                 else settings.get('sizes', list(suite.DEFAULT_SIZES)))
+        repeat = args.repeat or settings.get('repeat', suite.DEFAULT_REPEAT)
+        pattern = args.pattern if args.pattern is not None else settings.get('pattern')
+        current = suite.run(sizes, repeat, pattern, args.memory, log=lambda line: print(line, file=sys.stderr))
+
+    if args.update_baseline:
+        _save(args.baseline, current)
+        print(f"Référence mise à jour : {args.baseline} ({len(current['results'])} mesures)")
+        return 0
+
+    if args.pattern:
+        # Sous-ensemble de cas : les autres mesures de la référence ne sont pas « absentes »
+        names = {bench.name for bench in suite.select(args.pattern)}
+        baseline = {**baseline, 'results': [e for e in baseline['results'] if e['name'] in names]}
+
+    comparisons = compare(baseline, current, args.time_threshold, args.memory_threshold, args.noise_factor)
+    regressions = [row for row in comparisons if row.status == 'RÉGRESSION']
+    print(format_table(comparisons, only_changes=not args.all and bool(regressions)))
+    if regressions:
+        print(f'\n{len(regressions)} régression(s) sur {len(comparisons)} mesures. '
+              'Si elles sont voulues : python -m benchmarks.compare --update-baseline')
+        return 1
+    print(f'\nAucune régression ({len(comparisons)} mesures).')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
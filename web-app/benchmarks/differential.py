@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Vérification différentielle des backends d'analyse (``fast`` contre ``reference``).
+
+Des trajectoires aléatoires (graine fixe) et synthétiques
+(``benchmarks.generators``) passent par chaque fonction avec les deux
+backends ; les résultats doivent avoir la même structure, les mêmes entiers
+et chaînes, et des flottants égaux à la tolérance près. Une valeur que la
+référence arrondit (``round(x, 1)``, clés de ``ROUNDED_KEYS``) peut basculer
+d'une unité du dernier chiffre quand la valeur exacte tombe sur la limite :
+ce seul écart est admis. Les durées des
+deux backends sont ensuite comparées sur des traces de plusieurs tailles.
+
+Usage :
+    python -m benchmarks.differential [--random 200] [--seed 0] [--sizes 1k,10k]
+                                      [--repeat 3] [--no-speedup] [--filter REGEX]
+
+Le code de sortie est 1 si un résultat diffère.
+"""
+
+import argparse
+import logging
+import math
+import random
+import re
+import sys
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from app.services import analysis_backend
+from app.services.kml_parser import KMLParser
+from app.services.trajectory_analyzer import TrajectoryAnalyzer
+from benchmarks import generators, suite
+
+# Tolérances sur les flottants (les distances diffèrent de moins d'un micromètre)
+REL_TOLERANCE = 1e-6
+ABS_TOLERANCE = 1e-6
+# Clés que la référence passe par round(), avec le nombre de décimales : seules
+# valeurs dont le dernier chiffre peut basculer d'une unité
+ROUNDED_KEYS = {
+    # calculate_elevation_profile
+    'total_ascent': 1, 'total_descent': 1, 'min_elevation': 1, 'max_elevation': 1, 'elevation_gain': 1,
+    # segment_trajectory
+    'distance_km': 2, 'avg_speed_kmh': 1,
+    # analyze_terrain
+    'avg_slope': 2, 'max_slope': 2, 'min_slope': 2,
+    # detect_points_of_interest
+    'angle_degrees': 1, 'elevation_change': 1, 'before_slope': 1, 'after_slope': 1,
+}
+
+DEFAULT_RANDOM = 200
+DEFAULT_SPEEDUP_SIZES = (1_000, 10_000)
+DEFAULT_SPEEDUP_REPEAT = 3
+
+
+class Trajectory(NamedTuple):
+    """Entrée des fonctions comparées."""
+    name: str
+    coordinates: List[List[float]]
+    text: str
+    document: Optional[bytes] = None
+
+
+def _coordinates_text(coordinates: List[List[float]]) -> str:
+    """Bloc <coordinates> KML (lon,lat[,alt]) équivalent à ``coordinates``."""
+    return ' '.join(','.join(repr(value) for value in [coord[1], coord[0], *coord[2:]])
+                    for coord in coordinates)
+
+
+FUNCTIONS: Dict[str, Callable[[Trajectory], Any]] = {
+    'calculate_elevation_profile': lambda t: TrajectoryAnalyzer.calculate_elevation_profile(t.coordinates),
+    'segment_trajectory': lambda t: TrajectoryAnalyzer.segment_trajectory(t.coordinates),
+    'analyze_terrain': lambda t: TrajectoryAnalyzer.analyze_terrain(t.coordinates),
+    'detect_points_of_interest': lambda t: TrajectoryAnalyzer.detect_points_of_interest(t.coordinates),
+    'KMLParser._parse_coordinates': lambda t: KMLParser._parse_coordinates(t.text),
+    'KMLParser.parse_kml_coordinates': (
+        lambda t: KMLParser.parse_kml_coordinates(t.document) if t.document is not None else None),
+}
+
+
+# ===== Trajectoires =====
+
+def _walk(rng: random.Random, size: int, dims: int = 3, integer_altitude: bool = False,
+          duplicates: float = 0.0, spikes: float = 0.0, step: float = 0.001) -> List[List[float]]:
+    """Marche aléatoire : points répétés (arrêts) et sauts d'altitude selon les proportions données."""
+    lat, lon, alt = rng.uniform(-70, 70), rng.uniform(-179, 179), rng.uniform(0, 2000)
+    coordinates = []
+    for _ in range(size):
+        if not coordinates or rng.random() >= duplicates:
+            lat = max(-89.9, min(89.9, lat + rng.gauss(0, step)))
+            lon = (lon + rng.gauss(0, step) + 180) % 360 - 180
+            alt += rng.gauss(0, 3) + (rng.choice((-60, 60)) if rng.random() < spikes else 0)
+        coord = [lat, lon] + ([float(round(alt)) if integer_altitude else alt] if dims == 3 else [])
+        coordinates.append(coord)
+    if integer_altitude and dims == 3:
+        coordinates = [[c[0], c[1], int(c[2])] for c in coordinates]
+    return coordinates
+
+
+def _trajectory(name: str, coordinates: List[List[float]], document: Optional[bytes] = None) -> Trajectory:
+    return Trajectory(name, coordinates, _coordinates_text(coordinates), document)
+
+
+def random_trajectories(count: int = DEFAULT_RANDOM, seed: int = 0) -> List[Trajectory]:
+    """Cas limites (0 à 11 points, 2D, mixtes, aberrants) puis ``count`` marches aléatoires."""
+    rng = random.Random(seed)
+    trajectories = []
+    # Seuils des fonctions : < 2, < 3, < 5 et > 10 points
+    for size in range(12):
+        trajectories.append(_trajectory(f'bords-{size}', _walk(rng, size, spikes=0.3, step=0.01)))
+        trajectories.append(_trajectory(f'bords-2d-{size}', _walk(rng, size, dims=2)))
+    trajectories.append(_trajectory('immobile', [[45.0, 5.0, 300.0]] * 20))
+    trajectories.append(_trajectory('altitudes-entieres', _walk(rng, 150, integer_altitude=True)))
+    trajectories.append(_trajectory('altitudes-aberrantes', [
+        c if i % 7 else [c[0], c[1], rng.choice((-5000.0, 20000.0))]
+        for i, c in enumerate(_walk(rng, 120))]))
+    # Premier point sans altitude : la référence ignore alors les changements de pente
+    trajectories.append(_trajectory('mixte', [
+        c[:2] if i % 3 == 0 else c for i, c in enumerate(_walk(rng, 60))]))
+    trajectories.append(_trajectory('sauts-globaux', [
+        [rng.uniform(-89, 89), rng.uniform(-180, 180), rng.uniform(0, 3000)] for _ in range(40)]))
+    trajectories.append(_trajectory('equateur', [[0.0, lon * 0.5, 10.0] for lon in range(30)]))
+
+    for index in range(count):
+        size = rng.choice((rng.randint(2, 40), rng.randint(40, 400)))
+        trajectories.append(_trajectory(f'aleatoire-{index}', _walk(
+            rng, size, dims=rng.choice((2, 3, 3, 3)), integer_altitude=rng.random() < 0.2,
+            duplicates=rng.choice((0.0, 0.1, 0.5)), spikes=rng.choice((0.0, 0.05, 0.3)),
+            step=rng.choice((0.0001, 0.001, 0.05)))))
+    return trajectories
+
+
+def synthetic_trajectories(sizes=(5, 11, 150, 1_000), seed: int = 0) -> List[Trajectory]:
+    """Traces des générateurs de benchmark, avec le document KML d'origine."""
+    trajectories = []
+    for size in sizes:
+        fixes = generators.iter_fixes(size, seed)
+        coordinates = [[fix.lat, fix.lon, fix.alt] for fix in fixes]
+        trajectories.append(_trajectory(f'kml_points-{size}', coordinates,
+                                        generators.generate('kml_points', size, seed)))
+    return trajectories
+
+
+# ===== Comparaison =====
+
+def _close(reference: float, fast: float, decimals: Optional[int] = None) -> bool:
+    """Égalité à la tolérance près ; une unité du dernier chiffre pour une valeur arrondie."""
+    if math.isnan(reference) or math.isnan(fast):
+        return math.isnan(reference) and math.isnan(fast)
+    if math.isclose(reference, fast, rel_tol=REL_TOLERANCE, abs_tol=ABS_TOLERANCE):
+        return True
+    return decimals is not None and abs(reference - fast) <= 10 ** -decimals * (1 + 1e-9)
+
+
+def differences(reference: Any, fast: Any, path: str = '', decimals: Optional[int] = None) -> List[str]:
+    """Écarts entre deux résultats (chemin et valeurs), liste vide s'ils sont équivalents.
+
+    ``decimals`` est le nombre de décimales de la valeur si la référence l'arrondit
+    (``ROUNDED_KEYS``).
+    """
+    if isinstance(reference, bool) or isinstance(fast, bool):
+        return [] if reference == fast else [f'{path}: {reference!r} != {fast!r}']
+    if isinstance(reference, int) and isinstance(fast, int):
+        return [] if reference == fast else [f'{path}: {reference!r} != {fast!r}']
+    if isinstance(reference, (int, float)) and isinstance(fast, (int, float)):
+        return [] if _close(float(reference), float(fast), decimals) else [f'{path}: {reference!r} != {fast!r}']
+    if isinstance(reference, dict) and isinstance(fast, dict):
+        if reference.keys() != fast.keys():
+            return [f'{path}: clés {sorted(reference)} != {sorted(fast)}']
+        return [diff for key in reference
+                for diff in differences(reference[key], fast[key], f'{path}.{key}', ROUNDED_KEYS.get(key))]
+    if isinstance(reference, (list, tuple)) and isinstance(fast, (list, tuple)):
+        if len(reference) != len(fast):
+            return [f'{path}: {len(reference)} éléments != {len(fast)}']
+        return [diff for index, (a, b) in enumerate(zip(reference, fast))
+                for diff in differences(a, b, f'{path}[{index}]')]
+    return [] if reference == fast else [f'{path}: {reference!r} != {fast!r}']
+
+
+def _call(function: Callable[[Trajectory], Any], trajectory: Trajectory, backend: str) -> Any:
+    """Résultat de la fonction, ou l'exception levée (les deux backends doivent lever la même)."""
+    with analysis_backend.use_backend(backend):
+        try:
+            return function(trajectory)
+        except Exception as e:
+            return e
+
+
+def _select(pattern: Optional[str]) -> Dict[str, Callable[[Trajectory], Any]]:
+    regex = re.compile(pattern) if pattern else None
+    return {name: f for name, f in FUNCTIONS.items() if regex is None or regex.search(name)}
+
+
+def check(trajectories: List[Trajectory], pattern: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Compare les deux backends ; retourne les écarts (fonction, trajectoire, détails)."""
+    mismatches = []
+    logging.disable(logging.INFO)
+    try:
+        for name, function in _select(pattern).items():
+            for trajectory in trajectories:
+                reference = _call(function, trajectory, 'reference')
+                fast = _call(function, trajectory, 'fast')
+                if isinstance(reference, Exception) or isinstance(fast, Exception):
+                    found = [] if type(reference) is type(fast) else [f'{reference!r} != {fast!r}']
+                else:
+                    found = differences(reference, fast)
+                if found:
+                    mismatches.append({'function': name, 'trajectory': trajectory.name, 'differences': found})
+    finally:
+        logging.disable(logging.NOTSET)
+    return mismatches
+
+
+# ===== Accélération =====
+
+def speedups(sizes=DEFAULT_SPEEDUP_SIZES, repeat: int = DEFAULT_SPEEDUP_REPEAT,
+             pattern: Optional[str] = None, log: Optional[Callable[[str], None]] = None) -> List[Dict[str, Any]]:
+    """Médianes des deux backends par fonction et par taille (traces kml_points)."""
+    results = []
+    logging.disable(logging.INFO)
+    try:
+        for size in sizes:
+            trajectory = synthetic_trajectories((size,))[0]
+            for name, function in _select(pattern).items():
+                timings = {}
+                for backend in analysis_backend.BACKENDS:
+                    with analysis_backend.use_backend(backend):
+                        timings[backend] = suite.measure(lambda: function(trajectory), repeat=repeat,
+                                                         memory=False)['median_s']
+                entry = {
+                    'function': name,
+                    'size': size,
+                    'reference_s': timings['reference'],
+                    'fast_s': timings['fast'],
+                    'speedup': timings['reference'] / timings['fast'] if timings['fast'] else None,
+                }
+                results.append(entry)
+                if log is not None:
+                    log(f"{name:<35} {size:>9} {entry['reference_s'] * 1000:>10.2f} ms"
+                        f" {entry['fast_s'] * 1000:>10.2f} ms")
+    finally:
+        logging.disable(logging.NOTSET)
+    return results
+
+
+def format_speedups(results: List[Dict[str, Any]]) -> str:
+    header = ('fonction', 'taille', 'référence ms', 'fast ms', 'accélération')
+    rows = [header] + [(
+        entry['function'], str(entry['size']), f"{entry['reference_s'] * 1000:.2f}",
+        f"{entry['fast_s'] * 1000:.2f}", '' if entry['speedup'] is None else f"x{entry['speedup']:.1f}",
+    ) for entry in results]
+    widths = [max(len(cells[column]) for cells in rows) for column in range(len(header))]
+    lines = []
+    for index, cells in enumerate(rows):
+        lines.append('  '.join(cell.ljust(width) if column == 0 else cell.rjust(width)
+                               for column, (cell, width) in enumerate(zip(cells, widths))).rstrip())
+        if index == 0:
+            lines.append('  '.join('-' * width for width in widths))
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--random', type=int, default=DEFAULT_RANDOM, help='Nombre de trajectoires aléatoires')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SPEEDUP_SIZES),
+                        help='Tailles des mesures de durée (1k, 10k...)')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_SPEEDUP_REPEAT)
+    parser.add_argument('--no-speedup', dest='speedup', action='store_false', help='Vérification seule')
+    parser.add_argument('--filter', dest='pattern', help='Expression régulière sur le nom des fonctions')
+    args = parser.parse_args(argv)
+
+    trajectories = random_trajectories(args.random, args.seed) + synthetic_trajectories(seed=args.seed)
+    mismatches = check(trajectories, args.pattern)
+    for mismatch in mismatches:
+        print(f"{mismatch['function']} [{mismatch['trajectory']}]")
+        for diff in mismatch['differences'][:5]:
+            print(f'    {diff}')
+    print(f'{len(trajectories)} trajectoires, {len(_select(args.pattern))} fonctions : '
+          f'{len(mismatches)} écart(s).')
+
+    if args.speedup:
+        sizes = [suite.parse_size(size) for size in args.sizes.split(',')]
+        results = speedups(sizes, args.repeat, args.pattern, log=lambda line: print(line, file=sys.stderr))
+        print()
+        print(format_speedups(results))
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""
+Générateurs déterministes de documents KML et GPX synthétiques.
+
+Chaque générateur produit une marche aléatoire (graine fixe) d'un nombre de
+points donné, de quelques milliers à plusieurs millions, morceau par morceau :
+``write`` écrit un document de 5M points sur disque sans le matérialiser en
+mémoire, ``generate`` retourne les octets pour les tailles raisonnables.
+
+Variantes :
+    kml_linestring  une trace LineString (découpée en placemarks de 50k points)
+    kml_track       une trace gx:Track horodatée (when / gx:coord)
+    kml_points      un Placemark par point GPS (vitesse et cap en description) et la trace
+    kml_folders     points répartis dans une arborescence de dossiers profonde
+    kml_styles      nombreux styles (Style, StyleMap) référencés par les points
+    gpx             trace multi-segments horodatée
+"""
+
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, List, NamedTuple
+
+# Points par morceau produit (et par placemark LineString)
+CHUNK_POINTS = 1000
+LINESTRING_POINTS = 50_000
+
+# Arborescence des dossiers (kml_folders) et styles (kml_styles)
+FOLDER_DEPTH = 8
+FOLDER_FANOUT = 4
+POINTS_PER_STYLE = 10
+
+_START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+_KML_HEADER = ("<?xml version='1.0' encoding='UTF-8'?>\n"
+               "<kml xmlns='http://www.opengis.net/kml/2.2' xmlns:gx='http://www.google.com/kml/ext/2.2'>"
+               "<Document><name>{name}</name>\n")
+_KML_FOOTER = "</Document></kml>\n"
+
+
+class Fix(NamedTuple):
+    """Point GPS synthétique."""
+    lat: float
+    lon: float
+    alt: float
+    speed_kmh: float
+    heading: float
+    time: datetime
+
+
+def iter_fixes(points: int, seed: int = 0) -> Iterator[Fix]:
+    """Marche aléatoire déterministe : vitesse, cap et altitude varient doucement, avec des arrêts."""
+    rng = random.Random(seed)
+    lat, lon, alt = 45.0 + rng.uniform(-1, 1), 5.0 + rng.uniform(-1, 1), 300.0
+    heading, speed = rng.uniform(0, 360), 40.0
+    time = _START
+    for _ in range(points):
+        yield Fix(lat, lon, alt, speed, heading, time)
+        heading = (heading + rng.gauss(0, 8)) % 360
+        # Arrêts occasionnels puis redémarrage
+        if speed < 1 and rng.random() < 0.9:
+            speed = 0.0
+        elif rng.random() < 0.002:
+            speed = 0.0
+        else:
+            speed = min(max(speed + rng.gauss(0, 3), 2.0), 130.0)
+        alt = max(alt + rng.gauss(0, 2), 0.0)
+        distance = speed / 3.6 * 5  # Un point toutes les 5 secondes
+        lat += distance * math.cos(math.radians(heading)) / 111_320
+        lon += distance * math.sin(math.radians(heading)) / (111_320 * math.cos(math.radians(lat)))
+        time += timedelta(seconds=5)
+
+
+def _chunks(points: int, seed: int) -> Iterator[List[Fix]]:
+    chunk: List[Fix] = []
+    for fix in iter_fixes(points, seed):
+        chunk.append(fix)
+        if len(chunk) == CHUNK_POINTS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _timestamp(time: datetime) -> str:
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _coordinates(fixes: List[Fix]) -> str:
+    return ' '.join(f'{f.lon:.6f},{f.lat:.6f},{f.alt:.1f}' for f in fixes)
+
+
+def _point_placemark(index: int, fix: Fix, style: str = '#fix') -> str:
+    return (f"<Placemark><name>Fix {index}</name><visibility>0</visibility>"
+            f"<description>Vitesse: {fix.speed_kmh:.1f} km/h - Cap: {fix.heading:.0f} - "
+            f"Altitude: {fix.alt:.0f} m</description><styleUrl>{style}</styleUrl>"
+            f"<TimeStamp><when>{_timestamp(fix.time)}</when></TimeStamp>"
+            f"<Point><coordinates>{fix.lon:.6f},{fix.lat:.6f},{fix.alt:.1f}</coordinates></Point></Placemark>\n")
+
+
+def _linestrings(points: int, seed: int) -> Iterator[str]:
+    """Placemarks LineString de ``LINESTRING_POINTS`` points au plus."""
+    written = 0
+    for chunk in _chunks(points, seed):
+        if written % LINESTRING_POINTS == 0:
+            if written:
+                yield "</coordinates></LineString></Placemark>\n"
+            yield (f"<Placemark><name>Trace {written // LINESTRING_POINTS + 1}</name>"
+                   "<styleUrl>#trace</styleUrl><LineString><coordinates>")
+        else:
+            yield ' '
+        yield _coordinates(chunk)
+        written += len(chunk)
+    if written:
+        yield "</coordinates></LineString></Placemark>\n"
+
+
+def kml_linestring(points: int, seed: int = 0) -> Iterator[str]:
+    yield _KML_HEADER.format(name='linestring')
+    yield "<Style id='trace'><LineStyle><color>ff0000ff</color><width>3</width></LineStyle></Style>\n"
+    yield from _linestrings(points, seed)
+    yield _KML_FOOTER
+
+
+def kml_track(points: int, seed: int = 0) -> Iterator[str]:
+    yield _KML_HEADER.format(name='track')
+    yield "<Placemark><name>Track</name><gx:Track>\n"
+    for chunk in _chunks(points, seed):
+        yield ''.join(f'<when>{_timestamp(f.time)}</when>' for f in chunk)
+        yield ''.join(f'<gx:coord>{f.lon:.6f} {f.lat:.6f} {f.alt:.1f}</gx:coord>' for f in chunk)
+        yield '\n'
+    yield "</gx:Track></Placemark>\n"
+    yield _KML_FOOTER
+
+
+def kml_points(points: int, seed: int = 0) -> Iterator[str]:
+    yield _KML_HEADER.format(name='points')
+    yield ("<Style id='fix'><IconStyle><scale>0.5</scale></IconStyle></Style>"
+           "<Style id='trace'><LineStyle><color>ff0000ff</color></LineStyle></Style>\n")
+    yield from _linestrings(points, seed)
+    index = 0
+    for chunk in _chunks(points, seed):
+        yield ''.join(_point_placemark(index + offset, fix) for offset, fix in enumerate(chunk))
+        index += len(chunk)
+    yield _KML_FOOTER
+
+
+def kml_folders(points: int, seed: int = 0) -> Iterator[str]:
+    """Points répartis dans ``FOLDER_FANOUT ** FOLDER_DEPTH`` dossiers feuilles au plus."""
+    yield _KML_HEADER.format(name='folders')
+    yield "<Style id='fix'><IconStyle><scale>0.5</scale></IconStyle></Style>\n"
+    leaves = max(1, min(FOLDER_FANOUT ** FOLDER_DEPTH, points // 50))
+    per_leaf = -(-points // leaves)
+    fixes = iter_fixes(points, seed)
+    path: List[int] = []
+    index = 0
+    for leaf in range(leaves):
+        # Chemin de la feuille en base FOLDER_FANOUT : on ferme et ouvre les dossiers qui changent
+        digits = [(leaf // FOLDER_FANOUT ** level) % FOLDER_FANOUT for level in reversed(range(FOLDER_DEPTH))]
+        common = 0
+        while common < len(path) and path[common] == digits[common]:
+            common += 1
+        yield '</Folder>' * (len(path) - common)
+        for level in range(common, FOLDER_DEPTH):
+            yield f"<Folder><name>Niveau {level} - {digits[level]}</name>"
+        path = digits
+        batch = [fix for _, fix in zip(range(per_leaf), fixes)]
+        yield '\n' + ''.join(_point_placemark(index + offset, fix) for offset, fix in enumerate(batch))
+        index += len(batch)
+    yield '</Folder>' * len(path) + '\n'
+    yield _KML_FOOTER
+
+
+def kml_styles(points: int, seed: int = 0) -> Iterator[str]:
+    """Un Style et une StyleMap complets tous les ``POINTS_PER_STYLE`` points."""
+    yield _KML_HEADER.format(name='styles')
+    styles = max(1, points // POINTS_PER_STYLE)
+    for index in range(styles):
+        color = f'ff{(index * 7919) % 0xffffff:06x}'
+        yield (f"<Style id='s{index}'><IconStyle><color>{color}</color><scale>0.8</scale>"
+               "<Icon><href>http://maps.google.com/mapfiles/kml/shapes/arrow.png</href></Icon>"
+               f"<hotSpot x='0.5' y='0.5' xunits='fraction' yunits='fraction'/></IconStyle>"
+               f"<LabelStyle><color>{color}</color><scale>0.7</scale></LabelStyle>"
+               f"<LineStyle><color>{color}</color><width>2</width></LineStyle>"
+               f"<PolyStyle><color>7f{color[2:]}</color></PolyStyle>"
+               "<BalloonStyle><text>$[name] : $[description]</text></BalloonStyle></Style>"
+               f"<StyleMap id='m{index}'><Pair><key>normal</key><styleUrl>#s{index}</styleUrl></Pair>"
+               f"<Pair><key>highlight</key><styleUrl>#s{index}</styleUrl></Pair></StyleMap>\n")
+    index = 0
+    for chunk in _chunks(points, seed):
+        yield ''.join(_point_placemark(index + offset, fix, f'#m{(index + offset) // POINTS_PER_STYLE}')
+                      for offset, fix in enumerate(chunk))
+        index += len(chunk)
+    yield _KML_FOOTER
+
+
+def gpx(points: int, seed: int = 0, segment_points: int = 10_000) -> Iterator[str]:
+    """Trace GPX horodatée, un segment tous les ``segment_points`` points."""
+    yield ("<?xml version='1.0' encoding='UTF-8'?>\n"
+           "<gpx version='1.1' creator='benchmarks' xmlns='http://www.topografix.com/GPX/1/1'>"
+           f"<metadata><name>bench-{seed}</name><time>{_timestamp(_START)}</time></metadata>"
+           "<trk><name>bench</name><trkseg>\n")
+    written = 0
+    for chunk in _chunks(points, seed):
+        if written and written % segment_points == 0:
+            yield "</trkseg><trkseg>\n"
+        yield ''.join(f"<trkpt lat='{f.lat:.6f}' lon='{f.lon:.6f}'><ele>{f.alt:.1f}</ele>"
+                      f"<time>{_timestamp(f.time)}</time></trkpt>\n" for f in chunk)
+        written += len(chunk)
+    yield "</trkseg></trk></gpx>\n"
+
+
+GENERATORS: Dict[str, Callable[..., Iterator[str]]] = {
+    'kml_linestring': kml_linestring,
+    'kml_track': kml_track,
+    'kml_points': kml_points,
+    'kml_folders': kml_folders,
+    'kml_styles': kml_styles,
+    'gpx': gpx,
+}
+
+
+def extension(kind: str) -> str:
+    return 'gpx' if kind == 'gpx' else 'kml'
+
+
+def generate(kind: str, points: int, seed: int = 0) -> bytes:
+    """Document complet en mémoire."""
+    return ''.join(GENERATORS[kind](points, seed)).encode('utf-8')
+
+
+def write(kind: str, points: int, path: str, seed: int = 0) -> str:
+    """Écrit le document morceau par morceau (grandes tailles) et retourne son chemin."""
+    with open(path, 'w', encoding='utf-8') as handle:
+        for part in GENERATORS[kind](points, seed):
+            handle.write(part)
+    return path
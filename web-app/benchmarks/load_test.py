@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Test de charge : rejoue des sessions utilisateur réalistes contre l'application.
+
+Chaque session enchaîne : liste des exemples, chargement d'un exemple, upload
+d'un document synthétique (taille tirée selon un mélange pondéré), analyse de
+trajectoire, analyse avancée et export GPX. ``--concurrency`` sessions tournent
+en parallèle pendant ``--duration`` secondes (ou jusqu'à ``--sessions``).
+
+Sans ``--url``, l'application est démarrée dans le processus sur un port
+libre, avec des fichiers d'exemple générés ; la mémoire (RSS) relevée inclut
+alors le générateur de charge. Contre un serveur local, ``--server-pid``
+indique le processus dont la RSS est suivie.
+
+Usage :
+    python -m benchmarks.load_test [--url http://127.0.0.1:5000] [--server-pid PID]
+                                   [--concurrency 4] [--duration 60] [--sessions N]
+                                   [--mix 1k:6,10k:3,100k:1] [--kinds kml_points,gpx]
+                                   [--output report.json]
+
+Le rapport JSON donne le débit, les percentiles de latence et le taux
+d'erreurs par étape, et la RSS du serveur au cours du temps.
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+from werkzeug.serving import make_server
+
+from app import create_app
+from benchmarks import generators
+from benchmarks.suite import BenchConfig, parse_size
+
+STEPS = ('list_samples', 'load_sample', 'upload', 'trajectory', 'advanced', 'export')
+
+DEFAULT_MIX = '1k:6,10k:3,100k:1'
+DEFAULT_KINDS = 'kml_points,gpx'
+REQUEST_TIMEOUT = 300
+
+
+class Response:
+    def __init__(self, status: int, body: bytes):
+        self.status = status
+        self.body = body
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class HttpClient:
+    """Client HTTP minimal (bibliothèque standard), une connexion par requête."""
+
+    def __init__(self, base_url: str):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or '127.0.0.1'
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None,
+                headers: Optional[Dict[str, str]] = None) -> Response:
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=REQUEST_TIMEOUT)
+        try:
+            connection.request(method, self.prefix + path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            return Response(response.status, response.read())
+        finally:
+            connection.close()
+
+    def post_json(self, path: str, payload: Any) -> Response:
+        return self.request('POST', path, json.dumps(payload).encode('utf-8'),
+                            {'Content-Type': 'application/json'})
+
+    def post_file(self, path: str, filename: str, content: bytes) -> Response:
+        boundary = uuid.uuid4().hex
+        body = b''.join((
+            f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            'Content-Type: application/octet-stream\r\n\r\n'.encode('utf-8'),
+            content,
+            f'\r\n--{boundary}--\r\n'.encode('utf-8'),
+        ))
+        return self.request('POST', path, body, {'Content-Type': f'multipart/form-data; boundary={boundary}'})
+
+
+def parse_mix(text: str) -> List[Tuple[int, float]]:
+    """« 1k:6,10k:3 » -> [(1000, 6.0), (10000, 3.0)]."""
+    mix = []
+    for item in text.split(','):
+        size, _, weight = item.partition(':')
+        mix.append((parse_size(size), float(weight or 1)))
+    return mix
+
+
+class Payloads:
+    """Documents à uploader, générés une fois par (format, taille)."""
+
+    def __init__(self, mix: List[Tuple[int, float]], kinds: List[str], unique: bool = True):
+        self.mix = mix
+        self.kinds = kinds
+        self.unique = unique
+        self._documents = {(kind, size): generators.generate(kind, size, seed=size)
+                           for kind in kinds for size, _ in mix}
+
+    def pick(self, rng: random.Random) -> Tuple[str, int, bytes]:
+        size = rng.choices([s for s, _ in self.mix], weights=[w for _, w in self.mix])[0]
+        kind = rng.choice(self.kinds)
+        content = self._documents[(kind, size)]
+        if self.unique:
+            # Contenu distinct à chaque upload : pas de réponse servie depuis le cache
+            content += f'<!-- {uuid.uuid4().hex} -->\n'.encode('ascii')
+        return f'load.{generators.extension(kind)}', size, content
+
+
+class Recorder:
+    """Latences et erreurs par étape, partagées par les sessions."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {step: [] for step in STEPS}
+        self.errors: Dict[str, Dict[str, int]] = {step: {} for step in STEPS}
+        self.sessions = 0
+
+    def record(self, step: str, seconds: float, error: Optional[str] = None):
+        with self._lock:
+            self.latencies[step].append(seconds)
+            if error is not None:
+                self.errors[step][error] = self.errors[step].get(error, 0) + 1
+
+    def session_done(self):
+        with self._lock:
+            self.sessions += 1
+
+
+def _timed(recorder: Recorder, step: str, call) -> Optional[Response]:
+    start = time.perf_counter()
+    try:
+        response = call()
+    except (OSError, http.client.HTTPException) as e:
+        recorder.record(step, time.perf_counter() - start, type(e).__name__)
+        return None
+    error = None if response.status < 400 else str(response.status)
+    recorder.record(step, time.perf_counter() - start, error)
+    return response if error is None else None
+
+
+def run_session(client: HttpClient, payloads: Payloads, recorder: Recorder, rng: random.Random):
+    """Une session utilisateur ; les étapes qui dépendent d'une étape en échec sont sautées."""
+    listing = _timed(recorder, 'list_samples', lambda: client.request('GET', '/api/sample-files'))
+    samples = listing.json().get('files', []) if listing is not None else []
+    if samples:
+        name = rng.choice(samples)['name']
+        _timed(recorder, 'load_sample', lambda: client.request('GET', f'/api/load-sample/{quote(name)}'))
+
+    filename, _, content = payloads.pick(rng)
+    uploaded = _timed(recorder, 'upload', lambda: client.post_file('/api/upload', filename, content))
+    if uploaded is not None:
+        data = uploaded.json()
+        features, points = data.get('features', []), data.get('points', [])
+        _timed(recorder, 'trajectory', lambda: client.post_json('/api/analysis/trajectory',
+                                                                {'features': features}))
+        _timed(recorder, 'advanced', lambda: client.post_json('/api/analysis/advanced',
+                                                              {'features': features, 'points': points}))
+        _timed(recorder, 'export', lambda: client.post_json('/api/export/gpx', {'features': features}))
+    recorder.session_done()
+
+
+def read_rss(pid: int) -> Optional[int]:
+    """RSS d'un processus en octets (Linux, /proc), None si indisponible."""
+    try:
+        with open(f'/proc/{pid}/status', encoding='ascii') as handle:
+            for line in handle:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        return None
+    return None
+
+
+class RssSampler:
+    """Relève périodiquement la RSS du serveur."""
+
+    def __init__(self, pid: int, interval: float = 1.0):
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[Dict[str, float]] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+        self._start = time.monotonic()
+
+    def _sample(self):
+        rss = read_rss(self.pid)
+        if rss is not None:
+            self.samples.append({'t': round(time.monotonic() - self._start, 3), 'rss_bytes': rss})
+
+    def _run(self):
+        self._sample()
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def _percentile(values: List[float], quantile: float) -> float:
+    """Percentile au rang le plus proche."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(quantile * len(ordered)) - 1)]
+
+
+def summarize(recorder: Recorder, elapsed: float) -> Dict[str, Any]:
+    steps = {}
+    total_requests = total_errors = 0
+    for step in STEPS:
+        latencies = recorder.latencies[step]
+        errors = sum(recorder.errors[step].values())
+        total_requests += len(latencies)
+        total_errors += errors
+        if not latencies:
+            continue
+        steps[step] = {
+            'count': len(latencies),
+            'errors': errors,
+            'error_rate': round(errors / len(latencies), 4),
+            'errors_by_type': dict(recorder.errors[step]),
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+            **{f'p{int(q * 100)}_ms': round(_percentile(latencies, q) * 1000, 2) for q in (0.5, 0.9, 0.95, 0.99)},
+            'max_ms': round(max(latencies) * 1000, 2),
+        }
+    return {
+        'summary': {
+            'elapsed_s': round(elapsed, 3),
+            'sessions': recorder.sessions,
+            'requests': total_requests,
+            'errors': total_errors,
+            'error_rate': round(total_errors / total_requests, 4) if total_requests else 0.0,
+            'throughput_rps': round(total_requests / elapsed, 3) if elapsed else 0.0,
+            'sessions_per_s': round(recorder.sessions / elapsed, 3) if elapsed else 0.0,
+        },
+        'steps': steps,
+    }
+
+
+def run_load(base_url: str, server_pid: Optional[int], payloads: Payloads, concurrency: int = 4,
+             duration: Optional[float] = 60.0, sessions: Optional[int] = None, seed: int = 0,
+             rss_interval: float = 1.0) -> Dict[str, Any]:
+    """Rejoue les sessions et retourne le rapport."""
+    client = HttpClient(base_url)
+    recorder = Recorder()
+    started = threading.Lock()
+    counter = iter(range(sessions)) if sessions is not None else None
+    deadline = time.monotonic() + duration if duration is not None else None
+
+    def worker(index: int):
+        rng = random.Random(seed * 1000 + index)
+        while deadline is None or time.monotonic() < deadline:
+            if counter is not None:
+                with started:
+                    if next(counter, None) is None:
+                        return
+            run_session(client, payloads, recorder, rng)
+
+    sampler = RssSampler(server_pid, rss_interval) if server_pid is not None else None
+    if sampler is not None:
+        sampler.start()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), name=f'load-{i}') for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if sampler is not None:
+        sampler.stop()
+
+    report = summarize(recorder, elapsed)
+    rss = sampler.samples if sampler is not None else []
+    report['rss'] = rss
+    report['rss_peak_bytes'] = max((sample['rss_bytes'] for sample in rss), default=None)
+    return report
+
+
+class InProcessServer:
+    """Application servie sur un port libre, avec des fichiers d'exemple générés."""
+
+    def __init__(self, mix: List[Tuple[int, float]]):
+        self.samples_dir = tempfile.mkdtemp(prefix='load-samples-')
+        for size, _ in mix:
+            generators.write('kml_points', size, os.path.join(self.samples_dir, f'sample_{size}.kml'), seed=size)
+        self._server = None
+        self._thread = None
+
+    def start(self) -> str:
+        class LoadTestConfig(BenchConfig):
+            TESTING = False
+            SAMPLE_FILES_DIR = self.samples_dir
+
+        # Les journaux de débogage des parsers fausseraient les mesures
+        logging.disable(logging.INFO)
+        self._server = make_server('127.0.0.1', 0, create_app(LoadTestConfig), threaded=True)
+        self._thread = threading.Thread(target=self._server.serve_forever, name='load-server', daemon=True)
+        self._thread.start()
+        return f'http://127.0.0.1:{self._server.server_port}'
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._thread.join()
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(self.samples_dir, ignore_errors=True)
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    summary = report['summary']
+    lines = [f"{summary['sessions']} sessions, {summary['requests']} requêtes en {summary['elapsed_s']} s : "
+             f"{summary['throughput_rps']} req/s, erreurs {summary['error_rate'] * 100:.2f} %",
+             f"{'étape':<14}{'n':>7}{'err.':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+    for step, data in report['steps'].items():
+        lines.append(f"{step:<14}{data['count']:>7}{data['errors']:>7}{data['p50_ms']:>10}"
+                     f"{data['p95_ms']:>10}{data['p99_ms']:>10}{data['max_ms']:>10}")
+    if report['rss_peak_bytes'] is not None:
+        lines.append(f"RSS maximale : {report['rss_peak_bytes'] / 1024 ** 2:.1f} Mio")
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='Serveur cible (par défaut : application démarrée dans le processus)')
+    parser.add_argument('--server-pid', type=int, help='Processus serveur dont la RSS est suivie (avec --url)')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=60.0, help='Durée du test (secondes)')
+    parser.add_argument('--sessions', type=int, help='Nombre total de sessions (au lieu d\'une durée)')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='Tailles uploadées et leurs poids (points:poids)')
+    parser.add_argument('--kinds', default=DEFAULT_KINDS, help='Formats uploadés (générateurs de benchmarks)')
+    parser.add_argument('--repeat-uploads', action='store_true',
+                        help='Uploader des contenus identiques (réponses servies par le cache)')
+    parser.add_argument('--rss-interval', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Rapport JSON (sortie standard par défaut)')
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    payloads = Payloads(mix, args.kinds.split(','), unique=not args.repeat_uploads)
+    server = None
+    if args.url:
+        base_url, pid = args.url, args.server_pid
+    else:
+        server = InProcessServer(mix)
+        base_url, pid = server.start(), os.getpid()
+    try:
+        report = run_load(base_url, pid, payloads, args.concurrency,
+                          None if args.sessions is not None else args.duration, args.sessions,
+                          args.seed, args.rss_interval)
+    finally:
+        if server is not None:
+            server.stop()
+
+    report['meta'] = {'target': args.url or 'in-process', 'concurrency': args.concurrency,
+                      'duration_s': None if args.sessions is not None else args.duration,
+                      'sessions': args.sessions, 'mix': args.mix, 'kinds': args.kinds,
+                      'unique_uploads': not args.repeat_uploads}
+    print(format_report(report), file=sys.stderr)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            handle.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
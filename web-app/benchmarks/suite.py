@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Suite de benchmarks : parsers, analyses de trajectoire, exports et routes d'upload.
+
+Chaque cas est mesuré sur des documents synthétiques déterministes
+(``benchmarks.generators``) à plusieurs tailles. Les durées (médiane, min,
+moyenne, écart-type) sont mesurées sans tracemalloc ; une exécution
+supplémentaire sous tracemalloc relève le pic d'allocation. Le résultat est
+un document JSON comparable d'un commit à l'autre.
+
+Usage :
+    python -m benchmarks.suite [--sizes 1k,10k,100k] [--repeat 5] [--filter REGEX]
+                               [--output results.json] [--no-memory] [--list]
+
+Les grandes tailles (1M, 5M) demandent plusieurs Go de mémoire : le document
+et son résultat de parsing sont conservés pendant les mesures de la taille.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from io import BytesIO
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app import create_app
+from app.config import TestingConfig
+from app.services.cache_service import clear_cache, parse_kml_cached
+from app.services.gpx_parser import GPXParser
+from app.services.kml_editor import KMLEditor
+from app.services.kml_parser import KMLParser
+from app.services.trajectory_analyzer import TrajectoryAnalyzer
+from benchmarks import generators
+
+DEFAULT_SIZES = (1_000, 10_000)
+DEFAULT_REPEAT = 5
+
+KML_KINDS = ('kml_linestring', 'kml_track', 'kml_points', 'kml_folders', 'kml_styles')
+
+# Fonction mesurée, et remise en état (non mesurée) avant chaque exécution
+Runner = Tuple[Callable[[], Any], Optional[Callable[[], None]]]
+
+
+class BenchConfig(TestingConfig):
+    """Uploads traités dans la requête, quelle que soit leur taille, sans traçage."""
+    MAX_CONTENT_LENGTH = None
+    ASYNC_UPLOAD_THRESHOLD = float('inf')
+    TRACE_SAMPLE_RATE = 0.0
+
+
+class Case:
+    """Cas de benchmark : ``setup(fixtures, size)`` prépare la fonction à mesurer."""
+
+    def __init__(self, name: str, setup: Callable[['Fixtures', int], Runner]):
+        self.name = name
+        self.setup = setup
+
+
+CASES: List[Case] = []
+
+
+def case(name: str):
+    def register(setup):
+        CASES.append(Case(name, setup))
+        return setup
+    return register
+
+
+class Fixtures:
+    """Documents générés et résultats de parsing, partagés par les cas d'une même taille."""
+
+    def __init__(self):
+        self._values: Dict[Tuple, Any] = {}
+        self._app = None
+
+    def _memo(self, key: Tuple, build: Callable[[], Any]) -> Any:
+        if key not in self._values:
+            self._values[key] = build()
+        return self._values[key]
+
+    def document(self, kind: str, size: int) -> bytes:
+        return self._memo(('document', kind, size), lambda: generators.generate(kind, size))
+
+    def parsed(self, size: int) -> Dict[str, Any]:
+        """Résultat complet (features, points) d'un document un Placemark par point."""
+        return self._memo(('parsed', size), lambda: KMLParser.parse_kml_coordinates(
+            self.document('kml_points', size)))
+
+    def coordinates(self, size: int) -> List[List[float]]:
+        def build():
+            return [coord for feature in self.parsed(size)['features'] if feature['type'] == 'polyline'
+                    for coord in feature['coordinates']]
+        return self._memo(('coordinates', size), build)
+
+    def client(self):
+        if self._app is None:
+            self._app = create_app(BenchConfig)
+        return self._app.test_client()
+
+    def clear(self):
+        self._values.clear()
+
+
+# ===== Parsers =====
+
+def _register_kml_parse(kind: str):
+    @case(f'KMLParser.parse[{kind}]')
+    def _parse(fixtures, size):
+        content = fixtures.document(kind, size)
+        return (lambda: KMLParser.parse(content)), None
+
+
+for _kind in KML_KINDS:
+    _register_kml_parse(_kind)
+
+
+@case('GPXParser.parse_gpx_coordinates[gpx]')
+def _parse_gpx(fixtures, size):
+    content = fixtures.document('gpx', size)
+    return (lambda: GPXParser.parse_gpx_coordinates(content)), None
+
+
+@case('parse_kml_cached[kml_points]')
+def _parse_kml_cached(fixtures, size):
+    content = fixtures.document('kml_points', size)
+    return (lambda: parse_kml_cached(content)), clear_cache
+
+
+# ===== Analyses de trajectoire =====
+
+def _features(fixtures, size):
+    return fixtures.parsed(size)['features']
+
+
+def _points(fixtures, size):
+    return fixtures.parsed(size)['points']
+
+
+_ANALYSES = {
+    'calculate_total_distance': (lambda f, s: (f.coordinates(s),)),
+    'calculate_elevation_profile': (lambda f, s: (f.coordinates(s),)),
+    'calculate_speed_statistics': (lambda f, s: (_points(f, s),)),
+    'estimate_duration_from_points': (lambda f, s: (_points(f, s),)),
+    'analyze_trajectory': (lambda f, s: (_features(f, s),)),
+    'detect_stops': (lambda f, s: (_points(f, s),)),
+    'segment_trajectory': (lambda f, s: (f.coordinates(s), _points(f, s))),
+    'analyze_speed_zones': (lambda f, s: (_points(f, s),)),
+    'calculate_acceleration_zones': (lambda f, s: (_points(f, s),)),
+    'analyze_terrain': (lambda f, s: (f.coordinates(s),)),
+    'detect_points_of_interest': (lambda f, s: (f.coordinates(s),)),
+    'advanced_trajectory_analysis': (lambda f, s: (_features(f, s), _points(f, s))),
+}
+
+
+def _register_analysis(method: str, arguments):
+    @case(f'TrajectoryAnalyzer.{method}')
+    def _analysis(fixtures, size):
+        function, args = getattr(TrajectoryAnalyzer, method), arguments(fixtures, size)
+        return (lambda: function(*args)), None
+
+
+for _method, _arguments in _ANALYSES.items():
+    _register_analysis(_method, _arguments)
+
+
+# ===== Éditeur et exports =====
+
+@case('KMLEditor.simplify_trace')
+def _simplify(fixtures, size):
+    coordinates = fixtures.coordinates(size)
+    return (lambda: KMLEditor.simplify_trace(coordinates)), None
+
+
+def _register_export(method: str):
+    @case(f'KMLEditor.{method}')
+    def _export(fixtures, size):
+        function, features = getattr(KMLEditor, method), _features(fixtures, size)
+        return (lambda: function(features)), None
+
+
+for _method in ('export_to_gpx', 'export_to_csv', 'export_to_geojson', 'export_to_kml'):
+    _register_export(_method)
+
+
+# ===== Routes (client de test Flask) =====
+
+def _post_file(client, url: str, content: bytes, filename: str):
+    response = client.post(url, data={'file': (BytesIO(content), filename)},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200, response.get_data(as_text=True)[:200]
+    return response
+
+
+def _register_upload(url: str, kind: str):
+    @case(f'POST {url}[{kind}]')
+    def _upload(fixtures, size):
+        client, content = fixtures.client(), fixtures.document(kind, size)
+        filename = f'bench.{generators.extension(kind)}'
+        return (lambda: _post_file(client, url, content, filename)), clear_cache
+
+
+for _url, _kind in (('/api/upload', 'kml_points'), ('/api/upload', 'gpx'),
+                    ('/api/analysis/upload-and-analyze', 'kml_points')):
+    _register_upload(_url, _kind)
+
+
+@case('POST /api/analysis/advanced')
+def _advanced_route(fixtures, size):
+    client = fixtures.client()
+    payload = {'features': _features(fixtures, size), 'points': _points(fixtures, size)}
+    return (lambda: client.post('/api/analysis/advanced', json=payload)), None
+
+
+@case('POST /api/export/geojson')
+def _export_route(fixtures, size):
+    client = fixtures.client()
+    payload = {'features': _features(fixtures, size)}
+    return (lambda: client.post('/api/export/geojson', json=payload)), None
+
+
+# ===== Mesure =====
+
+def measure(function: Callable[[], Any], reset: Optional[Callable[[], None]] = None,
+            repeat: int = DEFAULT_REPEAT, memory: bool = True) -> Dict[str, Any]:
+    """Durées de ``repeat`` exécutions (après une exécution de chauffe) et pic d'allocation."""
+    if reset is not None:
+        reset()
+    function()
+    durations = []
+    for _ in range(repeat):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+
+    result = {
+        'runs': repeat,
+        'median_s': statistics.median(durations),
+        'min_s': min(durations),
+        'mean_s': statistics.fmean(durations),
+        'stdev_s': statistics.stdev(durations) if repeat > 1 else 0.0,
+    }
+    if memory:
+        if reset is not None:
+            reset()
+        already_tracing = tracemalloc.is_tracing()
+        if not already_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        function()
+        result['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1] - baseline
+        if not already_tracing:
+            tracemalloc.stop()
+    return result
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def select(pattern: Optional[str] = None) -> List[Case]:
+    regex = re.compile(pattern) if pattern else None
+    return [c for c in CASES if regex is None or regex.search(c.name)]
+
+
+def run(sizes=DEFAULT_SIZES, repeat: int = DEFAULT_REPEAT, pattern: Optional[str] = None,
+        memory: bool = True, log: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """Exécute les cas sélectionnés à chaque taille ; retourne le document de résultats."""
+    cases = select(pattern)
+    fixtures = Fixtures()
+    results = []
+    # Les journaux de débogage des parsers fausseraient les mesures
+    logging.disable(logging.INFO)
+    try:
+        for size in sizes:
+            for bench in cases:
+                function, reset = bench.setup(fixtures, size)
+                entry = {'name': bench.name, 'size': size, **measure(function, reset, repeat, memory)}
+                results.append(entry)
+                if log is not None:
+                    log(f"{bench.name:<55} {size:>9} {entry['median_s'] * 1000:>10.2f} ms")
+            fixtures.clear()
+    finally:
+        logging.disable(logging.NOTSET)
+        clear_cache()
+    return {
+        'meta': {
+            'commit': _commit(),
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'sizes': list(sizes),
+            'repeat': repeat,
+            'pattern': pattern,
+        },
+        'results': results,
+    }
+
+
+def parse_size(text: str) -> int:
+    """« 1k », « 100k », « 5m » ou un entier."""
+    text = text.strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * multiplier)
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help='Tailles en points, séparées par des virgules (1k, 100k, 5m...)')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='Exécutions mesurées par cas')
+    parser.add_argument('--filter', dest='pattern', help='Expression régulière sur le nom des cas')
+    parser.add_argument('--no-memory', dest='memory', action='store_false',
+                        help='Ne pas relever le pic d\'allocation')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    parser.add_argument('--output', help='Fichier JSON de résultats (sortie standard par défaut)')
+    parser.add_argument('--list', action='store_true', help='Liste les cas et quitte')
+    args = parser.parse_args()
+
+    if args.list:
+        print('\n'.join(c.name for c in select(args.pattern)))
+        return
+
+    sizes = [parse_size(size) for size in args.sizes.split(',')]
+    document = run(sizes, args.repeat, args.pattern, args.memory, log=lambda line: print(line, file=sys.stderr))
+    text = json.dumps(document, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            handle.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -61,7 +61,7 @@ function initMap() {
 }
 
 // Affichage des alertes en popup
-function showAlert(message, type = 'info') {
+function showAlert(message, type = 'info', duration = 3000) {
     const alertContainer = document.getElementById('alertContainer');
     const alertDiv = document.createElement('div');
     alertDiv.className = `alert-popup alert-${type}`;
@@ -85,19 +85,25 @@ function showAlert(message, type = 'info') {
         alertDiv.classList.add('show');
     }, 100);
     
-    // Auto-suppression après 10 secondes
-    setTimeout(() => {
-        if (alertDiv.parentNode) {
-            alertDiv.classList.remove('show');
-            setTimeout(() => {
-                if (alertDiv.parentNode) {
-                    alertDiv.remove();
-                    // Réajuster les positions des alertes restantes
-                    repositionAlerts();
-                }
-            }, 300);
-        }
-    }, 3000);
+    // Auto-suppression (sauf durée nulle : l'appelant retire lui-même l'alerte)
+    if (duration > 0) {
+        setTimeout(() => dismissAlert(alertDiv), duration);
+    }
+    return alertDiv;
+}
+
+// Retire une alerte avec animation de sortie
+function dismissAlert(alertDiv) {
+    if (alertDiv.parentNode) {
+        alertDiv.classList.remove('show');
+        setTimeout(() => {
+            if (alertDiv.parentNode) {
+                alertDiv.remove();
+                // Réajuster les positions des alertes restantes
+                repositionAlerts();
+            }
+        }, 300);
+    }
 }
 
 // Fonction pour repositionner les alertes après suppression
@@ -1194,11 +1200,13 @@ function setupFileHandling() {
     });
 }
 
+// Fichiers acceptés, éventuellement compressés (gzip, zstd)
+const SUPPORTED_FILE_PATTERN = /\.(kml|kmz|gpx)(\.(gz|gzip|zst|zstd))?$/;
+
 // Upload de fichier
 function uploadFile(file) {
-    const fileName = file.name.toLowerCase();
-    if (!fileName.endsWith('.kml') && !fileName.endsWith('.gpx')) {
-        showAlert('<i class="fas fa-exclamation-triangle me-2"></i>Seuls les fichiers .kml et .gpx sont acceptés', 'warning');
+    if (!SUPPORTED_FILE_PATTERN.test(file.name.toLowerCase())) {
+        showAlert('<i class="fas fa-exclamation-triangle me-2"></i>Seuls les fichiers .kml, .kmz et .gpx sont acceptés', 'warning');
         return;
     }
     
@@ -1209,13 +1217,21 @@ function uploadFile(file) {
     const displayMode = document.querySelector('input[name="displayMode"]:checked').value;
     formData.append('display_mode', displayMode);
     
+    // Les gros fichiers sont traités en arrière-plan avec suivi de progression
+    const useAsync = file.size > ASYNC_UPLOAD_SIZE;
+    if (useAsync) {
+        formData.append('async', '1');
+    }
+    
     showAlert(`<i class="fas fa-spinner fa-spin me-2"></i>Traitement de ${file.name}...`, 'info');
     
-    fetch('/api/upload', {
-        method: 'POST',
-        body: formData
-    })
-    .then(response => response.json())
+    // Au-delà de la limite d'une requête, le fichier est envoyé par morceaux
+    const request = file.size > CHUNKED_UPLOAD_SIZE
+        ? uploadInChunks(file, displayMode)
+        : fetch('/api/upload', { method: 'POST', body: formData }).then(response => response.json());
+    
+    request
+    .then(data => data.job_id ? followJobProgress(data, file.name) : data)
     .then(data => {
         if (data.success) {
             displayFileData(data);
@@ -1229,6 +1245,115 @@ function uploadFile(file) {
     });
 }
 
+// Taille (octets) au-delà de laquelle un upload est traité en arrière-plan
+const ASYNC_UPLOAD_SIZE = 1024 * 1024;
+
+// Taille (octets) au-delà de laquelle un fichier est envoyé par morceaux
+const CHUNKED_UPLOAD_SIZE = 8 * 1024 * 1024;
+const UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024;
+const UPLOAD_CHUNK_RETRIES = 3;
+
+// Envoie un fichier par morceaux (reprise à la position connue du serveur en cas d'échec)
+async function uploadInChunks(file, displayMode) {
+    const init = await fetch('/api/uploads', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ filename: file.name, total_size: file.size })
+    }).then(response => response.json());
+    if (!init.success) {
+        return init;
+    }
+    
+    let offset = 0;
+    let retries = 0;
+    while (offset < file.size) {
+        try {
+            const response = await fetch(`${init.upload_url}?offset=${offset}`, {
+                method: 'PUT',
+                body: file.slice(offset, offset + UPLOAD_CHUNK_SIZE)
+            });
+            const data = await response.json();
+            if (!data.success && response.status !== 409) {
+                return data;
+            }
+            offset = data.offset;
+            retries = 0;
+        } catch (error) {
+            if (++retries > UPLOAD_CHUNK_RETRIES) {
+                throw error;
+            }
+            // Reprendre à la position enregistrée par le serveur
+            const status = await fetch(init.upload_url).then(response => response.json());
+            offset = status.offset;
+        }
+    }
+    
+    return fetch(`${init.upload_url}/finalize`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ display_mode: displayMode })
+    }).then(response => response.json());
+}
+
+// Libellés des étapes de traitement côté serveur
+const JOB_STAGE_LABELS = {
+    pending: 'En attente',
+    parse_xml: 'Lecture du fichier',
+    metadata: 'Métadonnées',
+    extract_features: 'Extraction des éléments',
+    extract_points: 'Extraction des points',
+    distance: 'Calcul des distances',
+    elevation: 'Profil d\'élévation',
+    speed: 'Analyse de vitesse'
+};
+
+// Formate la progression d'un job pour l'affichage
+function formatJobProgress(progress) {
+    const label = JOB_STAGE_LABELS[progress.stage] || progress.stage;
+    if (progress.stage === 'parse_xml' && progress.bytes_total) {
+        const percent = Math.round(100 * progress.bytes_consumed / progress.bytes_total);
+        return `${label} : ${percent}%`;
+    }
+    if (progress.total) {
+        return `${label} : ${progress.current}/${progress.total}`;
+    }
+    return label;
+}
+
+// Suit la progression d'un job via Server-Sent Events et retourne son résultat
+function followJobProgress(job, fileName) {
+    const alertDiv = showAlert(
+        `<i class="fas fa-spinner fa-spin me-2"></i>Traitement de ${fileName}... <span class="job-progress"></span>`,
+        'info', 0);
+    const progressElement = alertDiv.querySelector('.job-progress');
+    
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(job.events_url);
+        source.addEventListener('progress', event => {
+            progressElement.textContent = formatJobProgress(JSON.parse(event.data).progress);
+        });
+        source.addEventListener('done', () => {
+            source.close();
+            dismissAlert(alertDiv);
+            fetch(job.status_url)
+                .then(response => response.json())
+                .then(data => {
+                    if (data.status === 'done') {
+                        resolve(data.result);
+                    } else {
+                        resolve({ success: false, error: data.error || 'Traitement en échec' });
+                    }
+                })
+                .catch(reject);
+        });
+        source.onerror = () => {
+            source.close();
+            dismissAlert(alertDiv);
+            reject(new Error('Connexion au suivi de progression perdue'));
+        };
+    });
+}
+
 // Fonction pour recharger les données avec un nouveau mode d'affichage
 function reloadWithDisplayMode() {
     // Cette fonction sera appelée quand on change le mode d'affichage
@@ -1781,7 +1906,7 @@ function setActiveFile(fileId) {
 function uploadFiles(files) {
     const formData = new FormData();
     const validFiles = Array.from(files).filter((f) =>
-        f.name.toLowerCase().endsWith('.kml') || f.name.toLowerCase().endsWith('.gpx')
+        SUPPORTED_FILE_PATTERN.test(f.name.toLowerCase())
     );
     if (validFiles.length === 0) {
         showAlert('<i class="fas fa-exclamation-triangle me-2"></i>Aucun fichier valide', 'warning');
@@ -0,0 +1,60 @@
+import pytest
+
+from app import create_app
+from app.config import TestingConfig
+from app.services import analysis_backend, fast_analysis
+from app.services.trajectory_analyzer import TrajectoryAnalyzer
+from benchmarks import differential
+
+
+def test_backends_are_equivalent():
+    trajectories = differential.random_trajectories(count=10, seed=3) + differential.synthetic_trajectories((11, 150))
+    assert differential.check(trajectories) == []
+
+
+def test_check_reports_differences(monkeypatch):
+    original = fast_analysis.terrain
+
+    def shifted(coordinates):
+        result = original(coordinates)
+        if result is not None and result['slopes']:
+            result['max_slope'] += 1
+        return result
+
+    monkeypatch.setattr(fast_analysis, 'terrain', shifted)
+    trajectories = differential.synthetic_trajectories((11,))
+    mismatches = differential.check(trajectories, pattern='terrain')
+    assert [m['function'] for m in mismatches] == ['analyze_terrain']
+    assert mismatches[0]['differences'][0].startswith('.max_slope')
+
+
+def test_only_rounded_keys_may_flip_by_one_unit():
+    reference = {'total_ascent': 12.3, 'avg_slope': 1.23, 'b': [1.0000000001]}
+    assert differential.differences(reference, {'total_ascent': 12.4, 'avg_slope': 1.24, 'b': [1.0]}) == []
+    assert differential.differences({'total_ascent': 12.3}, {'total_ascent': 12.5}) == ['.total_ascent: 12.3 != 12.5']
+    assert differential.differences({'distance': 1000.0}, {'distance': 1001.0}) == ['.distance: 1000.0 != 1001.0']
+    assert differential.differences(0.1, 0.2) == [': 0.1 != 0.2']
+    assert differential.differences(3, 4) == [': 3 != 4']
+
+
+def test_selector():
+    coordinates = [[45.0, 5.0, 100.0], [45.001, 5.0, 110.0], [45.002, 5.001, 105.0]]
+    with analysis_backend.use_backend('reference'):
+        assert analysis_backend.current() == 'reference'
+        reference = TrajectoryAnalyzer.calculate_elevation_profile(coordinates)
+    fast = TrajectoryAnalyzer.calculate_elevation_profile(coordinates)
+    assert differential.differences(reference, fast) == []
+    with pytest.raises(ValueError):
+        analysis_backend.configure('numba')
+
+
+def test_init_app_applies_configured_backend():
+    class ReferenceConfig(TestingConfig):
+        ANALYSIS_BACKEND = 'reference'
+
+    try:
+        create_app(ReferenceConfig)
+        assert analysis_backend.current() == 'reference'
+        assert not analysis_backend.is_fast()
+    finally:
+        analysis_backend.configure('fast')
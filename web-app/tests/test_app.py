@@ -80,3 +80,37 @@ def test_api_upload_empty_filename(client):
     json_data = response.get_json()
     assert json_data['success'] is False
     assert 'Aucun fichier sélectionné' in json_data['error']
+
+
+def test_api_upload_stream_ndjson(client):
+    """Test de l'upload avec réponse en flux NDJSON."""
+    import json
+    from io import BytesIO
+
+    kml = """<?xml version='1.0' encoding='UTF-8'?><kml xmlns='http://www.opengis.net/kml/2.2'><Document>
+    <Placemark><Point><coordinates>0,0,0</coordinates></Point></Placemark></Document></kml>"""
+    data = {'file': (BytesIO(kml.encode('utf-8')), 'a.kml'), 'stream': '1'}
+
+    response = client.post('/api/upload', data=data, content_type='multipart/form-data')
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[0]['type'] == 'feature'
+    assert lines[-1]['type'] == 'metadata'
+    assert lines[-1]['total_points'] == 1
+
+    data = {'file': (BytesIO(b'<kml><unclosed>'), 'b.kml'), 'stream': '1'}
+    response = client.post('/api/upload', data=data, content_type='multipart/form-data')
+    assert json.loads(response.get_data(as_text=True))['type'] == 'error'
+
+
+def test_api_upload_latin1_kml(client):
+    """Test de l'upload d'un KML encodé en Latin-1."""
+    from io import BytesIO
+
+    kml = """<?xml version="1.0" encoding="ISO-8859-1"?><kml xmlns="http://www.opengis.net/kml/2.2"><Document>
+    <Placemark><name>Étape</name><Point><coordinates>0,0,0</coordinates></Point></Placemark></Document></kml>"""
+    data = {'file': (BytesIO(kml.encode('latin-1')), 'latin.kml')}
+
+    response = client.post('/api/upload', data=data, content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert response.get_json()['features'][0]['name'] == 'Étape'
@@ -0,0 +1,53 @@
+import json
+
+from benchmarks import compare
+
+
+def result(name, median, minimum=None, peak=1024 ** 2, size=1000):
+    return {'name': name, 'size': size, 'runs': 5, 'median_s': median,
+            'min_s': median if minimum is None else minimum, 'stdev_s': 0.0, 'peak_memory_bytes': peak}
+
+
+def document(*results):
+    return {'meta': {'sizes': [1000], 'repeat': 5, 'pattern': None}, 'results': list(results)}
+
+
+def statuses(baseline, current):
+    return {row.name: row.status for row in compare.compare(baseline, current)}
+
+
+def test_slowdown_beyond_threshold_is_a_regression():
+    baseline = document(result('parse', 0.100), result('stable', 0.100))
+    current = document(result('parse', 0.130), result('stable', 0.110))
+    assert statuses(baseline, current) == {'parse': 'RÉGRESSION', 'stable': 'ok'}
+
+
+def test_noisy_measurements_widen_the_tolerance():
+    baseline = document(result('noisy', 0.100, minimum=0.070))
+    current = document(result('noisy', 0.140, minimum=0.090))
+    row = compare.compare(baseline, current)[0]
+    assert row.time_tolerance > 0.5
+    assert row.status == 'ok'
+
+
+def test_tiny_absolute_changes_and_memory():
+    baseline = document(result('fast', 0.0001), result('alloc', 0.1, peak=10 * 1024 ** 2))
+    current = document(result('fast', 0.0005), result('alloc', 0.1, peak=12 * 1024 ** 2))
+    assert statuses(baseline, current) == {'fast': 'ok', 'alloc': 'RÉGRESSION'}
+
+
+def test_table_and_exit_codes(tmp_path, capsys):
+    baseline_path, current_path = tmp_path / 'baseline.json', tmp_path / 'current.json'
+    current_path.write_text(json.dumps(document(result('parse', 0.100), result('new', 0.1))))
+    assert compare.main(['--baseline', str(baseline_path), '--current', str(current_path)]) == 2
+
+    assert compare.main(['--baseline', str(baseline_path), '--current', str(current_path),
+                         '--update-baseline']) == 0
+    assert compare.main(['--baseline', str(baseline_path), '--current', str(current_path)]) == 0
+
+    current_path.write_text(json.dumps(document(result('parse', 0.200))))
+    capsys.readouterr()
+    assert compare.main(['--baseline', str(baseline_path), '--current', str(current_path)]) == 1
+    output = capsys.readouterr().out
+    assert 'parse' in output and '+100.0% !' in output and 'absent' in output
+    assert '--update-baseline' in output
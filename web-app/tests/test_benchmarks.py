@@ -0,0 +1,37 @@
+from benchmarks import generators, suite
+from app.services.gpx_parser import GPXParser
+from app.services.kml_parser import KMLParser
+
+
+def test_generators_are_deterministic_and_parse(tmp_path):
+    for kind in generators.GENERATORS:
+        content = generators.generate(kind, 120, seed=3)
+        assert content == generators.generate(kind, 120, seed=3)
+        path = generators.write(kind, 120, str(tmp_path / f'{kind}.{generators.extension(kind)}'), seed=3)
+        assert open(path, 'rb').read() == content
+
+        if kind == 'gpx':
+            result = GPXParser.parse_gpx_coordinates(content)
+            assert len(result['points']) == 120
+        else:
+            result = KMLParser.parse_kml_coordinates(content)
+            assert result['success']
+            if kind in ('kml_points', 'kml_folders', 'kml_styles'):
+                assert len(result['points']) == 120
+                assert result['points'][0]['parsed_info']['speed_kmh'] == 40.0
+
+
+def test_parse_size():
+    assert [suite.parse_size(s) for s in ('1k', '100K', '5m', '250')] == [1000, 100_000, 5_000_000, 250]
+
+
+def test_suite_reports_json_results():
+    document = suite.run(sizes=[100], repeat=2, pattern=r'parse_kml_cached|detect_stops|/api/upload\[gpx')
+    names = [entry['name'] for entry in document['results']]
+    assert names == ['parse_kml_cached[kml_points]', 'TrajectoryAnalyzer.detect_stops',
+                     'POST /api/upload[gpx]']
+    for entry in document['results']:
+        assert entry['size'] == 100 and entry['runs'] == 2
+        assert 0 < entry['min_s'] <= entry['median_s']
+        assert entry['peak_memory_bytes'] > 0
+    assert document['meta']['repeat'] == 2
@@ -19,3 +19,46 @@ def test_parse_gpx_cached_same_object():
     r2 = parse_gpx_cached(gpx)
     assert r1 is r2
     assert r1['success']
+
+
+def test_stream_document_matches_full_parse():
+    from app.services.cache_service import stream_document_cached, get_cached, cache_key
+    clear_cache()
+    kml = """<?xml version='1.0' encoding='UTF-8'?><kml xmlns='http://www.opengis.net/kml/2.2'><Document>
+    <name>Doc</name>
+    <Placemark><name>A</name><Point><coordinates>1,2,3</coordinates></Point></Placemark>
+    <Placemark><name>L</name><LineString><coordinates>1,2,0 3,4,0</coordinates></LineString></Placemark>
+    </Document></kml>"""
+
+    records = list(stream_document_cached(kml, 'kml'))
+    assert [r['type'] for r in records] == ['feature', 'point', 'feature', 'metadata']
+    assert records[-1]['metadata']['title'] == 'Doc'
+
+    # Le résultat assemblé est mis en cache et identique au parsing complet
+    cached = get_cached(cache_key(kml, 'kml'))
+    clear_cache()
+    full = parse_kml_cached(kml)
+    assert cached['features'] == full['features']
+    assert cached['points'] == full['points']
+    assert cached['metadata'] == full['metadata']
+    assert list(stream_document_cached(kml, 'kml')) == records
+
+
+def test_parse_file_cached_skips_read_for_unchanged_file(tmp_path, monkeypatch):
+    from app.services import cache_service
+    from app.services.cache_service import parse_file_cached
+    from app.services.file_service import FileService
+
+    clear_cache()
+    path = tmp_path / 'trace.gpx'
+    path.write_bytes(b"<?xml version='1.0'?><gpx xmlns='http://www.topografix.com/GPX/1/1'>"
+                     b"<trk><trkseg><trkpt lat='1' lon='2'><ele>0</ele></trkpt></trkseg></trk></gpx>")
+    first = parse_file_cached(str(path), 'gpx')
+    assert first['success']
+    assert first['document_id'] == cache_service._hash_content(path.read_bytes())
+
+    def fail(*_):
+        raise AssertionError('fichier relu alors qu\'il est inchangé')
+
+    monkeypatch.setattr(FileService, 'map_file', fail)
+    assert parse_file_cached(str(path), 'gpx') is first
@@ -0,0 +1,64 @@
+import hashlib
+import os
+
+from app.services.cache_service import clear_cache
+from app.services.upload_service import upload_manager
+
+GPX = """<?xml version='1.0' encoding='UTF-8'?><gpx xmlns='http://www.topografix.com/GPX/1/1'>
+<trk><trkseg><trkpt lat='5' lon='0'><ele>0</ele></trkpt><trkpt lat='5' lon='0.1'><ele>0</ele></trkpt>
+</trkseg></trk></gpx>""".encode('utf-8')
+
+
+def _start(client, size=len(GPX), filename='long.gpx'):
+    response = client.post('/api/uploads', json={'filename': filename, 'total_size': size})
+    assert response.status_code == 201
+    return response.get_json()
+
+
+def test_chunked_upload_resume_and_finalize(client):
+    clear_cache()
+    upload = _start(client)
+    url = upload['upload_url']
+
+    assert client.put(f'{url}?offset=0', data=GPX[:100]).get_json()['offset'] == 100
+    # Morceau envoyé à une mauvaise position : le serveur indique où reprendre
+    conflict = client.put(f'{url}?offset=50', data=GPX[50:])
+    assert conflict.status_code == 409
+    offset = conflict.get_json()['offset']
+    assert client.get(url).get_json()['offset'] == offset == 100
+    client.put(f'{url}?offset={offset}', data=GPX[offset:])
+
+    spooled = upload_manager.get(upload['upload_id']).path
+    response = client.post(f'{url}/finalize', json={'sha256': hashlib.sha256(GPX).hexdigest()})
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data['success']
+    assert data['document_id'] == hashlib.sha256(GPX).hexdigest()
+    assert len(data['points']) == 2
+    assert not os.path.exists(spooled)
+    assert client.get(url).status_code == 404
+
+
+def test_chunked_upload_rejects_incomplete_or_corrupted_file(client):
+    upload = _start(client)
+    url = upload['upload_url']
+    client.put(f'{url}?offset=0', data=GPX[:10])
+    assert client.post(f'{url}/finalize', json={}).status_code == 400
+
+    client.put(f'{url}?offset=10', data=GPX[10:])
+    response = client.post(f'{url}/finalize', json={'sha256': '0' * 64})
+    assert response.status_code == 400
+    assert client.delete(url).get_json()['success']
+
+
+def test_chunked_upload_limits(app, client):
+    assert client.post('/api/uploads', json={'filename': 'trace.txt'}).status_code == 400
+    app.config['CHUNKED_UPLOAD_MAX_SIZE'] = 50
+    upload_manager.configure(upload_manager.spool_dir, 50, upload_manager.ttl)
+    try:
+        assert client.post('/api/uploads', json={'filename': 'a.gpx', 'total_size': 100}).status_code == 413
+        url = _start(client, size=None)['upload_url']
+        assert client.put(f'{url}?offset=0', data=GPX).status_code == 413
+        assert client.get(url).get_json()['offset'] == 0
+    finally:
+        upload_manager.clear()
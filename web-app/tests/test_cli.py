@@ -0,0 +1,47 @@
+import json
+
+from app.cli import main
+
+GPX = """<?xml version='1.0' encoding='UTF-8'?><gpx xmlns='http://www.topografix.com/GPX/1/1'>
+<trk><trkseg><trkpt lat='{lat}' lon='0'><ele>0</ele></trkpt><trkpt lat='{lat}' lon='0.1'><ele>0</ele></trkpt>
+</trkseg></trk></gpx>"""
+
+
+def test_cli_analyze_is_resumable(tmp_path, capsys):
+    """Une seconde exécution ignore les fichiers déjà présents dans le manifeste."""
+    source = tmp_path / 'archives'
+    (source / 'sub').mkdir(parents=True)
+    (source / 'a.gpx').write_text(GPX.format(lat=1), encoding='utf-8')
+    (source / 'sub' / 'b.gpx').write_text(GPX.format(lat=2), encoding='utf-8')
+    (source / 'notes.txt').write_text('ignoré', encoding='utf-8')
+    output = tmp_path / 'out.ndjson'
+
+    args = ['analyze', str(source), '--output', str(output), '--workers', '0',
+            '--analyses', 'trajectory,advanced', '--quiet']
+    assert main(args) == 0
+    assert json.loads(capsys.readouterr().out.strip().splitlines()[-1]) == {'processed': 2, 'skipped': 0, 'errors': 0}
+
+    rows = [json.loads(line) for line in output.read_text(encoding='utf-8').splitlines()]
+    assert len(rows) == 2
+    assert all(row['success'] and row['distance_km'] > 0 for row in rows)
+    assert 'stops_count' in rows[0]
+
+    (source / 'c.gpx').write_text(GPX.format(lat=3), encoding='utf-8')
+    assert main(args) == 0
+    assert json.loads(capsys.readouterr().out.strip().splitlines()[-1]) == {'processed': 1, 'skipped': 2, 'errors': 0}
+    assert len(output.read_text(encoding='utf-8').splitlines()) == 3
+
+
+def test_cli_retries_failed_files(tmp_path, capsys):
+    """Un fichier en erreur n'entre pas dans le manifeste : il est retenté à la reprise."""
+    source = tmp_path / 'archives'
+    source.mkdir()
+    (source / 'a.gpx').write_text(GPX.format(lat=1), encoding='utf-8')
+    (source / 'broken.kml').write_text('<kml><unclosed>', encoding='utf-8')
+    output = tmp_path / 'out.ndjson'
+
+    args = ['analyze', str(source), '--output', str(output), '--workers', '0', '--quiet']
+    assert main(args) == 0
+    assert json.loads(capsys.readouterr().out.strip().splitlines()[-1]) == {'processed': 2, 'skipped': 0, 'errors': 1}
+    assert main(args) == 0
+    assert json.loads(capsys.readouterr().out.strip().splitlines()[-1]) == {'processed': 1, 'skipped': 1, 'errors': 1}
@@ -0,0 +1,62 @@
+import gzip
+from io import BytesIO
+
+import pytest
+
+from app.services import compression
+from app.services.cache_service import clear_cache
+from app.services.gpx_parser import GPXParser
+from app.services.kml_parser import KMLParser
+
+KML = b"""<?xml version='1.0' encoding='UTF-8'?><kml xmlns='http://www.opengis.net/kml/2.2'><Document>
+<Placemark><name>A</name><Point><coordinates>1,2,0</coordinates></Point></Placemark></Document></kml>"""
+GPX = b"""<?xml version='1.0' encoding='UTF-8'?><gpx xmlns='http://www.topografix.com/GPX/1/1'>
+<trk><trkseg><trkpt lat='5' lon='0'><ele>0</ele></trkpt><trkpt lat='5' lon='0.1'><ele>0</ele></trkpt>
+</trkseg></trk></gpx>"""
+
+
+def test_gzip_documents_are_detected_by_content():
+    assert compression.detect_compression(gzip.compress(KML)) == 'gzip'
+    assert compression.detect_compression(KML) is None
+    assert KMLParser.parse_kml_coordinates(gzip.compress(KML))['total_points'] == 1
+    assert len(GPXParser.parse_gpx_coordinates(BytesIO(gzip.compress(GPX)))['points']) == 2
+    events = list(KMLParser.iter_parse(gzip.compress(KML)))
+    assert [kind for kind, _ in events] == ['feature', 'metadata']
+
+
+def test_decompressed_size_is_bounded():
+    bomb = gzip.compress(KML + b'<!--' + b' ' * 1_000_000 + b'-->')
+    assert len(bomb) < 10_000
+    stream = compression.decompress_source(bomb, max_size=100_000)
+    with pytest.raises(compression.DecompressionError):
+        while stream.read(64 * 1024):
+            pass
+
+    result = KMLParser.parse_kml_coordinates(gzip.compress(b'<kml>' + b'x' * 10))
+    assert not result['success']
+    corrupted = KMLParser.parse_kml_coordinates(gzip.compress(KML)[:30])
+    assert not corrupted['success']
+
+
+def test_zstd_documents():
+    zstandard = pytest.importorskip('zstandard')
+    compressed = zstandard.ZstdCompressor().compress(GPX)
+    assert compression.detect_compression(compressed) == 'zstd'
+    assert len(GPXParser.parse_gpx_coordinates(compressed)['points']) == 2
+
+
+def test_upload_gzip_file(app, client):
+    clear_cache()
+    response = client.post('/api/upload', data={'file': (BytesIO(gzip.compress(GPX)), 'trace.gpx.gz')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert len(response.get_json()['points']) == 2
+
+    compression.configure(100)
+    try:
+        response = client.post('/api/upload', data={'file': (BytesIO(gzip.compress(KML)), 'big.kml.gz')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 400
+        assert 'trop volumineux' in response.get_json()['error']
+    finally:
+        compression.init_app(app)
@@ -0,0 +1,61 @@
+import re
+
+from app.services.kml_parser import DescriptionExtractor, KMLParser
+
+
+def reference_extract(description):
+    """Implémentation d'origine (une recherche par motif), pour comparaison."""
+    speed_kmh = speed_kts = heading = None
+    for pattern in [r'(?:vitesse|speed|spd)[\s:]*(\d+(?:\.\d+)?)\s*(?:km/h|kmh|kph)',
+                    r'(?:vitesse|speed|spd)[\s:]*(\d+(?:\.\d+)?)\s*(?:kt|kts|knots)',
+                    r'(\d+(?:\.\d+)?)\s*(?:km/h|kmh|kph)',
+                    r'(\d+(?:\.\d+)?)\s*(?:kt|kts|knots)']:
+        match = re.search(pattern, description, re.IGNORECASE)
+        if match:
+            value = float(match.group(1))
+            if 'kt' in pattern:
+                speed_kts, speed_kmh = value, round(value * 1.852, 1)
+            else:
+                speed_kmh, speed_kts = value, round(value / 1.852, 1)
+            break
+    for pattern in [r'(?:cap|heading|hdg|course)[\s:]*(\d+(?:\.\d+)?)\s*(?:°|deg|degrees?)?',
+                    r'(?:direction|dir)[\s:]*(\d+(?:\.\d+)?)\s*(?:°|deg|degrees?)?']:
+        match = re.search(pattern, description, re.IGNORECASE)
+        if match:
+            heading = float(match.group(1))
+            break
+    return speed_kmh, speed_kts, heading
+
+
+DESCRIPTIONS = [
+    'Vitesse: 120 km/h<br>Cap: 270°',
+    'Speed: 45.5 KTS, Heading 90 deg',
+    'spd 12 kph dir 15',
+    '12 kt puis 30 km/h',
+    'hdg 90 kt',
+    'Direction: 180 course 45',
+    'Altitude 1200 m, aucun autre champ',
+    '1.2.3 kmh',
+    'Vitesse 7 nœuds 8 knots — cap 12°',
+    'İstanbul speed 40 km/h heading 5',
+]
+
+
+def test_matches_reference_implementation():
+    extractor = DescriptionExtractor()
+    for description in DESCRIPTIONS:
+        assert extractor.extract(description) == reference_extract(description), description
+
+
+def test_template_memo_reads_values_of_each_description():
+    extractor = DescriptionExtractor()
+    for i in range(100, 200):
+        description = f'Speed: {i} km/h<br>Heading: {i + 50}°'
+        assert extractor.extract(description) == reference_extract(description)
+    assert len(extractor._plans) == 1
+
+
+def test_parse_gps_description_without_description():
+    parsed = KMLParser.parse_gps_description('', 45.0, 2.0, 1000.0)
+    assert parsed['speed_kmh'] is None
+    assert parsed['altitude_ft'] is None
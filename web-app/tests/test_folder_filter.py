@@ -0,0 +1,78 @@
+from io import BytesIO
+
+from app.services.cache_service import clear_cache, get_document
+from app.services.kml_folder_filter import FolderFilter
+from app.services.kml_parser import KMLParser
+
+KML = """<?xml version='1.0' encoding='UTF-8'?><kml xmlns='http://www.opengis.net/kml/2.2'><Document>
+<name>Doc</name>
+<Placemark><name>Racine</name><Point><coordinates>0,0,0</coordinates></Point></Placemark>
+<Folder><name>Points</name>
+  <Placemark><name>A</name><Point><coordinates>1,2,0</coordinates></Point></Placemark>
+  <Folder><name>Archives</name>
+    <Placemark><name>B</name><Point><coordinates>3,4,0</coordinates></Point></Placemark>
+  </Folder>
+</Folder>
+<Folder><Placemark><name>Sans nom</name><Point><coordinates>5,6,0</coordinates></Point></Placemark></Folder>
+<Folder><name>Traces</name>
+  <Placemark><name>T</name><LineString><coordinates>1,2,0 1.1,2.1,0</coordinates></LineString></Placemark>
+</Folder>
+</Document></kml>"""
+
+
+def names(result):
+    return sorted(f['name'] for f in result['features'])
+
+
+def test_from_strings():
+    assert FolderFilter.from_strings('', None) is None
+    folder_filter = FolderFilter.from_strings(' Points , traces', 'archives')
+    assert folder_filter.to_dict() == {'include': ['points', 'traces'], 'exclude': ['archives']}
+
+
+def test_include_and_exclude_folders():
+    included = KMLParser.parse(KML, folders=FolderFilter(include=['points']))
+    assert names(included) == ['A', 'B']
+    assert included['metadata']['folder_filter']['skipped_placemarks'] == 3
+
+    excluded = KMLParser.parse(KML, folders=FolderFilter(exclude=['Archives', 'traces']))
+    assert names(excluded) == ['A', 'Racine', 'Sans nom']
+
+    both = KMLParser.parse(KML, folders=FolderFilter(include=['points'], exclude=['archives']))
+    assert names(both) == ['A']
+    assert len(KMLParser.parse(KML)['features']) == 5
+
+
+def test_get_placemarks_points():
+    assert [p.find('{http://www.opengis.net/kml/2.2}name').text
+            for p in KMLParser.get_placemarks_points(KML, 'Archives')] == ['B']
+
+
+def test_folder_name_after_other_children():
+    kml = """<kml xmlns='http://www.opengis.net/kml/2.2'><Document>
+<Folder><visibility>1</visibility><Style id='s'/>
+  <Placemark><name>A</name><Point><coordinates>1,2,0</coordinates></Point></Placemark>
+  <Folder><Placemark><name>B</name><Point><coordinates>3,4,0</coordinates></Point></Placemark><name>Archives</name></Folder>
+  <name>Points</name>
+  <Placemark><name>C</name><Point><coordinates>5,6,0</coordinates></Point></Placemark>
+</Folder>
+<Folder><Placemark><name>D</name><Point><coordinates>7,8,0</coordinates></Point></Placemark></Folder>
+</Document></kml>"""
+    assert names(KMLParser.parse(kml, folders=FolderFilter(include=['points']))) == ['A', 'B', 'C']
+    assert names(KMLParser.parse(kml, folders=FolderFilter(exclude=['archives']))) == ['A', 'C', 'D']
+    assert [p.find('{http://www.opengis.net/kml/2.2}name').text
+            for p in KMLParser.get_placemarks_points(kml, 'Archives')] == ['B']
+
+
+def test_upload_with_folder_filter(client):
+    clear_cache()
+    full = client.post('/api/upload', data={'file': (BytesIO(KML.encode()), 'doc.kml')},
+                       content_type='multipart/form-data').get_json()
+    filtered = client.post('/api/upload', data={'file': (BytesIO(KML.encode()), 'doc.kml'),
+                                                'include_folders': 'Traces'},
+                           content_type='multipart/form-data').get_json()
+    assert len(full['features']) == 5
+    assert [f['name'] for f in filtered['features']] == ['T']
+    # La vue filtrée ne remplace pas le document complet
+    assert 'document_id' not in filtered
+    assert len(get_document(full['document_id'])['features']) == 5
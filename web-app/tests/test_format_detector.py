@@ -0,0 +1,102 @@
+import gzip
+import io
+import zipfile
+from io import BytesIO
+
+import pytest
+
+from app.services.cache_service import clear_cache
+from app.services.format_detector import detect_format, UnsupportedFormatError
+
+KML = b"""<?xml version='1.0' encoding='UTF-8'?>
+<!-- export --><kml xmlns='http://www.opengis.net/kml/2.2'><Document>
+<Placemark><Point><coordinates>1,2,0</coordinates></Point></Placemark></Document></kml>"""
+GPX = b"""<?xml version='1.0' encoding='UTF-8'?><gpx xmlns='http://www.topografix.com/GPX/1/1'>
+<trk><trkseg><trkpt lat='5' lon='0'><ele>0</ele></trkpt></trkseg></trk></gpx>"""
+
+
+def test_detect_format():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('doc.kml', KML)
+
+    assert detect_format(KML) == 'kml'
+    assert detect_format(KML.decode('utf-8')) == 'kml'
+    assert detect_format(GPX) == 'gpx'
+    assert detect_format(gzip.compress(GPX)) == 'gpx'
+    assert detect_format(buffer.getvalue()) == 'kmz'
+
+    stream = BytesIO(GPX)
+    assert detect_format(stream) == 'gpx'
+    assert stream.tell() == 0
+
+    for content in (b'', b'plain text', b'<html><body></body></html>', gzip.compress(b'{}')):
+        with pytest.raises(UnsupportedFormatError):
+            detect_format(content)
+
+
+def test_upload_dispatches_on_content(client):
+    clear_cache()
+    # Fichier GPX nommé .kml : traité par le parser GPX
+    response = client.post('/api/upload', data={'file': (BytesIO(GPX), 'misnamed.kml')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert len(response.get_json()['points']) == 1
+
+    response = client.post('/api/upload', data={'file': (BytesIO(b'<html></html>'), 'page.kml')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert 'non reconnu' in response.get_json()['error']
+
+    response = client.post('/api/multi-upload',
+                           data={'files': [(BytesIO(KML), 'a.gpx'), (BytesIO(b'oops'), 'b.kml')]},
+                           content_type='multipart/form-data')
+    files = response.get_json()['files']
+    assert files[0]['success'] and not files[1]['success']
+
+
+def test_detect_format_of_mapped_file(tmp_path):
+    from app.services.file_service import FileService
+
+    path = tmp_path / 'sample.dat'
+    path.write_bytes(GPX)
+    with FileService.map_file(path) as content:
+        assert detect_format(content) == 'gpx'
+        assert content.tell() == 0
+
+
+def test_load_sample_detects_mapped_file(app, client, tmp_path):
+    clear_cache()
+    (tmp_path / 'trace.gpx').write_bytes(GPX)
+    (tmp_path / 'trace.kml').write_bytes(KML)
+    app.config['SAMPLE_FILES_DIR'] = str(tmp_path)
+
+    response = client.get('/api/load-sample/trace.gpx')
+    assert response.status_code == 200
+    assert len(response.get_json()['points']) == 1
+    response = client.get('/api/load-sample/trace.kml')
+    assert response.status_code == 200
+    assert response.get_json()['success']
+
+
+def test_detect_format_after_long_prolog(tmp_path):
+    from app.services.file_service import FileService
+
+    prolog = b"<?xml version='1.0' encoding='UTF-8'?>\n" + b'<!-- ' + b'export ' * 2000 + b'-->\n'
+    kml = prolog + KML.split(b'?>', 1)[1]
+    assert len(prolog) > 4096
+    assert detect_format(kml) == 'kml'
+    assert detect_format(kml.decode('utf-8')) == 'kml'
+    assert detect_format(gzip.compress(kml)) == 'kml'
+
+    stream = BytesIO(kml)
+    assert detect_format(stream) == 'kml'
+    assert stream.tell() == 0
+
+    path = tmp_path / 'long.kml'
+    path.write_bytes(kml)
+    with FileService.map_file(path) as content:
+        assert detect_format(content) == 'kml'
+
+    with pytest.raises(UnsupportedFormatError):
+        detect_format(prolog + b'x' * 10_000)
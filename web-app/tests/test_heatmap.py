@@ -0,0 +1,40 @@
+from app.services.cache_service import parse_gpx_cached, clear_cache
+from app.services.heatmap_service import DensityGrid, density_grid
+
+GPX = """<?xml version='1.0' encoding='UTF-8'?><gpx xmlns='http://www.topografix.com/GPX/1/1'>
+<trk><name>T</name><trkseg>
+<trkpt lat='45.0' lon='5.0'><ele>0</ele></trkpt>
+<trkpt lat='45.0' lon='5.1'><ele>0</ele></trkpt>
+</trkseg></trk></gpx>"""
+
+
+def test_density_grid_rasterizes_segments():
+    grid = DensityGrid(cell_size=0.01)
+    features = [{'type': 'polyline', 'coordinates': [[45.0, 5.0, 0], [45.0, 5.1, 0]]}]
+
+    assert grid.add_document('doc', features) is True
+    assert grid.add_document('doc', features) is False
+
+    result = grid.grid(width=10, height=1)
+    # Le segment traverse toutes les colonnes de la grille
+    assert all(value > 0 for value in result['grid'][0])
+    assert grid.document_count == 1
+
+
+def test_parse_feeds_heatmap_and_endpoints(client):
+    clear_cache()
+    density_grid.clear()
+    parse_gpx_cached(GPX)
+
+    response = client.get('/api/heatmap?width=16&height=4')
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data['documents'] == 1
+    assert data['max'] > 0
+    assert len(data['grid']) == 4 and len(data['grid'][0]) == 16
+
+    tile = client.get('/api/heatmap/tiles/0/0/0.png')
+    assert tile.status_code == 200
+    assert tile.data.startswith(b'\x89PNG')
+
+    assert client.get('/api/heatmap?bbox=1,2,3').status_code == 400
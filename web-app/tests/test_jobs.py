@@ -0,0 +1,93 @@
+import time
+from io import BytesIO
+
+from app.services.cache_service import clear_cache
+from app.services.job_service import JobManager, Job
+from app.services.progress import ProgressTracker
+from app.services.trajectory_analyzer import TrajectoryAnalyzer
+
+GPX = """<?xml version='1.0' encoding='UTF-8'?><gpx xmlns='http://www.topografix.com/GPX/1/1'>
+<trk><trkseg><trkpt lat='5' lon='0'><ele>0</ele></trkpt><trkpt lat='5' lon='0.1'><ele>0</ele></trkpt>
+</trkseg></trk></gpx>"""
+
+
+def _wait_for(client, job_id):
+    for _ in range(200):
+        data = client.get(f'/api/jobs/{job_id}').get_json()
+        if data['status'] in ('done', 'failed'):
+            return data
+        time.sleep(0.01)
+    raise AssertionError('job non terminé')
+
+
+def test_large_upload_becomes_background_job(app, client):
+    clear_cache()
+    app.config['ASYNC_UPLOAD_THRESHOLD'] = 10
+    response = client.post('/api/analysis/upload-and-analyze',
+                           data={'file': (BytesIO(GPX.encode('utf-8')), 'big.gpx')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 202
+    job_id = response.get_json()['job_id']
+    assert response.headers['Location'].endswith(f'/api/jobs/{job_id}')
+
+    data = _wait_for(client, job_id)
+    assert data['status'] == 'done'
+    assert data['progress']['stage'] == 'done'
+    assert data['result']['analysis']['distance']['total_distance_km'] > 0
+
+    progress = client.get(f'/api/jobs/{job_id}/progress').get_json()
+    assert 'result' not in progress
+
+
+def test_job_results_expire():
+    manager = JobManager(max_workers=1, max_pending=0, result_ttl=0)
+    job = manager.submit('test', lambda progress: {'ok': True})
+    for _ in range(200):
+        if job.finished:
+            break
+        time.sleep(0.01)
+    assert job.status == Job.DONE
+    time.sleep(0.01)
+    assert manager.get(job.id) is None
+
+
+def test_unknown_job(client):
+    assert client.get('/api/jobs/inexistant').status_code == 404
+
+
+def test_async_upload_streams_progress_events(client):
+    clear_cache()
+    kml = ("<?xml version='1.0' encoding='UTF-8'?><kml xmlns='http://www.opengis.net/kml/2.2'><Document>"
+           + "".join(f"<Placemark><Point><coordinates>{i},1,0</coordinates></Point></Placemark>" for i in range(5))
+           + "</Document></kml>")
+    response = client.post('/api/upload', data={'file': (BytesIO(kml.encode('utf-8')), 'a.kml'), 'async': '1'},
+                           content_type='multipart/form-data')
+    assert response.status_code == 202
+    events_url = response.get_json()['events_url']
+
+    stream = client.get(events_url)
+    assert stream.mimetype == 'text/event-stream'
+    body = stream.get_data(as_text=True)
+    assert body.rstrip().split('\n\n')[-1].startswith('event: done')
+
+    data = _wait_for(client, response.get_json()['job_id'])
+    assert data['result']['total_points'] == 5
+    assert data['progress']['bytes_consumed'] == data['progress']['bytes_total'] == len(kml)
+
+
+def test_advanced_analysis_runs_as_job(client):
+    features = [{'type': 'polyline', 'coordinates': [[45.0, 5.0, 100.0], [45.01, 5.0, 120.0], [45.02, 5.01, 110.0]]}]
+    response = client.post('/api/analysis/advanced', json={'features': features, 'points': [], 'async': True})
+    assert response.status_code == 202
+
+    data = _wait_for(client, response.get_json()['job_id'])
+    assert data['status'] == 'done'
+    assert data['progress']['stage'] == 'done'
+    assert data['result']['analysis']['terrain']
+
+
+def test_trajectory_distance_progress_counts_polylines():
+    features = [{'type': 'polyline', 'coordinates': [[45.0, 5.0 + i, 0], [45.01, 5.0 + i, 0]]} for i in range(3)]
+    progress = ProgressTracker()
+    TrajectoryAnalyzer.analyze_trajectory(features, progress)
+    assert (progress.stage, progress.current, progress.total) == ('distance', 3, 3)
@@ -0,0 +1,92 @@
+import io
+import zipfile
+from io import BytesIO
+
+import pytest
+
+from app.services import cache_service, compression
+from app.services.cache_service import clear_cache
+from app.services.kml_parser import KMLParser
+from app.services.kmz_reader import KMZArchive
+
+KML = """<?xml version='1.0' encoding='UTF-8'?><kml xmlns='http://www.opengis.net/kml/2.2'><Document>
+<Style id='s'><IconStyle><Icon><href>files/icon.png</href></Icon></IconStyle></Style>
+<Placemark><name>A</name><Point><coordinates>1,2,0</coordinates></Point></Placemark>
+<Placemark><name>B</name><LineString><coordinates>1,2,0 1.1,2.1,0</coordinates></LineString></Placemark>
+</Document></kml>"""
+
+
+def make_kmz(main_name='doc.kml'):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(main_name, KML)
+        archive.writestr('files/icon.png', b'\x89PNG fake')
+    return buffer.getvalue()
+
+
+def test_parse_kmz_coordinates():
+    result = KMLParser.parse_kmz_coordinates(make_kmz('trace.kml'))
+    assert result['success']
+    assert result['total_points'] == 1
+    assert [f['type'] for f in result['features']] == ['marker', 'polyline']
+
+    invalid = KMLParser.parse_kmz_coordinates(b'not a zip')
+    assert not invalid['success']
+
+
+def test_upload_kmz_and_read_resources(client):
+    clear_cache()
+    response = client.post('/api/upload', data={'file': (BytesIO(make_kmz()), 'trace.kmz')},
+                           content_type='multipart/form-data')
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data['total_points'] == 1
+
+    listing = client.get(f"/api/documents/{data['document_id']}/resources").get_json()
+    assert listing['document'] == 'doc.kml'
+    assert [r['name'] for r in listing['resources']] == ['files/icon.png']
+
+    resource = client.get(f"/api/documents/{data['document_id']}/resources/files/icon.png")
+    assert resource.mimetype == 'image/png'
+    assert resource.data == b'\x89PNG fake'
+    assert client.get(f"/api/documents/{data['document_id']}/resources/missing.png").status_code == 404
+
+
+def test_archives_are_capped(monkeypatch):
+    clear_cache()
+    monkeypatch.setattr(cache_service, 'MAX_ARCHIVE_BYTES', 3)
+    for name in ('a', 'b', 'c'):
+        cache_service._keep_archive(name, b'xx')
+    assert list(cache_service._archives) == ['c']
+    assert cache_service.store_size_bytes() == 2
+    assert cache_service.get_document_archive('a') is None
+    clear_cache()
+    assert cache_service.store_size_bytes() == 0
+
+
+def test_oversized_entries_are_rejected(client):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('doc.kml', KML.replace('<Document>', '<Document><!--' + ' ' * 1_000_000 + '-->'))
+        archive.writestr('files/bomb.png', b'\0' * 1_000_000)
+    bomb = buffer.getvalue()
+    assert len(bomb) < 10_000
+
+    with KMZArchive(bomb, max_size=100_000) as archive:
+        with pytest.raises(compression.DecompressionError):
+            archive.open_document()
+        with pytest.raises(compression.DecompressionError):
+            archive.read_resource('files/bomb.png')
+    with KMZArchive(bomb, max_size=2_000_000) as archive:
+        assert len(archive.read_resource('files/bomb.png')) == 1_000_000
+
+    compression.configure(100_000)
+    try:
+        assert not KMLParser.parse_kmz_coordinates(bomb)['success']
+        clear_cache()
+        cache_service._keep_archive('bomb', bomb)
+        response = client.get('/api/documents/bomb/resources/files/bomb.png')
+        assert response.status_code == 413
+    finally:
+        compression.configure(compression.DEFAULT_MAX_DECOMPRESSED_SIZE)
+        clear_cache()
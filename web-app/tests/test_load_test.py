@@ -0,0 +1,30 @@
+import json
+
+from benchmarks import load_test
+
+
+def test_parse_mix():
+    assert load_test.parse_mix('1k:6,10k:3,500') == [(1000, 6.0), (10000, 3.0), (500, 1.0)]
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert load_test._percentile(values, 0.5) == 50.0
+    assert load_test._percentile(values, 0.99) == 99.0
+    assert load_test._percentile([3.0], 0.95) == 3.0
+
+
+def test_in_process_sessions(tmp_path, capsys):
+    output = tmp_path / 'report.json'
+    load_test.main(['--sessions', '3', '--concurrency', '2', '--mix', '150', '--output', str(output),
+                    '--rss-interval', '0.05'])
+    report = json.loads(output.read_text())
+
+    assert report['summary']['sessions'] == 3
+    assert report['summary']['errors'] == 0
+    assert set(report['steps']) == set(load_test.STEPS)
+    for step in report['steps'].values():
+        assert step['count'] == 3
+        assert step['p50_ms'] <= step['p99_ms'] <= step['max_ms']
+    assert report['rss_peak_bytes'] > 0
+    assert 'req/s' in capsys.readouterr().err
@@ -0,0 +1,75 @@
+import logging
+from io import BytesIO
+
+import pytest
+
+from app import create_app
+from app.config import TestingConfig
+from app.services import memory_tracker
+from app.services.timing_tools import reset_stats, track_time
+
+KML = b"""<?xml version='1.0' encoding='UTF-8'?><kml xmlns='http://www.opengis.net/kml/2.2'><Document>
+<Placemark><name>T</name><LineString><coordinates>1,2,0 1.1,2.1,0 1.2,2.2,0</coordinates></LineString></Placemark>
+</Document></kml>"""
+
+
+class MemoryConfig(TestingConfig):
+    MEMORY_TRACKING = True
+    MEMORY_ALERT_MB = 1
+
+
+@pytest.fixture
+def tracking():
+    memory_tracker.configure(True, threshold=1024 ** 2)
+    memory_tracker.reset_stats()
+    yield
+    memory_tracker.configure(False)
+    memory_tracker.reset_stats()
+
+
+@track_time
+def allocate_inner(size):
+    block = bytearray(size)
+    return len(block)
+
+
+@track_time
+def allocate_outer(size):
+    before = bytearray(size)
+    total = allocate_inner(size * 2)
+    return total + len(before)
+
+
+def test_nested_stage_peaks(tracking):
+    allocate_outer(200_000)
+    stats = memory_tracker.get_stats()
+    inner = stats[f'{__name__}.allocate_inner']['peak_memory_max_bytes']
+    outer = stats[f'{__name__}.allocate_outer']['peak_memory_max_bytes']
+    assert 400_000 <= inner < 500_000
+    # Le pic de l'étape englobante inclut celui de la sous-étape
+    assert outer >= 600_000
+    assert stats[f'{__name__}.allocate_outer']['memory_samples'] == 1
+
+
+def test_threshold_dumps_allocation_sites(tracking, caplog):
+    with caplog.at_level(logging.WARNING, logger='app.services.memory_tracker'):
+        allocate_outer(1024 ** 2)
+    dumps = [record for record in caplog.records if 'memory_threshold' in record.getMessage()]
+    # Un seul relevé par étape racine, même si plusieurs étapes dépassent le seuil
+    assert len(dumps) == 1
+    assert 'top_allocations' in dumps[0].getMessage()
+
+
+def test_request_peaks_in_stats():
+    client = create_app(MemoryConfig).test_client()
+    try:
+        reset_stats()
+        client.delete('/api/stats')
+        client.post('/api/analysis/upload-and-analyze', data={'file': (BytesIO(KML), 'a.kml')},
+                    content_type='multipart/form-data')
+        stats = client.get('/api/stats').get_json()
+        assert stats['app.api.analysis_routes.upload_and_analyze']['peak_memory_max_bytes'] > 0
+        assert stats['POST /api/analysis/upload-and-analyze']['memory_samples'] == 1
+    finally:
+        memory_tracker.configure(False)
+        memory_tracker.reset_stats()
@@ -0,0 +1,86 @@
+import json
+import os
+from io import BytesIO
+
+from app.services import metrics
+from app.services.cache_service import clear_cache
+
+KML = b"""<?xml version='1.0' encoding='UTF-8'?><kml xmlns='http://www.opengis.net/kml/2.2'><Document>
+<Placemark><name>A</name><Point><coordinates>1,2,0</coordinates></Point></Placemark>
+</Document></kml>"""
+
+
+def sample_value(text, line_prefix):
+    for line in text.splitlines():
+        if line.startswith(line_prefix + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+def test_size_bucket():
+    assert metrics.size_bucket(10) == 'lt_1mb'
+    assert metrics.size_bucket(5 * 1024 ** 2) == '1mb_10mb'
+    assert metrics.size_bucket(200 * 1024 ** 2) == 'ge_100mb'
+    assert metrics.size_bucket(None) == 'unknown'
+
+
+def test_metrics_endpoint_exposes_requests_parses_and_cache(client):
+    clear_cache()
+    metrics.registry.reset()
+    for _ in range(2):
+        client.post('/api/upload', data={'file': (BytesIO(KML), 'a.kml')}, content_type='multipart/form-data')
+
+    response = client.get('/metrics')
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    text = response.get_data(as_text=True)
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    assert sample_value(text, 'http_request_duration_seconds_count'
+                              '{method="POST",route="/api/upload",status="200"}') == 2
+    assert sample_value(text, 'http_request_duration_seconds_bucket'
+                              '{method="POST",route="/api/upload",status="200",le="+Inf"}') == 2
+    assert sample_value(text, 'document_parse_duration_seconds_count{format="kml",size="lt_1mb"}') == 1
+    assert sample_value(text, 'parse_cache_misses_total') == 1
+    assert sample_value(text, 'parse_cache_hits_total') == 1
+    assert sample_value(text, 'parse_cache_entries') == 1
+    assert sample_value(text, 'document_store_bytes') > 0
+    assert sample_value(text, 'worker_pool_queue_depth') == 0
+
+
+def test_multi_upload_counts_each_cache_lookup_once(client):
+    clear_cache()
+    metrics.registry.reset()
+    for _ in range(2):
+        client.post('/api/multi-upload', data={'files': [(BytesIO(KML), 'a.kml')]},
+                    content_type='multipart/form-data')
+
+    text = client.get('/metrics').get_data(as_text=True)
+    assert sample_value(text, 'parse_cache_misses_total') == 1
+    assert sample_value(text, 'parse_cache_hits_total') == 1
+
+
+def test_metrics_are_merged_across_processes(tmp_path):
+    metrics.registry.reset()
+    metrics.configure(str(tmp_path))
+    try:
+        metrics.CACHE_HITS.inc(3)
+        metrics.PARSE_DURATION.observe(0.2, format='gpx', size='lt_1mb')
+        # Un processus vivant (le parent) et un processus terminé
+        for pid, depth in ((os.getppid(), 4), (2 ** 22 + 12345, 7)):
+            snapshot = {
+                'parse_cache_hits_total': [[[], 2]],
+                'document_parse_duration_seconds': [[['gpx', 'lt_1mb'], [0] * 6 + [1] + [0] * 7 + [0.4, 1]]],
+                'worker_pool_queue_depth': [[[], depth]],
+            }
+            (tmp_path / f'metrics_{pid}.json').write_text(json.dumps({'pid': pid, 'metrics': snapshot}))
+
+        text = metrics.registry.render()
+        assert sample_value(text, 'parse_cache_hits_total') == 7
+        assert sample_value(text, 'document_parse_duration_seconds_count{format="gpx",size="lt_1mb"}') == 3
+        assert sample_value(text, 'document_parse_duration_seconds_sum{format="gpx",size="lt_1mb"}') == 1.0
+        # Jauges : celles du processus terminé sont ignorées
+        assert sample_value(text, 'worker_pool_queue_depth') == 4
+
+        metrics.registry.flush()
+        assert (tmp_path / f'metrics_{os.getpid()}.json').exists()
+    finally:
+        metrics.configure(None)
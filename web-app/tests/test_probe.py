@@ -0,0 +1,49 @@
+import gzip
+from io import BytesIO
+
+from app.services.document_probe import probe_document
+
+KML = b"""<?xml version='1.0' encoding='UTF-8'?>
+<kml xmlns='http://www.opengis.net/kml/2.2' xmlns:gx='http://www.google.com/kml/ext/2.2'><Document>
+<Placemark><description>Vitesse: 12 km/h</description><TimeStamp><when>2021-06-01T10:00:00Z</when></TimeStamp>
+<Point><coordinates>2.0,48.0,10</coordinates></Point></Placemark>
+<Placemark><LineString><coordinates>2.0,48.0,0 2.5,48.5,0
+ 3.0,49.0,0</coordinates></LineString></Placemark>
+<Placemark><gx:Track><when>2021-06-01T09:00:00Z</when><when>2021-06-01T11:00:00Z</when>
+<gx:coord>1.5 47.5 0</gx:coord><gx:coord>1.6 47.6 0</gx:coord></gx:Track></Placemark>
+</Document></kml>"""
+GPX = b"""<?xml version='1.0' encoding='UTF-8'?><gpx xmlns='http://www.topografix.com/GPX/1/1'>
+<wpt lat='10' lon='20'/><trk><trkseg>
+<trkpt lat='5' lon='0'><time>2020-01-01T00:00:00Z</time></trkpt>
+<trkpt lat='6' lon='1'><time>2020-01-01T01:00:00Z</time></trkpt></trkseg></trk></gpx>"""
+
+
+def test_probe_kml():
+    result = probe_document(KML)
+    assert result['format'] == 'kml'
+    assert result['counts'] == {'placemarks': 3, 'Point': 1, 'LineString': 1, 'Track': 1}
+    assert result['total_points'] == 6
+    assert result['bbox'] == [1.5, 47.5, 3.0, 49.0]
+    assert result['time_span'] == {'start': '2021-06-01T09:00:00Z', 'end': '2021-06-01T11:00:00Z'}
+    assert result['estimated_parse_seconds'] >= 0
+
+
+def test_probe_gpx_compressed():
+    result = probe_document(gzip.compress(GPX))
+    assert result['format'] == 'gpx'
+    assert result['counts']['waypoints'] == 1
+    assert result['counts']['track_points'] == 2
+    assert result['bbox'] == [0.0, 5.0, 20.0, 10.0]
+    assert result['time_span']['end'] == '2020-01-01T01:00:00Z'
+
+
+def test_probe_endpoint(client):
+    response = client.post('/api/probe', data={'file': (BytesIO(GPX), 'trace.gpx')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert response.get_json()['total_points'] == 3
+
+    response = client.post('/api/probe', data={'file': (BytesIO(b'<kml><Placemark>'), 'bad.kml')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert client.post('/api/probe?sample=absent.kml').status_code == 404
@@ -0,0 +1,67 @@
+from io import BytesIO
+
+import pytest
+
+from app import create_app
+from app.config import TestingConfig
+from app.services.profiling import profile_store
+
+KML = b"""<?xml version='1.0' encoding='UTF-8'?><kml xmlns='http://www.opengis.net/kml/2.2'><Document>
+<Placemark><name>A</name><Point><coordinates>1,2,100</coordinates></Point></Placemark>
+<Placemark><name>T</name><LineString><coordinates>1,2,0 1.1,2.1,0 1.2,2.2,0</coordinates></LineString></Placemark>
+</Document></kml>"""
+
+
+class ProfilingConfig(TestingConfig):
+    PROFILING_TOKEN = 'secret'
+    PROFILE_HISTORY = 2
+
+
+@pytest.fixture
+def profiling_client():
+    app = create_app(ProfilingConfig)
+    profile_store.clear()
+    yield app.test_client()
+    profile_store.configure(None, 20)
+
+
+def analyze(client, profile, token='secret'):
+    return client.post(f'/api/analysis/upload-and-analyze?profile={profile}',
+                       data={'file': (BytesIO(KML), 'a.kml')}, content_type='multipart/form-data',
+                       headers={'X-Profile-Token': token})
+
+
+def test_cprofile_request(profiling_client):
+    response = analyze(profiling_client, 'cprofile')
+    profile_id = response.headers['X-Profile-Id']
+
+    raw = profiling_client.get(f'/api/profiles/{profile_id}', headers={'X-Profile-Token': 'secret'})
+    assert raw.mimetype == 'application/octet-stream'
+    assert f'profile-{profile_id}.pstats' in raw.headers['Content-Disposition']
+
+    text = profiling_client.get(f'/api/profiles/{profile_id}?format=text',
+                                headers={'X-Profile-Token': 'secret'}).get_data(as_text=True)
+    assert 'upload_and_analyze' in text
+
+
+def test_sampler_and_ring_buffer(profiling_client):
+    ids = [analyze(profiling_client, 'sample').headers['X-Profile-Id'] for _ in range(3)]
+    listing = profiling_client.get('/api/profiles', headers={'X-Profile-Token': 'secret'}).get_json()
+    assert [p['profile_id'] for p in listing['profiles']] == ids[:0:-1]
+    assert listing['profiles'][0]['kind'] == 'sample'
+    assert profiling_client.get(f'/api/profiles/{ids[0]}',
+                                headers={'X-Profile-Token': 'secret'}).status_code == 404
+
+
+def test_profiling_requires_token(profiling_client, client):
+    assert 'X-Profile-Id' not in analyze(profiling_client, 'cprofile', token='wrong').headers
+    assert profiling_client.get('/api/profiles', headers={'X-Profile-Token': 'wrong'}).status_code == 403
+    # Sans jeton configuré, le profilage est désactivé
+    profile_store.configure(None, 20)
+    assert client.get('/api/profiles').status_code == 404
+
+
+def test_non_ascii_token_is_refused(profiling_client):
+    assert profiling_client.get('/api/profiles', headers={'X-Profile-Token': 'sécret'}).status_code == 403
+    assert 'X-Profile-Id' not in analyze(profiling_client, 'cprofile', token='jéton').headers
+    assert not profile_store.authorized('sécret')
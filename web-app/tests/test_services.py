@@ -83,4 +83,20 @@ def test_parse_kml_coordinates_empty():
     assert result['success'] is True
     assert result['features'] == []
     assert result['points'] == []
-    assert result['total_points'] == 0
\ No newline at end of file
+    assert result['total_points'] == 0
+
+
+def test_parse_kml_coordinates_latin1_bytes_and_file():
+    """Test du parsing d'un KML en octets avec déclaration Latin-1."""
+    from io import BytesIO
+
+    kml = """<?xml version="1.0" encoding="ISO-8859-1"?>
+    <kml xmlns="http://www.opengis.net/kml/2.2"><Document><name>Randonnée</name>
+        <Placemark><name>Départ</name><Point><coordinates>2.35,48.85,35</coordinates></Point></Placemark>
+    </Document></kml>""".encode('latin-1')
+
+    for source in (kml, BytesIO(kml)):
+        result = KMLParser.parse_kml_coordinates(source)
+        assert result['success'] is True
+        assert result['metadata']['title'] == 'Randonnée'
+        assert result['features'][0]['name'] == 'Départ'
@@ -0,0 +1,78 @@
+import threading
+
+import numpy as np
+
+from app.services import timing_tools
+from app.services.timing_tools import _buckets, get_stats, reset_stats, track_time
+
+
+def test_histogram_buckets_bound_relative_error():
+    values = np.array([0, 1, 31, 32, 1000, 123456, 10 ** 9 + 7], dtype=np.int64)
+    for value, lower in zip(values.tolist(), _buckets(values).tolist()):
+        assert lower <= value
+        assert value - lower <= max(1, value // 16)
+
+
+def test_counts_are_exact_across_threads():
+    @track_time
+    def timing_threaded_helper():
+        return 1
+
+    reset_stats()
+
+    def worker():
+        for _ in range(2000):
+            timing_threaded_helper()
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = get_stats()[f'{__name__}.{timing_threaded_helper.__qualname__}']
+    assert stats['call_count'] == stats['sampled_calls'] == 8000
+    assert stats['p50_ms'] <= stats['p95_ms'] <= stats['p99_ms'] <= stats['max_ms']
+
+
+def test_sampling_extrapolates_totals():
+    @track_time(sample_rate=10)
+    def timing_sampled_helper(x):
+        return x * 2
+
+    assert [timing_sampled_helper(i) for i in range(100)][-1] == 198
+    stats = get_stats()[f'{__name__}.{timing_sampled_helper.__qualname__}']
+    assert stats['sampled_calls'] == 10
+    assert 91 <= stats['call_count'] <= 100
+
+
+def test_disabled_returns_original_function(monkeypatch):
+    monkeypatch.setattr(timing_tools, 'TIMING_ENABLED', False)
+
+    def plain():
+        return 42
+
+    assert track_time(plain) is plain
+    assert track_time(sample_rate=5)(plain) is plain
+
+
+def test_stats_endpoint(client):
+    client.get('/api/health')
+    reset_stats()
+    client.post('/api/upload')
+    data = client.get('/api/stats').get_json()
+    assert data['app.api.routes.upload_file']['call_count'] == 1
+    assert {'p50_ms', 'p95_ms', 'p99_ms', 'total_time', 'average_time'} <= set(data['app.api.routes.upload_file'])
+    assert client.delete('/api/stats').get_json()['success']
+    assert 'app.api.routes.upload_file' not in client.get('/api/stats').get_json()
+
+
+def test_homonymous_functions_are_kept_apart(client):
+    from app.services.trajectory_analyzer import TrajectoryAnalyzer
+
+    reset_stats()
+    TrajectoryAnalyzer.analyze_terrain([[45.0, 5.0, 100.0], [45.001, 5.0, 110.0], [45.002, 5.0, 120.0]])
+    client.post('/api/analysis/terrain', json={})
+    data = get_stats()
+    assert data['app.services.trajectory_analyzer.TrajectoryAnalyzer.analyze_terrain']['call_count'] == 1
+    assert data['app.api.analysis_routes.analyze_terrain']['call_count'] == 1
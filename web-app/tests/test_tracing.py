@@ -0,0 +1,66 @@
+import json
+import logging
+from io import BytesIO
+
+from app.services import tracing
+from app.services.timing_tools import track_time
+
+KML = b"""<?xml version='1.0' encoding='UTF-8'?><kml xmlns='http://www.opengis.net/kml/2.2'><Document>
+<Placemark><name>A</name><Point><coordinates>1,2,100</coordinates></Point></Placemark>
+<Placemark><name>B</name><Point><coordinates>1.01,2.01,120</coordinates></Point></Placemark>
+</Document></kml>"""
+
+
+def upload(client, **headers):
+    return client.post('/api/analysis/upload-and-analyze', data={'file': (BytesIO(KML), 'a.kml')},
+                       content_type='multipart/form-data', headers=headers)
+
+
+def test_span_tree_merges_repeated_calls():
+    @track_time
+    def tracing_leaf():
+        return 1
+
+    @track_time
+    def tracing_branch():
+        return sum(tracing_leaf() for _ in range(3))
+
+    state = tracing.tracer.start()
+    tracing_branch()
+    with tracing.span('block'):
+        tracing_leaf()
+    root = tracing.tracer.finish(state, 'GET', '/', 200)
+
+    tree = root.to_dict()
+    branch, block = tree['children']
+    assert (branch['name'], branch['count']) == ('tracing_branch', 1)
+    assert branch['children'][0]['name'] == 'tracing_leaf' and branch['children'][0]['count'] == 3
+    assert block['children'][0]['count'] == 1
+    assert tracing.current_span.get() is None
+    assert 'total;dur=' in tracing.server_timing(root)
+
+
+def test_server_timing_header_on_traced_request(client, app):
+    tracing.tracer.sample_rate = 0
+    assert 'Server-Timing' not in upload(client).headers
+
+    header = upload(client, **{'X-Trace': '1'}).headers['Server-Timing']
+    names = [part.split(';')[0] for part in header.split(', ')]
+    assert names[0] == 'total'
+    assert 'total.upload_and_analyze' in names
+    assert 'total.upload_and_analyze.read_upload' in names
+    assert 'total.upload_and_analyze.jsonify' in names
+    assert any(name.endswith('analyze_trajectory') for name in names)
+
+
+def test_slow_request_logs_tree(client, caplog):
+    tracing.tracer.slow_request_ms = 0
+    try:
+        with caplog.at_level(logging.WARNING, logger='app.services.tracing'):
+            upload(client, **{'X-Trace': '1'})
+    finally:
+        tracing.tracer.slow_request_ms = None
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record['event'] == 'slow_request'
+    assert record['path'] == '/api/analysis/upload-and-analyze'
+    assert record['trace']['children'][0]['name'] == 'upload_and_analyze'
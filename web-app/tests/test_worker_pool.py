@@ -0,0 +1,117 @@
+import os
+from io import BytesIO
+
+import pytest
+
+from app.config import default_worker_pool_size
+from app.services import worker_pool
+from app.services.cache_service import clear_cache
+
+GPX = """<?xml version='1.0' encoding='UTF-8'?><gpx xmlns='http://www.topografix.com/GPX/1/1'>
+<trk><trkseg><trkpt lat='{lat}' lon='0'><ele>0</ele></trkpt></trkseg></trk></gpx>"""
+
+
+@pytest.fixture
+def process_pool():
+    worker_pool.configure(2, warmup=True)
+    yield worker_pool.get_pool()
+    worker_pool.shutdown()
+
+
+def test_multi_upload_with_process_pool(client, process_pool):
+    """Les fichiers sont parsés dans le pool et restitués dans l'ordre."""
+    clear_cache()
+    data = {
+        'files': [
+            (BytesIO(GPX.format(lat=1).encode('utf-8')), 'a.gpx'),
+            (BytesIO(b'<kml><unclosed>'), 'broken.kml'),
+            (BytesIO(GPX.format(lat=2).encode('utf-8')), 'c.gpx'),
+        ]
+    }
+
+    response = client.post('/api/multi-upload', data=data, content_type='multipart/form-data')
+    files = response.get_json()['files']
+
+    assert [f['filename'] for f in files] == ['a.gpx', 'broken.kml', 'c.gpx']
+    assert [f['success'] for f in files] == [True, False, True]
+    assert files[2]['points'][0]['coordinates'] == [2.0, 0.0]
+
+
+def _read_ndjson(response):
+    import json
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line]
+
+
+def test_batch_analysis_streams_ndjson(client, process_pool):
+    """Le lot mélange identifiants de documents et fichiers, une ligne par document."""
+    clear_cache()
+    upload = client.post('/api/upload', data={'file': (BytesIO(GPX.format(lat=3).encode('utf-8')), 'x.gpx')},
+                         content_type='multipart/form-data')
+    document_id = upload.get_json()['document_id']
+
+    response = client.post('/api/analysis/batch', json={
+        'document_ids': [document_id, 'inconnu'],
+        'analyses': ['trajectory', 'advanced'],
+    })
+    assert response.mimetype == 'application/x-ndjson'
+    lines = sorted(_read_ndjson(response), key=lambda line: line['index'])
+    assert lines[0]['success'] is True
+    assert set(lines[0]['analyses']) == {'trajectory', 'advanced'}
+    assert lines[1] == {'index': 1, 'document_id': 'inconnu', 'success': False, 'error': 'Document inconnu'}
+
+    response = client.post('/api/analysis/batch', data={
+        'files': [(BytesIO(GPX.format(lat=4).encode('utf-8')), 'y.gpx')],
+        'analyses': 'trajectory',
+    }, content_type='multipart/form-data')
+    lines = _read_ndjson(response)
+    assert lines[0]['filename'] == 'y.gpx'
+    assert lines[0]['analyses']['trajectory']['basic_stats']['total_points'] == 1
+
+
+def test_batch_analysis_rejects_unknown_analysis(client):
+    response = client.post('/api/analysis/batch', json={'document_ids': ['a'], 'analyses': ['magie']})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('payload', [
+    {'document_ids': ['a'], 'analyses': 'trajectory'},
+    {'document_ids': ['a'], 'analyses': [{'name': 'trajectory'}]},
+    {'document_ids': 'a', 'analyses': ['trajectory']},
+    {'document_ids': [1], 'analyses': ['trajectory']},
+])
+def test_batch_analysis_rejects_malformed_lists(client, payload):
+    response = client.post('/api/analysis/batch', json=payload)
+    assert response.status_code == 400
+    assert not response.get_json()['success']
+
+
+def test_multi_upload_shares_one_deadline(client, app, monkeypatch):
+    """Le délai couvre toute la requête, pas chaque fichier l'un après l'autre."""
+    import time
+    from concurrent.futures import Future
+
+    clear_cache()
+    app.config['WORKER_TASK_TIMEOUT'] = 0.3
+    monkeypatch.setattr(worker_pool, 'get_pool', lambda: object())
+    futures = []
+    monkeypatch.setattr(worker_pool, 'submit', lambda *args, **kwargs: futures.append(Future()) or futures[-1])
+    data = {'files': [(BytesIO(GPX.format(lat=i).encode('utf-8')), f'{i}.gpx') for i in range(4)]}
+
+    start = time.monotonic()
+    response = client.post('/api/multi-upload', data=data, content_type='multipart/form-data')
+    elapsed = time.monotonic() - start
+
+    assert [f['error'] for f in response.get_json()['files']] == ['Délai de traitement dépassé'] * 4
+    assert elapsed < 4 * 0.3
+    # Les tâches encore en file sont annulées dès le premier dépassement
+    assert all(future.cancelled() for future in futures)
+
+
+def test_default_pool_size_shares_cores_between_web_workers(monkeypatch):
+    monkeypatch.setattr(os, 'sched_getaffinity', lambda pid: set(range(8)), raising=False)
+    monkeypatch.setenv('WEB_CONCURRENCY', '4')
+    assert default_worker_pool_size() == 2
+    monkeypatch.setenv('WEB_CONCURRENCY', '1')
+    assert default_worker_pool_size() == 4
+    monkeypatch.setenv('WEB_CONCURRENCY', '16')
+    assert default_worker_pool_size() == 1